@@ -7,8 +7,16 @@ import asyncio
 import httpx
 import json
 import os
+import sys
+from pathlib import Path
 from typing import Optional
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))  # common/
+from common.mcp_metrics import METRICS, export_metrics
+from common.mcp_sse import raise_for_status, read_jsonrpc_response
+from mcp_transport import close_client, get_client, request_timeout
+
 
 # 🔧 CONFIGURACIÓN
 # Las credenciales se leen desde variables de entorno por seguridad
@@ -58,8 +66,10 @@ except ValueError as e:
 
 async def list_tools():
     """Lista las herramientas disponibles en el servidor FastMCP"""
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
+    client = get_client()
+    with METRICS.track("tools/list") as span:
+        async with client.stream(
+            "POST",
             f"{SERVER_URL}/mcp",
             headers={
                 "Authorization": f"Bearer {API_KEY}",
@@ -72,31 +82,26 @@ async def list_tools():
                 "method": "tools/list",
                 "params": {}
             },
-            timeout=30.0
-        )
-        response.raise_for_status()
-        
-        # FastMCP puede devolver SSE, intentamos parsear la respuesta
-        content = response.text
-        print(f"[DEBUG] Response content-type: {response.headers.get('content-type')}")
-        print(f"[DEBUG] Response text: {content[:200]}...")
-        
-        # Si es SSE, extraer los mensajes
-        if 'text/event-stream' in response.headers.get('content-type', ''):
-            # Parsear eventos SSE
-            lines = content.strip().split('\n')
-            for line in lines:
-                if line.startswith('data: '):
-                    data = line[6:]  # Remover 'data: '
-                    return json.loads(data)
-        else:
-            return response.json()
+            timeout=request_timeout(30.0),
+            extensions=span.extensions
+        ) as response:
+            span.first_byte()
+            await raise_for_status(response)
+            # FastMCP puede devolver SSE: los eventos se procesan a medida que llegan
+            print(f"[DEBUG] Response content-type: {response.headers.get('content-type')}")
+            result = await read_jsonrpc_response(response)
+            span.done(response, result)
+    
+    print(f"[DEBUG] Response: {json.dumps(result)[:200]}...")
+    return result
 
 
 async def call_tool(tool_name: str, arguments: dict):
     """Llama a una herramienta MCP en FastMCP Cloud"""
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
+    client = get_client()
+    with METRICS.track("tools/call", tool_name) as span:
+        async with client.stream(
+            "POST",
             f"{SERVER_URL}/mcp",
             headers={
                 "Authorization": f"Bearer {API_KEY}",
@@ -112,21 +117,15 @@ async def call_tool(tool_name: str, arguments: dict):
                     "arguments": arguments
                 }
             },
-            timeout=30.0
-        )
-        response.raise_for_status()
-        
-        # FastMCP devuelve SSE, parsear la respuesta
-        content = response.text
-        if 'text/event-stream' in response.headers.get('content-type', ''):
-            # Parsear eventos SSE
-            lines = content.strip().split('\n')
-            for line in lines:
-                if line.startswith('data: '):
-                    data = line[6:]  # Remover 'data: '
-                    return json.loads(data)
-        else:
-            return response.json()
+            timeout=request_timeout(30.0),
+            extensions=span.extensions
+        ) as response:
+            span.first_byte()
+            await raise_for_status(response)
+            # FastMCP devuelve SSE: los eventos se procesan a medida que llegan
+            result = await read_jsonrpc_response(response)
+            span.done(response, result)
+            return result
 
 
 async def main():
@@ -190,6 +189,11 @@ async def main():
         print(f"\n❌ Error inesperado: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        await close_client()
+        metrics_file = export_metrics()
+        if metrics_file:
+            print(f"📈 Métricas guardadas en {metrics_file}")
 
 
 if __name__ == "__main__":
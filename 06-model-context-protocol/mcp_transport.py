@@ -0,0 +1,78 @@
+"""
+Transporte HTTP compartido para los clientes MCP
+================================================
+
+Los clientes del Lab 6 (cloud-deployment, openai-integration,
+openai-integration-extra) hablan JSON-RPC sobre HTTP con el mismo servidor
+FastMCP Cloud. Abrir un httpx.AsyncClient por llamada obliga a pagar un
+handshake TCP + TLS en cada tool call; este módulo mantiene un único
+cliente por event loop con:
+
+- Pool de conexiones con keep-alive (las conexiones se reutilizan)
+- HTTP/2 si está instalado `h2` (pip install "httpx[http2]"): varias
+  llamadas concurrentes comparten una sola conexión
+- Timeouts por llamada (connect corto, lectura configurable)
+
+Ejemplo de uso:
+    import sys
+    from pathlib import Path
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    from mcp_transport import get_client, close_client
+
+    client = get_client()
+    response = await client.post(f"{SERVER_URL}/mcp", json=payload, timeout=request_timeout(30))
+    ...
+    await close_client()   # al terminar (ej. al final de main())
+"""
+
+import asyncio
+import importlib.util
+import os
+from typing import Dict, Optional
+
+import httpx
+
+# HTTP/2 es opcional: httpx lo usa solo si está instalado el paquete h2
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Límites del pool (configurables por entorno)
+MCP_MAX_CONNECTIONS = int(os.getenv("MCP_MAX_CONNECTIONS", "20"))
+MCP_MAX_KEEPALIVE = int(os.getenv("MCP_MAX_KEEPALIVE", "10"))
+MCP_KEEPALIVE_EXPIRY = float(os.getenv("MCP_KEEPALIVE_EXPIRY", "60"))
+MCP_CONNECT_TIMEOUT = float(os.getenv("MCP_CONNECT_TIMEOUT", "5"))
+
+LIMITS = httpx.Limits(
+    max_connections=MCP_MAX_CONNECTIONS,
+    max_keepalive_connections=MCP_MAX_KEEPALIVE,
+    keepalive_expiry=MCP_KEEPALIVE_EXPIRY,
+)
+
+# Un cliente por event loop: las conexiones de httpx quedan ligadas al loop que
+# las abrió, y cada asyncio.run() crea uno nuevo
+_clients: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+
+
+def request_timeout(read: float = 30.0) -> httpx.Timeout:
+    """Timeout de una llamada: conexión corta, lectura/escritura de `read` segundos."""
+    return httpx.Timeout(read, connect=min(MCP_CONNECT_TIMEOUT, read))
+
+
+def get_client() -> httpx.AsyncClient:
+    """Cliente compartido (pool + keep-alive + HTTP/2) del event loop actual."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            limits=LIMITS,
+            timeout=request_timeout(),
+        )
+        _clients[loop] = client
+    return client
+
+
+async def close_client(loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+    """Cierra el cliente del event loop actual (o de `loop`) y sus conexiones."""
+    client = _clients.pop(loop or asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
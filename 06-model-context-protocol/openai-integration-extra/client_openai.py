@@ -16,10 +16,18 @@ Variables de entorno requeridas:
 import os
 import asyncio
 import httpx
-import json
-from openai import OpenAI
+import sys
+from openai import AsyncOpenAI
+from pathlib import Path
 from typing import Dict, Any, List
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))  # common/
+from common.mcp_cache import ResultCache, is_cacheable_tool
+from common.mcp_metrics import METRICS, export_metrics
+from common.mcp_sse import raise_for_status, read_jsonrpc_response
+from mcp_transport import close_client, get_client, request_timeout
+
 
 # 🔧 CONFIGURACIÓN
 def get_config() -> tuple[str, str, str]:
@@ -67,15 +75,30 @@ except ValueError as e:
 
 OPENAI_MODEL = "gpt-4o-mini"
 
+# Caché de resources, prompts y herramientas puras (LRU + TTL)
+MCP_CACHE_TTL = float(os.getenv("MCP_CACHE_TTL", "300"))
+MCP_CACHE_SIZE = int(os.getenv("MCP_CACHE_SIZE", "256"))
+# Herramientas sin efectos secundarios cuyo resultado se puede reutilizar
+# (add_idea/list_ideas/find_idea dependen del estado del servidor: no se cachean)
+MCP_CACHEABLE_TOOLS = {
+    name.strip() for name in os.getenv("MCP_CACHEABLE_TOOLS", "").split(",") if name.strip()
+}
+
 
 # Cliente OpenAI
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
+openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY)
 
+# Caché de respuestas MCP compartida por todas las llamadas
+result_cache = ResultCache(max_entries=MCP_CACHE_SIZE, ttl=MCP_CACHE_TTL)
 
-async def call_mcp_tool(tool_name: str, arguments: dict) -> Any:
-    """Llama a una herramienta MCP en FastMCP Cloud"""
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
+
+async def mcp_request(request_id: int, method: str, params: dict) -> Dict[str, Any]:
+    """Envía una petición JSON-RPC al servidor MCP y devuelve el mensaje de respuesta"""
+    client = get_client()
+    # Etiqueta: la herramienta/prompt, o la URI del resource
+    with METRICS.track(method, params.get("name") or params.get("uri", "")) as span:
+        async with client.stream(
+            "POST",
             f"{FASTMCP_SERVER_URL}/mcp",
             headers={
                 "Authorization": f"Bearer {FASTMCP_API_KEY}",
@@ -84,113 +107,71 @@ async def call_mcp_tool(tool_name: str, arguments: dict) -> Any:
             },
             json={
                 "jsonrpc": "2.0",
-                "id": 2,
-                "method": "tools/call",
-                "params": {
-                    "name": tool_name,
-                    "arguments": arguments
-                }
+                "id": request_id,
+                "method": method,
+                "params": params
             },
-            timeout=30.0
-        )
-        response.raise_for_status()
-        
-        # Parsear respuesta SSE
-        content = response.text
-        if 'text/event-stream' in response.headers.get('content-type', ''):
-            lines = content.strip().split('\n')
-            for line in lines:
-                if line.startswith('data: '):
-                    data = line[6:]
-                    result = json.loads(data)
-                    if "result" in result:
-                        # Extraer el contenido de la respuesta MCP
-                        content_items = result["result"].get("content", [])
-                        for item in content_items:
-                            if "text" in item:
-                                return item["text"]
-                    return result
-        
-        return response.json()
+            timeout=request_timeout(30.0),
+            extensions=span.extensions
+        ) as response:
+            span.first_byte()
+            await raise_for_status(response)
+            # Respuesta SSE o JSON: los eventos se procesan a medida que llegan
+            result = await read_jsonrpc_response(
+                response, on_notification=result_cache.handle_notification
+            )
+            span.done(response, result)
+            return result
+
+
+async def cached_mcp_request(request_id: int, method: str, name: str, params: dict) -> Dict[str, Any]:
+    """Como mcp_request, pero sirve desde la caché si ya se pidió lo mismo"""
+    arguments = params.get("arguments", {})
+    return await result_cache.get_or_fetch(
+        result_cache.key(FASTMCP_SERVER_URL, method, name, arguments),
+        lambda: mcp_request(request_id, method, params)
+    )
+
+
+async def call_mcp_tool(tool_name: str, arguments: dict) -> Any:
+    """Llama a una herramienta MCP en FastMCP Cloud"""
+    params = {"name": tool_name, "arguments": arguments}
+    if is_cacheable_tool(tool_name, MCP_CACHEABLE_TOOLS):
+        result = await cached_mcp_request(2, "tools/call", tool_name, params)
+    else:
+        result = await mcp_request(2, "tools/call", params)
+    
+    if "result" in result:
+        # Extraer el contenido de la respuesta MCP
+        content_items = result["result"].get("content", [])
+        for item in content_items:
+            if "text" in item:
+                return item["text"]
+    return result
 
 
 async def read_mcp_resource(uri: str) -> str:
-    """Lee un recurso MCP"""
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            f"{FASTMCP_SERVER_URL}/mcp",
-            headers={
-                "Authorization": f"Bearer {FASTMCP_API_KEY}",
-                "Content-Type": "application/json",
-                "Accept": "application/json, text/event-stream"
-            },
-            json={
-                "jsonrpc": "2.0",
-                "id": 3,
-                "method": "resources/read",
-                "params": {
-                    "uri": uri
-                }
-            },
-            timeout=30.0
-        )
-        response.raise_for_status()
-        
-        # Parsear respuesta SSE
-        content = response.text
-        if 'text/event-stream' in response.headers.get('content-type', ''):
-            lines = content.strip().split('\n')
-            for line in lines:
-                if line.startswith('data: '):
-                    data = line[6:]
-                    result = json.loads(data)
-                    if "result" in result:
-                        contents = result["result"].get("contents", [])
-                        if contents:
-                            return contents[0].get("text", "")
-                    return str(result)
-        
-        return response.text
+    """Lee un recurso MCP (contenido estático: se cachea)"""
+    result = await cached_mcp_request(3, "resources/read", uri, {"uri": uri})
+    
+    if "result" in result:
+        contents = result["result"].get("contents", [])
+        if contents:
+            return contents[0].get("text", "")
+    return str(result)
 
 
 async def get_mcp_prompt(prompt_name: str, arguments: dict = None) -> str:
-    """Obtiene un prompt MCP"""
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            f"{FASTMCP_SERVER_URL}/mcp",
-            headers={
-                "Authorization": f"Bearer {FASTMCP_API_KEY}",
-                "Content-Type": "application/json",
-                "Accept": "application/json, text/event-stream"
-            },
-            json={
-                "jsonrpc": "2.0",
-                "id": 4,
-                "method": "prompts/get",
-                "params": {
-                    "name": prompt_name,
-                    "arguments": arguments or {}
-                }
-            },
-            timeout=30.0
-        )
-        response.raise_for_status()
-        
-        # Parsear respuesta SSE
-        content = response.text
-        if 'text/event-stream' in response.headers.get('content-type', ''):
-            lines = content.strip().split('\n')
-            for line in lines:
-                if line.startswith('data: '):
-                    data = line[6:]
-                    result = json.loads(data)
-                    if "result" in result:
-                        messages = result["result"].get("messages", [])
-                        if messages:
-                            return messages[0].get("content", {}).get("text", "")
-                    return str(result)
-        
-        return response.text
+    """Obtiene un prompt MCP (mismos argumentos, mismo prompt: se cachea)"""
+    result = await cached_mcp_request(
+        4, "prompts/get", prompt_name, {"name": prompt_name, "arguments": arguments or {}}
+    )
+    
+    if "result" in result:
+        messages = result["result"].get("messages", [])
+        if messages:
+            return messages[0].get("content", {}).get("text", "")
+    return str(result)
 
 
 async def main():
@@ -245,24 +226,27 @@ async def main():
         
         print(f"Prompt generado:\n{prompt_text}\n")
         
-        # 6. Usar GPT-4o-mini para analizar la idea
+        # 6. Usar GPT-4o-mini para analizar la idea (streaming: se imprime a medida que se genera)
         print("🧠 Analizando idea con GPT-4o-mini...")
-        response = openai_client.chat.completions.create(
+        stream = await openai_client.chat.completions.create(
             model=OPENAI_MODEL,
             messages=[
                 {"role": "system", "content": "Eres un experto evaluador de proyectos innovadores."},
                 {"role": "user", "content": prompt_text}
-            ]
+            ],
+            stream=True
         )
         
-        analysis = response.choices[0].message.content
-        
         print("\n" + "=" * 70)
         print("💬 Análisis generado por GPT-4o-mini:")
         print("=" * 70)
-        print(analysis)
-        print("=" * 70)
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                print(chunk.choices[0].delta.content, end="", flush=True)
+        print("\n" + "=" * 70)
         
+        stats = result_cache.stats()
+        print(f"\n🗄️  Caché MCP: {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} entradas")
         print("\n✅ Demo completada exitosamente")
         
     except httpx.HTTPStatusError as e:
@@ -273,6 +257,12 @@ async def main():
         print(f"\n❌ Error inesperado: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        await close_client()
+        await openai_client.close()
+        metrics_file = export_metrics()
+        if metrics_file:
+            print(f"📈 Métricas guardadas en {metrics_file}")
 
 
 if __name__ == "__main__":
@@ -5,12 +5,23 @@ Parte 3: Integración OpenAI + FastMCP
 Este cliente permite a GPT-4o-mini usar herramientas MCP desplegadas en FastMCP Cloud.
 """
 
+import argparse
 import asyncio
-import httpx
+import contextlib
 import json
 import os
-from openai import OpenAI
-from typing import Optional, Dict, Any, List
+import sys
+import time
+from openai import AsyncOpenAI
+from pathlib import Path
+from typing import Callable, Optional, Dict, Any, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))  # common/
+from common.mcp_metrics import METRICS, error_class, export_metrics
+from common.mcp_sse import raise_for_status, read_jsonrpc_response
+from mcp_transport import close_client, get_client, request_timeout
+from common.rate_limit import RateLimiter, estimate_tokens, status_code, with_retries
 
 
 # 🔧 CONFIGURACIÓN
@@ -57,14 +68,33 @@ except ValueError as e:
     exit(1)
 
 
-# Cliente OpenAI
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
+# Rate limit de OpenAI (configurable por entorno, según los límites de la cuenta)
+OPENAI_RPM = float(os.getenv("OPENAI_RPM", "0")) or None  # requests por minuto
+OPENAI_TPM = float(os.getenv("OPENAI_TPM", "0")) or None  # tokens por minuto
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "5"))
+# Tokens de salida estimados por llamada (se suman al prompt para el bucket de TPM)
+OPENAI_COMPLETION_TOKENS = int(os.getenv("OPENAI_COMPLETION_TOKENS", "500"))
+
+# Cliente OpenAI (los reintentos los maneja with_retries, junto con el rate limit)
+openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY, max_retries=0)
+rate_limiter = RateLimiter(OPENAI_RPM, OPENAI_TPM)
+# Contadores de llamadas a OpenAI (para el reporte de carga)
+openai_stats = {"requests": 0, "retries": 0, "rate_limited": 0}
+
+# Ejecución de las tool calls de cada turno (configurable por entorno)
+MCP_TOOL_TIMEOUT = float(os.getenv("MCP_TOOL_TIMEOUT", "30"))  # segundos por herramienta
+MCP_TOOL_CONCURRENCY = int(os.getenv("MCP_TOOL_CONCURRENCY", "4"))  # herramientas en paralelo
+MCP_MAX_TOOL_ROUNDS = int(os.getenv("MCP_MAX_TOOL_ROUNDS", "5"))  # rondas de tool calls por mensaje
+# Segundos que se reutiliza el catálogo de herramientas antes de volver a pedir tools/list
+MCP_TOOLS_TTL = float(os.getenv("MCP_TOOLS_TTL", "300"))
 
 
 async def list_mcp_tools() -> List[Dict[str, Any]]:
     """Lista las herramientas disponibles en el servidor MCP"""
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
+    client = get_client()
+    with METRICS.track("tools/list") as span:
+        async with client.stream(
+            "POST",
             f"{FASTMCP_SERVER_URL}/mcp",
             headers={
                 "Authorization": f"Bearer {FASTMCP_API_KEY}",
@@ -77,27 +107,24 @@ async def list_mcp_tools() -> List[Dict[str, Any]]:
                 "method": "tools/list",
                 "params": {}
             },
-            timeout=30.0
-        )
-        response.raise_for_status()
-        
-        # Parsear respuesta SSE
-        content = response.text
-        if 'text/event-stream' in response.headers.get('content-type', ''):
-            lines = content.strip().split('\n')
-            for line in lines:
-                if line.startswith('data: '):
-                    data = line[6:]
-                    result = json.loads(data)
-                    return result.get("result", {}).get("tools", [])
-        
-        return response.json().get("result", {}).get("tools", [])
+            timeout=request_timeout(30.0),
+            extensions=span.extensions
+        ) as response:
+            span.first_byte()
+            await raise_for_status(response)
+            # Respuesta SSE o JSON: los eventos se procesan a medida que llegan
+            result = await read_jsonrpc_response(response, on_notification=tool_catalog.handle_notification)
+            span.done(response, result)
+    
+    return result.get("result", {}).get("tools", [])
 
 
 async def call_mcp_tool(tool_name: str, arguments: dict) -> Any:
     """Llama a una herramienta MCP en FastMCP Cloud"""
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
+    client = get_client()
+    with METRICS.track("tools/call", tool_name) as span:
+        async with client.stream(
+            "POST",
             f"{FASTMCP_SERVER_URL}/mcp",
             headers={
                 "Authorization": f"Bearer {FASTMCP_API_KEY}",
@@ -113,27 +140,22 @@ async def call_mcp_tool(tool_name: str, arguments: dict) -> Any:
                     "arguments": arguments
                 }
             },
-            timeout=30.0
-        )
-        response.raise_for_status()
-        
-        # Parsear respuesta SSE
-        content = response.text
-        if 'text/event-stream' in response.headers.get('content-type', ''):
-            lines = content.strip().split('\n')
-            for line in lines:
-                if line.startswith('data: '):
-                    data = line[6:]
-                    result = json.loads(data)
-                    if "result" in result:
-                        # Extraer el contenido de la respuesta MCP
-                        content_items = result["result"].get("content", [])
-                        for item in content_items:
-                            if "text" in item:
-                                return item["text"]
-                    return result
-        
-        return response.json()
+            timeout=request_timeout(30.0),
+            extensions=span.extensions
+        ) as response:
+            span.first_byte()
+            await raise_for_status(response)
+            # Respuesta SSE o JSON: los eventos se procesan a medida que llegan
+            result = await read_jsonrpc_response(response, on_notification=tool_catalog.handle_notification)
+            span.done(response, result)
+    
+    if "result" in result:
+        # Extraer el contenido de la respuesta MCP
+        content_items = result["result"].get("content", [])
+        for item in content_items:
+            if "text" in item:
+                return item["text"]
+    return result
 
 
 def mcp_tools_to_openai_format(mcp_tools: List[Dict]) -> List[Dict]:
@@ -166,86 +188,353 @@ def mcp_tools_to_openai_format(mcp_tools: List[Dict]) -> List[Dict]:
     return openai_tools
 
 
-async def chat_with_tools(user_message: str) -> str:
+class ToolCatalog:
+    """
+    Catálogo de herramientas MCP compartido por todas las conversaciones.
+    
+    Guarda la lista de tools/list y su conversión al formato de OpenAI, así
+    que los turnos no pagan un round-trip antes de consultar al modelo. Se
+    vuelve a pedir al vencer el TTL o al recibir la notificación MCP
+    `notifications/tools/list_changed` dentro de la respuesta a un POST
+    (tools/list o tools/call). El cliente no abre el stream GET del
+    servidor, así que un cambio anunciado solo por ahí se ve recién al
+    vencer el TTL.
+    """
+    
+    def __init__(self, ttl: float = MCP_TOOLS_TTL):
+        self.ttl = ttl
+        self._mcp_tools: List[Dict[str, Any]] = []
+        self._openai_tools: List[Dict[str, Any]] = []
+        self._expires_at = 0.0
+        # Sube con cada invalidación: un tools/list en vuelo que la cruza no renueva el TTL
+        self._generation = 0
+        self._lock: Optional[asyncio.Lock] = None
+    
+    def invalidate(self):
+        """Fuerza a pedir tools/list en el próximo get()."""
+        self._generation += 1
+        self._expires_at = 0.0
+    
+    def handle_notification(self, message: Dict[str, Any]):
+        """Callback para read_jsonrpc_response: invalida el catálogo si cambió en el servidor."""
+        if message.get("method") == "notifications/tools/list_changed":
+            print("🔄 El servidor cambió sus herramientas: se actualizará el catálogo")
+            self.invalidate()
+    
+    async def get(self) -> tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """(herramientas MCP, herramientas en formato OpenAI), pidiéndolas solo si vencieron."""
+        if time.monotonic() < self._expires_at:
+            return self._mcp_tools, self._openai_tools
+        
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        # Varias conversaciones concurrentes comparten un único tools/list
+        async with self._lock:
+            if time.monotonic() >= self._expires_at:
+                generation = self._generation
+                mcp_tools = await list_mcp_tools()
+                self._mcp_tools = mcp_tools
+                self._openai_tools = mcp_tools_to_openai_format(mcp_tools)
+                # Un catálogo vacío no se guarda: se vuelve a pedir en el próximo turno.
+                # Si llegó list_changed mientras tanto, la lista puede ser la vieja
+                if mcp_tools and generation == self._generation:
+                    self._expires_at = time.monotonic() + self.ttl
+        return self._mcp_tools, self._openai_tools
+
+
+tool_catalog = ToolCatalog()
+
+
+async def run_tool_call(tool_call: Dict[str, Any], semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+    """
+    Ejecuta una tool call del asistente y devuelve su mensaje "tool".
+    
+    Como máximo MCP_TOOL_CONCURRENCY herramientas en vuelo (`semaphore`),
+    cada una con un timeout de MCP_TOOL_TIMEOUT segundos. Un error o
+    timeout se devuelve como resultado de la herramienta (el modelo puede
+    explicarlo) sin cancelar las demás.
+    """
+    function_name = tool_call["function"]["name"]
+    async with semaphore:
+        try:
+            function_args = json.loads(tool_call["function"]["arguments"] or "{}")
+            print(f"\n🔧 Llamando a herramienta MCP: {function_name}")
+            print(f"   Argumentos: {function_args}")
+            
+            # Llamar a la herramienta MCP
+            function_response = await asyncio.wait_for(
+                call_mcp_tool(function_name, function_args),
+                timeout=MCP_TOOL_TIMEOUT
+            )
+            print(f"   ✅ Resultado ({function_name}): {function_response}")
+        except asyncio.TimeoutError:
+            # El span de call_mcp_tool ve una cancelación: el timeout se cuenta aquí
+            METRICS.inc("mcp_errors_total", error_class="timeout", method="tools/call", tool=function_name)
+            function_response = f"Error: {function_name} no respondió en {MCP_TOOL_TIMEOUT:g} s"
+            print(f"   ⏱️ {function_response}")
+        except Exception as e:
+            function_response = f"Error al ejecutar {function_name}: {e}"
+            print(f"   ❌ {function_response}")
+    
+    return {
+        "tool_call_id": tool_call["id"],
+        "role": "tool",
+        "name": function_name,
+        "content": str(function_response)
+    }
+
+
+async def stream_completion(
+    messages: List[Dict[str, Any]],
+    tools: Optional[List[Dict]] = None,
+    on_token: Optional[Callable[[str], Any]] = None,
+    on_tool_call: Optional[Callable[[Dict[str, Any]], Any]] = None
+) -> tuple[str, List[Dict[str, Any]]]:
+    """
+    Llama a GPT-4o-mini en modo streaming.
+    
+    Los tokens de texto se pasan a `on_token` a medida que llegan. Cada
+    tool call se pasa a `on_tool_call` apenas está completa (cuando empieza
+    la siguiente), sin esperar el resto de la respuesta.
+    
+    Returns:
+        (texto, tool calls en formato de mensaje de OpenAI)
+    """
+    kwargs = {"tools": tools, "tool_choice": "auto"} if tools else {}
+    prompt_tokens = estimate_tokens(json.dumps(messages, ensure_ascii=False, default=str))
+    
+    async def create():
+        await rate_limiter.acquire(prompt_tokens + OPENAI_COMPLETION_TOKENS)
+        openai_stats["requests"] += 1
+        return await openai_client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=messages,
+            stream=True,
+            **kwargs
+        )
+    
+    def count_retry(error: BaseException, delay: float):
+        openai_stats["retries"] += 1
+        METRICS.inc("openai_retries_total", error_class=error_class(error))
+        if status_code(error) == 429:
+            openai_stats["rate_limited"] += 1
+    
+    # Los errores (429 incluido) llegan al crear el stream: se reintenta con backoff
+    stream = await with_retries(create, max_retries=OPENAI_MAX_RETRIES, on_retry=count_retry)
+    
+    content = []
+    tool_calls: List[Dict[str, Any]] = []
+    async for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        if delta.content:
+            content.append(delta.content)
+            if on_token is not None:
+                on_token(delta.content)
+        for tool_delta in delta.tool_calls or []:
+            # Los argumentos llegan en fragmentos; un índice nuevo cierra la tool call anterior
+            if tool_delta.index >= len(tool_calls):
+                if tool_calls and on_tool_call is not None:
+                    on_tool_call(tool_calls[-1])
+                tool_calls.append({"id": "", "type": "function", "function": {"name": "", "arguments": ""}})
+            tool_call = tool_calls[tool_delta.index]
+            if tool_delta.id:
+                tool_call["id"] = tool_delta.id
+            if tool_delta.function is not None:
+                tool_call["function"]["name"] += tool_delta.function.name or ""
+                tool_call["function"]["arguments"] += tool_delta.function.arguments or ""
+    
+    if tool_calls and on_tool_call is not None:
+        on_tool_call(tool_calls[-1])
+    return "".join(content), tool_calls
+
+
+async def chat_with_tools(
+    user_message: str,
+    max_rounds: int = MCP_MAX_TOOL_ROUNDS,
+    on_token: Optional[Callable[[str], Any]] = None
+) -> str:
     """
     Envía un mensaje a GPT-4o-mini con acceso a herramientas MCP.
     
+    El modelo puede pedir herramientas en varias rondas (hasta `max_rounds`);
+    las herramientas de cada ronda se ejecutan en paralelo y empiezan
+    mientras el modelo todavía está generando el resto de la respuesta.
+    
     Args:
         user_message: Mensaje del usuario
+        max_rounds: Rondas máximas de tool calls antes de pedir la respuesta final
+        on_token: Callback para los tokens de texto a medida que llegan
     
     Returns:
         Respuesta del modelo
     """
     print(f"\n💬 Usuario: {user_message}")
     
-    # Obtener herramientas MCP disponibles
+    # Obtener herramientas MCP disponibles (del catálogo en memoria si está vigente)
     print("🔍 Obteniendo herramientas MCP...")
-    mcp_tools = await list_mcp_tools()
+    mcp_tools, openai_tools = await tool_catalog.get()
     
     if not mcp_tools:
         return "❌ No hay herramientas MCP disponibles"
     
     print(f"✅ Herramientas encontradas: {', '.join([t['name'] for t in mcp_tools])}")
     
-    # Convertir a formato OpenAI
-    openai_tools = mcp_tools_to_openai_format(mcp_tools)
-    
-    # Primera llamada a OpenAI
     messages = [
         {"role": "system", "content": "Eres un asistente útil que puede usar herramientas para responder preguntas. Cuando uses una herramienta, explica claramente qué estás haciendo y los resultados obtenidos."},
         {"role": "user", "content": user_message}
     ]
     
-    print("🤖 Consultando a GPT-4o-mini...")
-    response = openai_client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=messages,
-        tools=openai_tools,
-        tool_choice="auto"
-    )
-    
-    response_message = response.choices[0].message
-    tool_calls = response_message.tool_calls
+    for round_number in range(1, max_rounds + 1):
+        print(f"🤖 Consultando a GPT-4o-mini (ronda {round_number})...")
+        semaphore = asyncio.Semaphore(MCP_TOOL_CONCURRENCY)
+        tasks = []
+        try:
+            content, tool_calls = await stream_completion(
+                messages,
+                openai_tools,
+                on_token=on_token,
+                # Cada herramienta arranca apenas sus argumentos están completos
+                on_tool_call=lambda tool_call: tasks.append(
+                    asyncio.create_task(run_tool_call(tool_call, semaphore))
+                )
+            )
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        
+        # Sin llamadas a herramientas: es la respuesta final
+        if not tool_calls:
+            return content
+        
+        # Las respuestas de las herramientas se agregan en el orden original
+        messages.append({"role": "assistant", "content": content or None, "tool_calls": tool_calls})
+        messages.extend(await asyncio.gather(*tasks))
     
-    # Si no hay llamadas a herramientas, retornar respuesta directa
-    if not tool_calls:
-        return response_message.content
+    # Límite de rondas alcanzado: respuesta final sin herramientas
+    print("\n🤖 Generando respuesta final...")
+    content, _ = await stream_completion(messages, on_token=on_token)
+    return content
+
+
+def token_printer() -> Callable[[str], None]:
+    """Callback on_token que imprime la respuesta a medida que llegan los tokens."""
+    started = False
     
-    # Procesar llamadas a herramientas
-    messages.append(response_message)
+    def print_token(token: str):
+        nonlocal started
+        if not started:
+            print("\n✨ Respuesta de GPT-4o-mini:")
+            started = True
+        print(token, end="", flush=True)
     
-    for tool_call in tool_calls:
-        function_name = tool_call.function.name
-        function_args = json.loads(tool_call.function.arguments)
-        
-        print(f"\n🔧 Llamando a herramienta MCP: {function_name}")
-        print(f"   Argumentos: {function_args}")
-        
-        # Llamar a la herramienta MCP
-        function_response = await call_mcp_tool(function_name, function_args)
-        
-        print(f"   ✅ Resultado: {function_response}")
+    return print_token
+
+
+async def run_demo(test_queries: List[str]):
+    """Una prueba tras otra; el rate limiter reemplaza las esperas fijas entre pruebas."""
+    for i, query in enumerate(test_queries, 1):
+        print(f"\n{'=' * 70}")
+        print(f"📝 Prueba {i}/{len(test_queries)}")
+        print(f"{'=' * 70}")
         
-        # Agregar respuesta de la herramienta al contexto
-        messages.append({
-            "tool_call_id": tool_call.id,
-            "role": "tool",
-            "name": function_name,
-            "content": str(function_response)
-        })
-    
-    # Segunda llamada a OpenAI con los resultados
-    print("\n🤖 Generando respuesta final...")
-    final_response = openai_client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=messages
-    )
+        try:
+            # La respuesta se imprime a medida que el modelo la genera
+            answer = await chat_with_tools(query, on_token=token_printer())
+            if answer:
+                print()
+            
+        except Exception as e:
+            print(f"\n❌ Error: {e}")
+            import traceback
+            traceback.print_exc()
     
-    return final_response.choices[0].message.content
+    print(f"\n{'=' * 70}")
+    print("✅ Todas las pruebas completadas")
+    print("=" * 70)
 
 
-async def main():
-    """Función principal - Pruebas de integración"""
+def percentile(values: List[float], q: float) -> float:
+    """Percentil `q` (0-100) con interpolación lineal."""
+    ordered = sorted(values)
+    if not ordered:
+        return float("nan")
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+async def run_load(queries: List[str], conversations: int, concurrency: int) -> Dict[str, Any]:
+    """
+    Corre `conversations` conversaciones (ciclando `queries`), hasta
+    `concurrency` a la vez, y mide la latencia de cada una.
+    
+    El ritmo lo marca el rate limiter (OPENAI_RPM/OPENAI_TPM), no esperas fijas.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors: List[str] = []
+    
+    async def conversation(query: str):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await chat_with_tools(query)
+                latencies.append(time.perf_counter() - start)
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(conversation(queries[i % len(queries)]) for i in range(conversations)))
+    return {"elapsed": time.perf_counter() - start, "latencies": latencies, "errors": errors}
+
+
+def print_load_report(report: Dict[str, Any], concurrency: int):
+    """Throughput, percentiles de latencia y reintentos de una corrida de carga."""
+    latencies = report["latencies"]
+    elapsed = report["elapsed"]
+    completed = len(latencies)
+    
+    print(f"\n{'=' * 70}")
+    print(f"📈 Reporte de carga (concurrencia: {concurrency})")
+    print(f"{'=' * 70}")
+    print(f"Conversaciones: {completed} completadas, {len(report['errors'])} con error, en {elapsed:.1f} s")
+    print(f"Throughput: {completed / elapsed:.2f} conversaciones/s ({60 * completed / elapsed:.1f}/min)")
+    print(f"Requests a OpenAI: {openai_stats['requests']} "
+          f"({60 * openai_stats['requests'] / elapsed:.0f} RPM efectivos), "
+          f"{openai_stats['retries']} reintentos ({openai_stats['rate_limited']} por 429)")
+    if latencies:
+        print("Latencia por conversación: " + ", ".join(
+            f"p{q}={percentile(latencies, q):.2f}s" for q in (50, 90, 95, 99)
+        ) + f", max={max(latencies):.2f}s")
+    for error in sorted(set(report["errors"]))[:5]:
+        print(f"   ❌ {error}")
+    summary = METRICS.summary()
+    if summary:
+        print("Latencia MCP por método/herramienta:")
+        for line in summary:
+            print(f"   {line}")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Integración OpenAI + FastMCP (Parte 3)")
+    parser.add_argument(
+        "--load", type=int, metavar="N",
+        help="Modo carga: N conversaciones concurrentes (sin logs por conversación) y reporte de latencias"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=10,
+        help="Conversaciones en paralelo en modo carga (default: 10)"
+    )
+    return parser.parse_args(argv)
+
+
+async def main(argv=None):
+    """Función principal - Pruebas de integración (o prueba de carga con --load)"""
+    args = parse_args(argv)
     print("=" * 70)
     print("🚀 Integración OpenAI + FastMCP")
     print("=" * 70)
@@ -261,27 +550,21 @@ async def main():
         "¿Hay más letras 'r' en 'Refrigerador' o en 'Computadora'?"
     ]
     
-    for i, query in enumerate(test_queries, 1):
-        print(f"\n{'=' * 70}")
-        print(f"📝 Prueba {i}/{len(test_queries)}")
-        print(f"{'=' * 70}")
-        
-        try:
-            answer = await chat_with_tools(query)
-            print(f"\n✨ Respuesta de GPT-4o-mini:\n{answer}")
-            
-        except Exception as e:
-            print(f"\n❌ Error: {e}")
-            import traceback
-            traceback.print_exc()
-        
-        if i < len(test_queries):
-            print("\n⏳ Esperando antes de la siguiente prueba...")
-            await asyncio.sleep(2)
+    if args.load:
+        print(f"\n🏋️ Modo carga: {args.load} conversaciones, {args.concurrency} en paralelo "
+              f"(RPM: {OPENAI_RPM or 'sin límite'}, TPM: {OPENAI_TPM or 'sin límite'})")
+        # Los logs de cada conversación se descartan: solo interesa el reporte
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            report = await run_load(test_queries, args.load, args.concurrency)
+        print_load_report(report, args.concurrency)
+    else:
+        await run_demo(test_queries)
     
-    print(f"\n{'=' * 70}")
-    print("✅ Todas las pruebas completadas")
-    print("=" * 70)
+    await close_client()
+    await openai_client.close()
+    metrics_file = export_metrics()
+    if metrics_file:
+        print(f"📈 Métricas guardadas en {metrics_file}")
 
 
 if __name__ == "__main__":
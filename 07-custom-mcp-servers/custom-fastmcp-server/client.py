@@ -4,9 +4,26 @@ Este script conecta al servidor FastMCP Cloud. Usa variables de entorno para con
 """
 
 import asyncio
+import itertools
 import json
 import os
-from typing import Any, Optional
+import sys
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))  # common/
+from common.mcp_cache import ResultCache, is_cacheable_tool
+from common.mcp_metrics import METRICS, Metrics, error_class, export_metrics
+from common.mcp_sse import aiter_jsonrpc, raise_for_status
+
+# Caché de resultados de herramientas puras (LRU + TTL)
+MCP_CACHE_TTL = float(os.getenv("MCP_CACHE_TTL", "300"))
+MCP_CACHE_SIZE = int(os.getenv("MCP_CACHE_SIZE", "256"))
+
+# Herramientas del servidor sin efectos secundarios: mismos argumentos, mismo
+# resultado. Las de sistema/archivos/datos aleatorios no se cachean salvo que
+# el servidor las anote con readOnlyHint
+CACHEABLE_TOOLS = {"analyze_text", "convert_text", "count_character"}
 
 
 def get_server_config() -> tuple[str, str]:
@@ -39,7 +56,11 @@ class MCPClient:
     def __init__(
         self,
         server_url: Optional[str] = None,
-        api_key: Optional[str] = None
+        api_key: Optional[str] = None,
+        on_notification: Optional[Callable[[dict], Any]] = None,
+        cache: Optional[ResultCache] = None,
+        cacheable_tools: Iterable[str] = CACHEABLE_TOOLS,
+        metrics: Optional[Metrics] = None
     ):
         """
         Inicializa el cliente.
@@ -47,13 +68,37 @@ class MCPClient:
         Args:
             server_url: URL del servidor (si None, usa variables de entorno)
             api_key: API Key para autenticación (si None, lo obtiene de variables de entorno)
+            on_notification: Callback para notificaciones JSON-RPC (ej. progreso)
+                que el servidor envía antes de la respuesta
+            cache: Caché de resultados (si None, una LRU + TTL según MCP_CACHE_SIZE
+                y MCP_CACHE_TTL; MCP_CACHE_SIZE=0 la desactiva)
+            cacheable_tools: Herramientas cuyo resultado se puede reutilizar
+            metrics: Registro de latencias y errores (si None, el global METRICS)
         """
         if server_url is None:
             server_url, api_key = get_server_config()
         
         self.server_url = server_url
         self.api_key = api_key
+        self.on_notification = on_notification
         self.session = None
+        # Capa JSON-RPC: ids crecientes y peticiones en vuelo por id
+        self._ids = itertools.count(1)
+        self._pending: dict[int, asyncio.Future] = {}
+        # None hasta el primer batch; False si el servidor no acepta batches JSON-RPC
+        self.batch_supported: Optional[bool] = None
+        # Caché de herramientas puras: allow-list + anotaciones de tools/list
+        self.cache = cache if cache is not None else ResultCache(MCP_CACHE_SIZE, MCP_CACHE_TTL)
+        self.cacheable_tools = set(cacheable_tools)
+        self._tool_annotations: dict[str, dict] = {}
+        self.metrics = metrics if metrics is not None else METRICS
+    
+    @property
+    def url(self) -> str:
+        """Endpoint JSON-RPC del servidor (FastMCP Cloud expone /mcp)."""
+        if self.server_url.endswith("/mcp"):
+            return self.server_url
+        return f"{self.server_url}/mcp"
     
     async def connect(self):
         """Conecta con el servidor FastMCP Cloud."""
@@ -72,66 +117,260 @@ class MCPClient:
         """Desconecta del servidor."""
         if self.session:
             await self.session.aclose()
+            stats = self.cache.stats()
+            print(f"🗄️  Caché: {stats['hits']} hits, {stats['misses']} misses")
+            for line in self.metrics.summary():
+                print(f"⏱️  {line}")
+            metrics_file = export_metrics() if self.metrics is METRICS else None
+            if metrics_file:
+                print(f"📈 Métricas guardadas en {metrics_file}")
             print("✅ Desconectado")
     
-    async def call_tool(self, tool_name: str, **kwargs) -> dict[str, Any]:
+    async def request(self, method: str, params: Optional[dict] = None, timeout: float = 30.0) -> dict:
         """
-        Llama a una herramienta del servidor.
+        Envía una petición JSON-RPC y espera su respuesta.
+        
+        Cada petición lleva un id único; las respuestas se rutean por id a
+        la petición que las espera, así que muchas llamadas pueden estar en
+        vuelo a la vez sobre la misma sesión.
         
         Args:
-            tool_name: Nombre de la herramienta
-            **kwargs: Parámetros de la herramienta
+            method: Método JSON-RPC (ej. "tools/call")
+            params: Parámetros del método
+            timeout: Timeout de la petición en segundos
             
         Returns:
-            Resultado de la herramienta
+            Mensaje JSON-RPC de respuesta (con "result" o "error"). Si el
+            servidor rechazó la petición con un error sin id (ej. -32600
+            Invalid Request), se devuelve ese error
+        
+        Raises:
+            ValueError: Si el stream de la respuesta terminó sin traer su id
         """
         if not self.session:
             raise RuntimeError("No conectado al servidor")
         
+        request_id, future = self._register()
         try:
-            # FastMCP Cloud - usar protocolo JSON-RPC
-            url = self.server_url
-            if not url.endswith("/mcp"):
-                url = f"{url}/mcp"
+            rejection = await self._post(self._message(request_id, method, params), timeout)
             
-            response = await self.session.post(
-                url,
+            if not future.done():
+                if rejection is not None:
+                    return rejection
+                # La respuesta viaja en el stream de su POST: si terminó sin
+                # ella, no va a llegar por otro lado
+                raise ValueError(f"El servidor no respondió la petición {request_id} ({method})")
+            return future.result()
+        finally:
+            self._pending.pop(request_id, None)
+    
+    def _register(self) -> tuple[int, asyncio.Future]:
+        """Reserva un id nuevo y el future donde se entregará su respuesta."""
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        return request_id, future
+    
+    @staticmethod
+    def _message(request_id: int, method: str, params: Optional[dict] = None) -> dict:
+        return {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "method": method,
+            "params": params or {}
+        }
+    
+    async def _post(self, payload, timeout: float) -> Optional[dict]:
+        """
+        Envía una petición (o un batch) y rutea cada mensaje de la respuesta.
+        
+        Returns:
+            El error sin id de la respuesta, si lo hubo (ej. -32600 Invalid
+            Request: el servidor rechazó el mensaje sin procesarlo)
+        """
+        if isinstance(payload, list):
+            method, tool = "batch", ""
+        else:
+            method, tool = payload["method"], payload["params"].get("name", "")
+        with self.metrics.track(method, tool) as span:
+            async with self.session.stream(
+                "POST",
+                self.url,
                 headers={
                     "Authorization": f"Bearer {self.api_key}",
                     "Content-Type": "application/json",
                     "Accept": "application/json, text/event-stream"
                 },
-                json={
-                    "jsonrpc": "2.0",
-                    "id": 2,
-                    "method": "tools/call",
-                    "params": {
-                        "name": tool_name,
-                        "arguments": kwargs
-                    }
-                },
-                timeout=30.0
-            )
-            response.raise_for_status()
+                json=payload,
+                timeout=timeout,
+                extensions=span.extensions
+            ) as response:
+                span.first_byte()
+                await raise_for_status(response)
+                # Respuesta SSE o JSON: los mensajes se rutean a medida que llegan.
+                # El stream se lee hasta el final (el servidor lo cierra tras la
+                # respuesta): puede traer también respuestas de otras peticiones
+                rejection = None
+                async for message in aiter_jsonrpc(response):
+                    span.message(message)
+                    if "error" in message and message.get("id") is None:
+                        rejection = message
+                    self._dispatch(message)
+                span.done(response)
+                return rejection
+    
+    def _dispatch(self, message: dict):
+        """Resuelve la petición pendiente con el id del mensaje, o lo pasa a on_notification."""
+        if "result" in message or "error" in message:
+            future = self._pending.get(message.get("id"))
+            if future is not None and not future.done():
+                future.set_result(message)
+            return
+        # Notificaciones (ej. progreso, list_changed) y peticiones del servidor
+        self.cache.handle_notification(message)
+        if self.on_notification is not None:
+            self.on_notification(message)
+    
+    async def call_tool(self, tool_name: str, **kwargs) -> dict[str, Any]:
+        """
+        Llama a una herramienta del servidor.
+        
+        Args:
+            tool_name: Nombre de la herramienta
+            **kwargs: Parámetros de la herramienta
             
-            # Parsear respuesta SSE
-            content = response.text
-            if 'text/event-stream' in response.headers.get('content-type', ''):
-                lines = content.strip().split('\n')
-                for line in lines:
-                    if line.startswith('data: '):
-                        data = line[6:]
-                        result = json.loads(data)
-                        # Extraer el contenido de texto
-                        if "result" in result:
-                            content_list = result["result"].get("content", [])
-                            if content_list and "text" in content_list[0]:
-                                return {"success": True, "text": content_list[0]["text"]}
-                        return result
+        Returns:
+            Resultado de la herramienta
+        """
+        if not self.session:
+            raise RuntimeError("No conectado al servidor")
+        
+        params = {"name": tool_name, "arguments": kwargs}
+        try:
+            key = self._cache_key(tool_name, kwargs)
+            if key is None:
+                result = await self.request("tools/call", params)
             else:
-                return response.json()
+                result = await self.cache.get_or_fetch(key, lambda: self.request("tools/call", params))
+            return self._tool_result(result)
         except Exception as e:
-            return {"error": str(e)}
+            return {"error": str(e), "error_class": error_class(e)}
+    
+    def _cache_key(self, tool_name: str, arguments: dict) -> Optional[str]:
+        """Clave de caché de la llamada, o None si la herramienta no es cacheable."""
+        if not is_cacheable_tool(tool_name, self.cacheable_tools, self._tool_annotations.get(tool_name)):
+            return None
+        return self.cache.key(self.server_url, "tools/call", tool_name, arguments)
+    
+    @staticmethod
+    def _tool_result(result: dict) -> dict[str, Any]:
+        """Extrae el contenido de texto de una respuesta tools/call."""
+        if "result" in result:
+            content_list = result["result"].get("content", [])
+            if content_list and "text" in content_list[0]:
+                return {"success": True, "text": content_list[0]["text"]}
+        return result
+    
+    async def call_tools_batch(
+        self,
+        calls: list[tuple[str, dict]],
+        timeout: float = 30.0
+    ) -> list[dict[str, Any]]:
+        """
+        Llama a varias herramientas con un solo request (batch JSON-RPC).
+        
+        Las llamadas cacheadas no viajan. Si el servidor rechaza el batch
+        (4xx o error sin id, ej. Invalid Request) nada se ejecutó: las
+        llamadas se hacen en paralelo una por una. Solo un 400 o un Invalid
+        Request sin id significan que el servidor no acepta batches: los
+        siguientes van directo por el camino individual (401/403/429 o un
+        batch respondido a medias no lo desactivan). Tras un error
+        transitorio (red, timeout, 5xx) o ids sin respuesta, el servidor pudo
+        haber ejecutado parte del batch: solo se reintentan las herramientas
+        sin efectos secundarios (allow-list o readOnlyHint); las demás
+        devuelven el error.
+        
+        Args:
+            calls: Lista de (nombre de herramienta, argumentos)
+            timeout: Timeout del batch en segundos
+            
+        Returns:
+            Resultados en el mismo orden que `calls` (mismo formato que call_tool)
+        """
+        if not self.session:
+            raise RuntimeError("No conectado al servidor")
+        
+        results: list[Optional[dict]] = [None] * len(calls)
+        if len(calls) > 1 and self.batch_supported is not False:
+            keys = [self._cache_key(name, arguments) for name, arguments in calls]
+            for i, key in enumerate(keys):
+                cached = self.cache.lookup(key) if key is not None else None
+                if cached is not None:
+                    results[i] = self._tool_result(cached)
+            pending = [i for i, result in enumerate(results) if result is None]
+        else:
+            pending = []
+        
+        sent: set[int] = set()
+        if len(pending) > 1:
+            sent.update(pending)
+            registered = [self._register() for _ in pending]
+            # Error de red, timeout o 5xx: no dice nada del soporte de batches.
+            # Rechazo (4xx o error sin id): el servidor no ejecutó nada.
+            # Sin soporte de batches: 400 o Invalid Request sin id
+            transient = False
+            rejected = False
+            unsupported = False
+            error: dict[str, Any] = {
+                "error": "El servidor no respondió la llamada del batch",
+                "error_class": "no_response"
+            }
+            try:
+                rejection = await self._post(
+                    [
+                        self._message(request_id, "tools/call", {"name": name, "arguments": arguments})
+                        for (request_id, _), (name, arguments) in zip(registered, (calls[i] for i in pending))
+                    ],
+                    timeout
+                )
+                rejected = rejection is not None
+                unsupported = rejected and (rejection.get("error") or {}).get("code") == -32600
+            except Exception as e:
+                response = getattr(e, "response", None)
+                transient = response is None or response.status_code >= 500
+                rejected = not transient
+                unsupported = response is not None and response.status_code == 400
+                error = {"error": str(e), "error_class": error_class(e)}
+            finally:
+                for request_id, _ in registered:
+                    self._pending.pop(request_id, None)
+            
+            for i, (_, future) in zip(pending, registered):
+                if future.done():
+                    message = future.result()
+                    if keys[i] is not None:
+                        self.cache.store(keys[i], message)
+                    results[i] = self._tool_result(message)
+            if all(result is not None for result in results):
+                self.batch_supported = True
+            elif unsupported:
+                self.batch_supported = False
+            
+            if not rejected:
+                # Pudieron ejecutarse: no se re-envían las que tienen efectos secundarios
+                for i in pending:
+                    if results[i] is None and keys[i] is None:
+                        results[i] = dict(error)
+        
+        missing = [i for i, result in enumerate(results) if result is None]
+        for i in missing:
+            if i in sent:
+                # Ya viajó en el batch: el envío individual es un reintento
+                self.metrics.retry("tools/call", calls[i][0])
+        individual = await asyncio.gather(*(self.call_tool(calls[i][0], **calls[i][1]) for i in missing))
+        for i, result in zip(missing, individual):
+            results[i] = result
+        return results
     
     async def list_tools(self) -> list[dict]:
         """
@@ -144,41 +383,22 @@ class MCPClient:
             raise RuntimeError("No conectado al servidor")
         
         try:
-            # FastMCP Cloud
-            url = self.server_url
-            if not url.endswith("/mcp"):
-                url = f"{url}/mcp"
-            
-            response = await self.session.post(
-                url,
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json",
-                    "Accept": "application/json, text/event-stream"
-                },
-                json={
-                    "jsonrpc": "2.0",
-                    "id": 1,
-                    "method": "tools/list",
-                    "params": {}
-                },
-                timeout=30.0
-            )
-            response.raise_for_status()
-            
-            content = response.text
-            if 'text/event-stream' in response.headers.get('content-type', ''):
-                lines = content.strip().split('\n')
-                for line in lines:
-                    if line.startswith('data: '):
-                        data = line[6:]
-                        return json.loads(data)
-            else:
-                return response.json()
+            result = await self.request("tools/list")
+            # Las anotaciones (ej. readOnlyHint) marcan qué herramientas se pueden cachear
+            for tool in result.get("result", {}).get("tools", []):
+                self._tool_annotations[tool["name"]] = tool.get("annotations") or {}
+            return result
         except Exception as e:
             print(f"Error al listar herramientas: {e}")
             return []
 
+async def print_batch(client: MCPClient, tests: list[tuple[str, str, dict]]):
+    """Ejecuta las pruebas [(etiqueta, herramienta, argumentos)] en un solo batch."""
+    results = await client.call_tools_batch([(tool, arguments) for _, tool, arguments in tests])
+    for (label, _, _), result in zip(tests, results):
+        print(f"\n{label}")
+        print(f"   Resultado: {json.dumps(result, indent=2)}")
+
 
 async def test_text_tools(client: MCPClient):
     """Prueba las herramientas de texto."""
@@ -186,31 +406,17 @@ async def test_text_tools(client: MCPClient):
     print("🔤 Pruebas de herramientas de TEXTO")
     print("=" * 60)
     
-    # Test 1: Analizar texto
-    print("\n📊 Prueba 1: analyze_text")
-    result = await client.call_tool(
-        "analyze_text",
-        text="Este es un texto de prueba para el servidor MCP"
-    )
-    print(f"   Resultado: {json.dumps(result, indent=2)}")
-    
-    # Test 2: Convertir texto
-    print("\n🔄 Prueba 2: convert_text")
-    result = await client.call_tool(
-        "convert_text",
-        text="Hola Mundo",
-        format="uppercase"
-    )
-    print(f"   Resultado: {json.dumps(result, indent=2)}")
-    
-    # Test 3: Contar caracteres
-    print("\n🔢 Prueba 3: count_character")
-    result = await client.call_tool(
-        "count_character",
-        text="Terrarium",
-        character="r"
-    )
-    print(f"   Resultado: {json.dumps(result, indent=2)}")
+    await print_batch(client, [
+        # Test 1: Analizar texto
+        ("📊 Prueba 1: analyze_text", "analyze_text",
+         {"text": "Este es un texto de prueba para el servidor MCP"}),
+        # Test 2: Convertir texto
+        ("🔄 Prueba 2: convert_text", "convert_text",
+         {"text": "Hola Mundo", "format": "uppercase"}),
+        # Test 3: Contar caracteres
+        ("🔢 Prueba 3: count_character", "count_character",
+         {"text": "Terrarium", "character": "r"}),
+    ])
 
 
 async def test_system_tools(client: MCPClient):
@@ -219,15 +425,12 @@ async def test_system_tools(client: MCPClient):
     print("⚙️ Pruebas de herramientas del SISTEMA")
     print("=" * 60)
     
-    # Test 1: Información del sistema
-    print("\n💻 Prueba 1: get_system_info")
-    result = await client.call_tool("get_system_info")
-    print(f"   Resultado: {json.dumps(result, indent=2)}")
-    
-    # Test 2: Información del entorno
-    print("\n🌍 Prueba 2: get_environment_info")
-    result = await client.call_tool("get_environment_info")
-    print(f"   Resultado: {json.dumps(result, indent=2)}")
+    await print_batch(client, [
+        # Test 1: Información del sistema
+        ("💻 Prueba 1: get_system_info", "get_system_info", {}),
+        # Test 2: Información del entorno
+        ("🌍 Prueba 2: get_environment_info", "get_environment_info", {}),
+    ])
 
 
 async def test_file_tools(client: MCPClient):
@@ -236,21 +439,15 @@ async def test_file_tools(client: MCPClient):
     print("📁 Pruebas de herramientas de ARCHIVOS")
     print("=" * 60)
     
-    # Test 1: Listar directorio
+    # Test 1: Listar directorio y Test 2: Leer archivo (independientes: un batch)
+    listing, result = await client.call_tools_batch([
+        ("list_directory", {"directory": "."}),
+        ("read_file", {"file_path": "README.md", "lines": 5}),
+    ])
     print("\n📂 Prueba 1: list_directory")
-    result = await client.call_tool(
-        "list_directory",
-        directory="."
-    )
-    print(f"   Resultado: {json.dumps(result, indent=2)}")
+    print(f"   Resultado: {json.dumps(listing, indent=2)}")
     
-    # Test 2: Leer archivo
     print("\n📖 Prueba 2: read_file (README.md)")
-    result = await client.call_tool(
-        "read_file",
-        file_path="README.md",
-        lines=5
-    )
     # read_file retorna el contenido como string en la clave "text"
     if "error" in result:
         print(f"   Error: {result['error']}")
@@ -267,23 +464,14 @@ async def test_data_generation_tools(client: MCPClient):
     print("🎲 Pruebas de herramientas de GENERACIÓN DE DATOS")
     print("=" * 60)
     
-    # Test 1: Generar emails
-    print("\n📧 Prueba 1: generate_sample_data (emails)")
-    result = await client.call_tool(
-        "generate_sample_data",
-        data_type="emails",
-        count=3
-    )
-    print(f"   Resultado: {json.dumps(result, indent=2)}")
-    
-    # Test 2: Generar números
-    print("\n🔢 Prueba 2: generate_sample_data (numbers)")
-    result = await client.call_tool(
-        "generate_sample_data",
-        data_type="numbers",
-        count=5
-    )
-    print(f"   Resultado: {json.dumps(result, indent=2)}")
+    await print_batch(client, [
+        # Test 1: Generar emails
+        ("📧 Prueba 1: generate_sample_data (emails)", "generate_sample_data",
+         {"data_type": "emails", "count": 3}),
+        # Test 2: Generar números
+        ("🔢 Prueba 2: generate_sample_data (numbers)", "generate_sample_data",
+         {"data_type": "numbers", "count": 5}),
+    ])
 
 
 async def interactive_mode(client: MCPClient):
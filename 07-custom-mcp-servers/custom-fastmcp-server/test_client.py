@@ -0,0 +1,160 @@
+"""Tests de MCPClient con un transporte simulado (sin red)"""
+
+import asyncio
+
+import pytest
+
+from client import MCPClient
+from common.mcp_cache import ResultCache
+from common.mcp_metrics import Metrics
+
+
+class HTTPError(Exception):
+    """Error con `response.status_code`, como httpx.HTTPStatusError."""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.response = type("Response", (), {"status_code": status_code})()
+
+
+def text_result(request_id, text):
+    return {"jsonrpc": "2.0", "id": request_id, "result": {"content": [{"type": "text", "text": text}]}}
+
+
+INVALID_REQUEST = {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "Invalid Request"}}
+
+
+class FakeClient(MCPClient):
+    """
+    MCPClient cuyo `_post` responde a los batches según `batch`: "ok", un
+    código HTTP (int), "timeout", "invalid" (error sin id) o "partial" (solo
+    el primer id); y a las peticiones sueltas según `single`: "ok",
+    "invalid" o "empty" (el stream termina sin la respuesta).
+    """
+
+    def __init__(self, batch="ok", single="ok", cacheable_tools=("analyze_text",)):
+        super().__init__(
+            "http://mcp.test", "fmcp_test", cache=ResultCache(16, 60),
+            cacheable_tools=cacheable_tools, metrics=Metrics(),
+        )
+        self.session = object()
+        self.batch = batch
+        self.single = single
+        self.sent = []   # ("batch", [nombres]) o ("single", nombre)
+
+    async def _post(self, payload, timeout):
+        if isinstance(payload, list):
+            self.sent.append(("batch", [message["params"]["name"] for message in payload]))
+            if self.batch == "timeout":
+                raise asyncio.TimeoutError()
+            if isinstance(self.batch, int):
+                raise HTTPError(self.batch)
+            if self.batch == "invalid":
+                return INVALID_REQUEST
+            messages = payload[:1] if self.batch == "partial" else payload
+            for message in messages:
+                self._dispatch(text_result(message["id"], "batch"))
+            return None
+        self.sent.append(("single", payload["params"]["name"]))
+        if self.single == "invalid":
+            return INVALID_REQUEST
+        if self.single == "ok":
+            self._dispatch(text_result(payload["id"], "single"))
+        return None
+
+
+CALLS = [("analyze_text", {"text": "hola"}), ("write_file", {"path": "a.txt"}), ("get_system_info", {})]
+
+
+def retries(client):
+    return {
+        dict(labels)["tool"]: value
+        for labels, value in client.metrics._counters.get("mcp_retries_total", {}).items()
+    }
+
+
+@pytest.mark.parametrize("batch", ["invalid", 400])
+def test_rejected_batch_is_resent_individually_and_counted(batch):
+    client = FakeClient(batch=batch)
+    results = asyncio.run(client.call_tools_batch(CALLS))
+    assert [result["text"] for result in results] == ["single"] * 3
+    assert retries(client) == {"analyze_text": 1, "write_file": 1, "get_system_info": 1}
+
+
+def test_transient_failure_only_resends_cacheable_tools():
+    client = FakeClient(batch="timeout")
+    results = asyncio.run(client.call_tools_batch(CALLS))
+    assert results[0]["text"] == "single"
+    assert [result["error_class"] for result in results[1:]] == ["timeout", "timeout"]
+    assert retries(client) == {"analyze_text": 1}
+
+
+def test_successful_batch_counts_no_retries():
+    client = FakeClient()
+    results = asyncio.run(client.call_tools_batch(CALLS))
+    assert [result["text"] for result in results] == ["batch"] * 3
+    assert retries(client) == {}
+    assert client.sent == [("batch", ["analyze_text", "write_file", "get_system_info"])]
+
+
+def test_single_call_is_not_a_retry():
+    client = FakeClient(batch="invalid")
+    results = asyncio.run(client.call_tools_batch(CALLS[:1]))
+    assert results[0]["text"] == "single"
+    assert retries(client) == {}
+    assert client.sent == [("single", "analyze_text")]
+
+
+def test_request_returns_the_rejection():
+    client = FakeClient(single="invalid")
+    result = asyncio.run(client.call_tool("write_file", path="a.txt"))
+    assert result["error"] == INVALID_REQUEST["error"]
+    assert client._pending == {}
+
+
+def test_request_fails_fast_when_the_stream_ends_without_its_id():
+    client = FakeClient(single="empty")
+
+    async def main():
+        # Otra petición en vuelo no hace esperar el timeout completo
+        client._register()
+        return await asyncio.wait_for(client.request("tools/call", {"name": "write_file"}, timeout=30), 1)
+
+    with pytest.raises(ValueError, match="no respondió"):
+        asyncio.run(main())
+
+
+@pytest.mark.parametrize(
+    "batch, supported",
+    [("ok", True), ("invalid", False), (400, False), (401, None), (429, None), (503, None), ("partial", None)],
+)
+def test_only_a_definitive_rejection_disables_batches(batch, supported):
+    client = FakeClient(batch=batch)
+    asyncio.run(client.call_tools_batch(CALLS))
+    assert client.batch_supported is supported
+
+
+def test_batch_is_re_enabled_after_a_later_success():
+    client = FakeClient(batch=429)
+
+    async def main():
+        await client.call_tools_batch(CALLS)
+        client.batch = "ok"
+        return await client.call_tools_batch(CALLS)
+
+    # analyze_text ya quedó cacheado por su reintento individual
+    assert [result["text"] for result in asyncio.run(main())] == ["single", "batch", "batch"]
+    assert client.sent[-1] == ("batch", ["write_file", "get_system_info"])
+    assert client.batch_supported is True
+
+
+def test_batch_uses_the_cache_counters():
+    client = FakeClient()
+
+    async def main():
+        await client.call_tools_batch(CALLS)
+        await client.call_tools_batch(CALLS)
+
+    asyncio.run(main())
+    assert client.cache.stats() == {"entries": 1, "hits": 1, "misses": 1}
+    assert client.sent[1] == ("batch", ["write_file", "get_system_info"])
@@ -0,0 +1,117 @@
+"""
+Búsqueda Multi-Patrón (Aho-Corasick)
+====================================
+
+Autómata que encuentra todas las apariciones de un conjunto de patrones en
+una sola pasada lineal por el texto, sin importar cuántos patrones haya.
+Lo usa CompletitudMetric para los conjuntos de conceptos grandes (desde
+AUTOMATON_MIN_CONCEPTS, ej. referencias largas): el costo deja de crecer con
+la cantidad de conceptos, a diferencia de un `concept in text` por concepto.
+Con pocos patrones, los `in` de C son más rápidos que recorrer el autómata.
+
+- matches(text): índices de los patrones presentes (como `p in text`)
+- matches_in(pieces): lo mismo sobre varios fragmentos (ej. palabras),
+  memorizando los hits de cada fragmento ya visto
+- count(text): apariciones sin solapamiento por patrón (como `text.count(p)`)
+
+Ejemplo de uso:
+    automaton = AhoCorasick(["energía", "luz", "planta"])
+    automaton.matches("las plantas convierten luz")      # {1, 2}
+    AhoCorasick([" y ", "¿"]).count("¿Qué es? ¿Y la luz y el sol?")  # [1, 2]
+"""
+
+from collections import deque
+from typing import Dict, FrozenSet, Iterable, List, Sequence, Set, Tuple
+
+
+class AhoCorasick:
+    """Trie de patrones con enlaces de fallo, construido una sola vez."""
+
+    def __init__(self, patterns: Sequence[str], memo_size: int = 65536):
+        self.patterns = list(patterns)
+        self.memo_size = memo_size
+        self._memo: Dict[str, FrozenSet[int]] = {}
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[int, ...]] = [()]
+
+        for index, pattern in enumerate(self.patterns):
+            if not pattern:
+                raise ValueError("los patrones no pueden ser vacíos")
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                state = next_state
+            self._out[state] += (index,)
+
+        # Enlaces de fallo por BFS: cada estado hereda las salidas de su fallo
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._out[child] += self._out[self._fail[child]]
+
+    def _scan(self, text: str, found: Set[int]) -> None:
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found.update(out[state])
+
+    def matches(self, text: str) -> Set[int]:
+        """Índices de los patrones que aparecen en `text`."""
+        found: Set[int] = set()
+        self._scan(text, found)
+        return found
+
+    def matches_in(self, pieces: Iterable[str]) -> Set[int]:
+        """
+        Índices de los patrones que aparecen dentro de alguno de `pieces`.
+
+        Si ningún patrón puede cruzar de un fragmento a otro (ej. patrones
+        de solo letras buscados en el set de palabras del texto), equivale
+        a matches(text). Cada fragmento se recorre una sola vez en la vida
+        del autómata: las palabras se repiten mucho entre respuestas.
+        """
+        found: Set[int] = set()
+        memo = self._memo
+        for piece in pieces:
+            hits = memo.get(piece)
+            if hits is None:
+                hits = frozenset(self.matches(piece))
+                if len(memo) >= self.memo_size:
+                    memo.clear()
+                memo[piece] = hits
+            found |= hits
+        return found
+
+    def count(self, text: str) -> List[int]:
+        """Apariciones sin solapamiento de cada patrón, igual que `text.count(p)`."""
+        goto, fail, out = self._goto, self._fail, self._out
+        counts = [0] * len(self.patterns)
+        next_free = [0] * len(self.patterns)
+        state = 0
+        for position, char in enumerate(text, 1):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in out[state]:
+                start = position - len(self.patterns[index])
+                if start >= next_free[index]:
+                    counts[index] += 1
+                    next_free[index] = position
+        return counts
@@ -0,0 +1,251 @@
+"""
+Juez de Faithfulness por Lotes
+==============================
+
+Faithfulness de Ragas hace, por cada fila, una llamada para extraer las
+afirmaciones de la respuesta y otra para verificarlas contra los
+contextos. Con datasets grandes eso son 2 requests por fila compitiendo
+por el rate limit.
+
+BatchedFaithfulness junta varias filas (las que llegan dentro de
+`max_delay` segundos, hasta `batch_size`) en un único prompt estructurado
+que extrae y verifica las afirmaciones de todas a la vez, y devuelve a
+cada fila su propio score:
+
+    score = afirmaciones respaldadas por los contextos / afirmaciones totales
+
+Las filas que el juez omite o devuelve mal formadas se re-evalúan con
+`fallback` (ej. la métrica Faithfulness de Ragas), fila por fila. Si el
+request del lote falla (rate limit o red, ya agotados los reintentos), cada
+fila recibe su propio BatchError con ese error como causa: re-evaluarlas una
+por una multiplicaría los requests contra la misma API limitada.
+La paridad con el camino sin lotes se mide con
+benchmarks/bench_faithfulness_batching.py.
+
+Ejemplo de uso:
+    judge = BatchedFaithfulness(
+        AsyncOpenAI(), model="gpt-4o-mini", batch_size=8,
+        fallback=Faithfulness(llm=async_llm),
+    )
+    score = await judge.ascore(user_input=q, response=a, retrieved_contexts=ctx)
+    ...
+    judge.close()   # al terminar: cancela el flush programado y lo pendiente
+"""
+
+import asyncio
+import json
+import math
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+SYSTEM_PROMPT = """You are a strict faithfulness judge for a RAG system.
+You receive a JSON object with a list of items. Each item has an "id", a "question", an "answer" and the "contexts" retrieved for it.
+For EACH item independently:
+1. Break the answer down into standalone factual statements (resolve pronouns, one claim per statement). Do not add statements that are not in the answer.
+2. For each statement, decide if it can be directly inferred from that item's contexts only: verdict 1 if it can, 0 if it cannot.
+Never use the contexts of one item to judge another item.
+Respond with JSON only, in this exact format:
+{"items": [{"id": "<id>", "statements": [{"statement": "<text>", "verdict": 0 or 1}]}]}
+Include every item id exactly once, in any order."""
+
+
+def parse_scores(payload: Dict[str, Any], num_items: int) -> List[Optional[float]]:
+    """
+    Score por ítem a partir de la respuesta JSON del juez.
+
+    None para los ítems ausentes o mal formados; NaN si la respuesta no
+    tiene afirmaciones (igual que Faithfulness de Ragas).
+    """
+    scores: List[Optional[float]] = [None] * num_items
+    items = payload.get("items") if isinstance(payload, dict) else None
+    if not isinstance(items, list):
+        return scores
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        try:
+            index = int(item.get("id"))
+        except (TypeError, ValueError):
+            continue
+        statements = item.get("statements")
+        if not 0 <= index < num_items or not isinstance(statements, list):
+            continue
+        verdicts = [s.get("verdict") for s in statements if isinstance(s, dict)]
+        if len(verdicts) != len(statements) or any(v not in (0, 1) for v in verdicts):
+            continue
+        scores[index] = sum(verdicts) / len(verdicts) if verdicts else math.nan
+    return scores
+
+
+class BatchError(Exception):
+    """Falló el request del lote de la fila `row_index`; la causa es el error original."""
+
+    def __init__(self, row_index: int, cause: BaseException):
+        super().__init__(f"Falló el request del lote (fila {row_index}): {cause}")
+        self.row_index = row_index
+        self.__cause__ = cause
+
+
+class BatchedFaithfulness:
+    """
+    Faithfulness con un request al juez por lote de filas.
+
+    La interfaz es la de las métricas de Ragas (`ascore(**inputs)`), así que
+    puede envolverse con CachedMetric. `call` envuelve cada request real
+    (ej. runner.call con rate limit y reintentos) y recibe los tokens
+    estimados del lote completo.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        model: str = "gpt-4o-mini",
+        batch_size: int = 8,
+        max_delay: float = 0.2,
+        temperature: float = 0,
+        call: Optional[Callable[..., Awaitable[Any]]] = None,
+        fallback: Any = None,
+        tokens_per_row: int = 1500,
+    ):
+        if batch_size < 1:
+            raise ValueError("batch_size debe ser >= 1")
+        self.client = client
+        self.model = model
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.temperature = temperature
+        self.call = call
+        self.fallback = fallback
+        self.tokens_per_row = tokens_per_row
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+        # Estadísticas: requests al juez, filas evaluadas en lote, re-evaluadas
+        # sin lote y lotes cuyo request falló
+        self.requests = 0
+        self.rows = 0
+        self.fallbacks = 0
+        self.failed_batches = 0
+
+    async def ascore(self, user_input: str, response: str, retrieved_contexts: List[str]) -> float:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        item = {"user_input": user_input, "response": response, "retrieved_contexts": retrieved_contexts}
+        entry = (item, future)
+        self._pending.append(entry)
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_delay, self._flush)
+        try:
+            return await future
+        except asyncio.CancelledError:
+            # Fila cancelada antes del flush: sale del lote (y el timer, si queda vacío)
+            if entry in self._pending:
+                self._pending.remove(entry)
+                if not self._pending and self._flush_handle is not None:
+                    self._flush_handle.cancel()
+                    self._flush_handle = None
+            raise
+
+    def close(self) -> None:
+        """Cancela el flush programado, las filas pendientes y los lotes en curso."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, []
+        for _, future in pending:
+            future.cancel()
+        for task in list(self._tasks):
+            task.cancel()
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._score_batch(batch))
+        # Referencia fuerte hasta que termine (el event loop solo guarda una débil)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _score_batch(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]) -> None:
+        items = [item for item, _ in batch]
+        try:
+            scores: List[Any] = await self._judge(items)
+        except asyncio.CancelledError:
+            # close() con el lote en curso: las filas que lo esperan también se cancelan
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            # Error del request (no de formato): sin re-evaluar fila por fila. Cada
+            # fila recibe su propia excepción (un traceback por await, no compartido)
+            self.failed_batches += 1
+            scores = [BatchError(i, e) for i in range(len(items))]
+
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing and self.fallback is not None:
+            self.fallbacks += len(missing)
+            results = await asyncio.gather(
+                *(self._score_unbatched(items[i]) for i in missing), return_exceptions=True
+            )
+            for i, result in zip(missing, results):
+                scores[i] = result
+
+        for (_, future), score in zip(batch, scores):
+            if future.done():
+                continue
+            if isinstance(score, BaseException):
+                future.set_exception(score)
+            elif score is None:
+                future.set_exception(ValueError("El juez no devolvió un score para la fila"))
+            else:
+                future.set_result(score)
+
+    async def _judge(self, items: List[Dict[str, Any]]) -> List[Optional[float]]:
+        """Un request para todo el lote; None en los ítems que no se pudieron reconciliar."""
+        payload = {
+            "items": [
+                {
+                    "id": str(i),
+                    "question": item["user_input"],
+                    "answer": item["response"],
+                    "contexts": item["retrieved_contexts"],
+                }
+                for i, item in enumerate(items)
+            ]
+        }
+
+        async def request():
+            return await self.client.chat.completions.create(
+                model=self.model,
+                temperature=self.temperature,
+                response_format={"type": "json_object"},
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": json.dumps(payload, ensure_ascii=False)},
+                ],
+            )
+
+        if self.call is not None:
+            completion = await self.call(request, estimated_tokens=self.tokens_per_row * len(items))
+        else:
+            completion = await request()
+        self.requests += 1
+        self.rows += len(items)
+
+        try:
+            content = json.loads(completion.choices[0].message.content or "")
+        except (json.JSONDecodeError, AttributeError, IndexError, TypeError):
+            # Respuesta mal formada: todas las filas pasan al fallback
+            return [None] * len(items)
+        return parse_scores(content, len(items))
+
+    async def _score_unbatched(self, item: Dict[str, Any]) -> float:
+        if self.call is not None:
+            result = await self.call(self.fallback.ascore, estimated_tokens=self.tokens_per_row, **item)
+        else:
+            result = await self.fallback.ascore(**item)
+        return float(getattr(result, "value", result))
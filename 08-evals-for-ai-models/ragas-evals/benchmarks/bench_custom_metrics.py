@@ -0,0 +1,117 @@
+"""
+Benchmark de métricas personalizadas
+====================================
+
+Compara, sobre N respuestas sintéticas, la implementación original de las
+métricas (benchmarks/baseline_metrics.py) contra la actual de
+custom_metrics.py, ambas fila por fila (`await metric._ascore(row)`, como
+lo hace evals.py), y verifica que den exactamente los mismos scores. Cada tiempo es el mínimo de
+`--repeat` corridas, con los caches de análisis vacíos al empezar cada una.
+La última línea evalúa las 3 métricas por fila, compartiendo el análisis
+de text_stats.analyze() entre ellas (como en evals.py).
+
+Uso:
+    python benchmarks/bench_custom_metrics.py            # 100k respuestas
+    python benchmarks/bench_custom_metrics.py --rows 10000 --repeat 5
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import baseline_metrics
+from custom_metrics import ClaridadMetric, CompletitudMetric, FormalidadMetric
+from rag import DOCUMENTS
+from text_stats import analyze
+
+INFORMAL_SNIPPETS = [
+    "ok, genial!!", "creo que es super importante", "pues bueno", "un montón de cosas",
+    "vamos a ver 👍", "q onda", "pa que sirve", "¿sabías??", "hey, muy muy bueno 🔥",
+]
+QUESTIONS = [
+    "¿Cuál fue el impacto de la Revolución Industrial en la sociedad?",
+    "¿Cuál es el proceso de fotosíntesis en las plantas?",
+    "¿Qué es el cambio climático y cuáles son sus causas principales?",
+    "¿Cuál fue el papel de Ada Lovelace en la historia de la informática?",
+    "¿Cuáles son los beneficios del ejercicio regular para la salud?",
+]
+
+
+def make_rows(n: int, seed: int = 42) -> list:
+    """Genera filas sintéticas mezclando oraciones de DOCUMENTS y muletillas."""
+    rng = random.Random(seed)
+    sentences = [s.strip() for doc in DOCUMENTS for s in doc.split(".") if s.strip()]
+    rows = []
+    for i in range(n):
+        parts = rng.sample(sentences, rng.randint(2, 6))
+        if rng.random() < 0.3:
+            parts.insert(rng.randrange(len(parts) + 1), rng.choice(INFORMAL_SNIPPETS))
+        rows.append({
+            "user_input": QUESTIONS[i % len(QUESTIONS)],
+            "response": ". ".join(parts) + ".",
+            "reference": DOCUMENTS[i % len(DOCUMENTS)],
+        })
+    return rows
+
+
+def clear_caches() -> None:
+    analyze.cache_clear()
+    CompletitudMetric._question_concepts.cache_clear()
+    CompletitudMetric._reference_concepts.cache_clear()
+
+
+async def score_per_row(metric, rows):
+    return [await metric._ascore(row) for row in rows]
+
+
+def timed(fn, repeat: int):
+    """(mínimo de `repeat` corridas en segundos, resultado de la última)."""
+    best = float("inf")
+    for _ in range(repeat):
+        clear_caches()
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    print(f"Filas: {len(rows):,} (mínimo de {args.repeat} corridas)\n")
+    print(f"{'Métrica':<24}{'original (s)':>14}{'actual (s)':>12}{'speedup':>10}")
+
+    pairs = [
+        (baseline_metrics.FormalidadMetric(name="formalidad_tono"), FormalidadMetric(name="formalidad_tono")),
+        (baseline_metrics.CompletitudMetric(name="completitud_respuesta"), CompletitudMetric(name="completitud_respuesta")),
+        (baseline_metrics.ClaridadMetric(name="claridad_concision"), ClaridadMetric(name="claridad_concision")),
+    ]
+    for original, metric in pairs:
+        original_s, expected = timed(lambda: asyncio.run(score_per_row(original, rows)), args.repeat)
+        per_row_s, got = timed(lambda: asyncio.run(score_per_row(metric, rows)), args.repeat)
+
+        name = type(metric).__name__
+        assert got == expected, f"{name}: los scores difieren de la implementación original"
+        print(f"{name:<24}{original_s:>14.2f}{per_row_s:>12.2f}{original_s / per_row_s:>9.2f}x")
+
+    async def all_per_row(metrics):
+        for row in rows:
+            for metric in metrics:
+                await metric._ascore(row)
+
+    original_s, _ = timed(lambda: asyncio.run(all_per_row([original for original, _ in pairs])), args.repeat)
+    all_s, _ = timed(lambda: asyncio.run(all_per_row([metric for _, metric in pairs])), args.repeat)
+    print(f"{'3 métricas por fila':<24}{original_s:>14.2f}{all_s:>12.2f}{original_s / all_s:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
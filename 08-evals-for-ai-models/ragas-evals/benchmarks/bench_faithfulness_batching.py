@@ -0,0 +1,101 @@
+"""
+Benchmark de paridad del juez de Faithfulness por lotes
+=======================================================
+
+Evalúa las mismas filas con Faithfulness de Ragas (un juicio por fila) y
+con BatchedFaithfulness (un request por lote), y compara scores, requests
+al juez y tiempo total. Las respuestas mezclan oraciones de los contextos
+con oraciones de otros documentos, para cubrir todo el rango de scores.
+
+Requiere OPENAI_API_KEY (hace llamadas reales al LLM).
+
+Uso:
+    python benchmarks/bench_faithfulness_batching.py
+    python benchmarks/bench_faithfulness_batching.py --rows 40 --batch-size 8
+"""
+
+import argparse
+import asyncio
+import math
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from batched_judge import BatchedFaithfulness
+from evals import _load_api_key
+from rag import DOCUMENTS
+
+
+def make_rows(n: int, seed: int = 42) -> list:
+    """Filas con 0-2 oraciones respaldadas y 0-2 sin respaldo en los contextos."""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        contexts = rng.sample(DOCUMENTS, 3)
+        others = [doc for doc in DOCUMENTS if doc not in contexts]
+        supported = rng.sample(contexts, rng.randint(0, 2))
+        unsupported = rng.sample(others, rng.randint(0 if supported else 1, 2))
+        rows.append({
+            "user_input": f"Pregunta {i}: ¿qué dicen los documentos?",
+            "response": " ".join(supported + unsupported),
+            "retrieved_contexts": contexts,
+        })
+    return rows
+
+
+async def score_all(metric, rows, concurrency: int) -> list:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def score(row):
+        async with semaphore:
+            result = await metric.ascore(**row)
+            return float(getattr(result, "value", result))
+
+    return await asyncio.gather(*(score(row) for row in rows))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=24)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    from openai import AsyncOpenAI
+    from ragas.llms import llm_factory
+    from ragas.metrics.collections import Faithfulness
+
+    client = AsyncOpenAI(api_key=_load_api_key())
+    llm = llm_factory("gpt-4o-mini", client=client)
+    llm.temperature = 0
+    llm.top_p = 1
+    rows = make_rows(args.rows)
+
+    start = time.perf_counter()
+    unbatched = await score_all(Faithfulness(llm=llm), rows, args.concurrency)
+    unbatched_time = time.perf_counter() - start
+
+    judge = BatchedFaithfulness(client, batch_size=args.batch_size, fallback=Faithfulness(llm=llm))
+    start = time.perf_counter()
+    batched = await score_all(judge, rows, args.concurrency)
+    batched_time = time.perf_counter() - start
+
+    pairs = [(a, b) for a, b in zip(unbatched, batched) if not (math.isnan(a) or math.isnan(b))]
+    differences = [abs(a - b) for a, b in pairs]
+
+    print(f"{'':<28}{'sin lotes':>12}{'por lotes':>12}")
+    print(f"{'requests al juez':<28}{'~' + str(2 * len(rows)):>12}{judge.requests:>12}")
+    print(f"{'tiempo total (s)':<28}{unbatched_time:>12.2f}{batched_time:>12.2f}")
+    print(f"{'faithfulness promedio':<28}{statistics.fmean(a for a, _ in pairs):>12.3f}"
+          f"{statistics.fmean(b for _, b in pairs):>12.3f}")
+    print(f"\nFilas comparables: {len(pairs)}/{len(rows)} (re-evaluadas sin lote: {judge.fallbacks})")
+    print(f"Diferencia absoluta media: {statistics.fmean(differences):.3f}")
+    print(f"Diferencia absoluta máxima: {max(differences):.3f}")
+    print(f"Filas con diferencia > 0.2: {sum(d > 0.2 for d in differences)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
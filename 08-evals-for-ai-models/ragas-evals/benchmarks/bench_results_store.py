@@ -0,0 +1,83 @@
+"""
+Benchmark del almacenamiento columnar de resultados
+===================================================
+
+Escribe N filas sintéticas de experimento con ResultsStore (en varios
+append() y varios experimentos) y mide cargar, filtrar y agregar.
+
+Uso:
+    python benchmarks/bench_results_store.py            # 300k filas
+    python benchmarks/bench_results_store.py --rows 50000
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import pyarrow.dataset as ds
+
+from rag import DOCUMENTS
+from results_store import SCORE_COLUMNS, ResultsStore
+
+
+def make_rows(n: int, seed: int = 42) -> list:
+    """Filas con la forma de experiment_view en evals.py."""
+    rng = random.Random(seed)
+    return [
+        {
+            "question": f"Pregunta {i % 1000}",
+            "references": [DOCUMENTS[i % len(DOCUMENTS)]],
+            "response": DOCUMENTS[(i + 1) % len(DOCUMENTS)],
+            "contexts": rng.sample(DOCUMENTS, 3),
+            **{column: rng.random() for column in SCORE_COLUMNS},
+            "log_file": f"logs/rag_run_{i}.json",
+        }
+        for i in range(n)
+    ]
+
+
+def timed(label: str, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label:<40}{time.perf_counter() - start:>8.2f} s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=300_000)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--chunk", type=int, default=50_000)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    print(f"Filas: {len(rows):,} en {args.runs} experimentos\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ResultsStore(tmp)
+
+        def write():
+            for i in range(0, len(rows), args.chunk):
+                store.append(f"exp_{(i // args.chunk) % args.runs}", rows[i : i + args.chunk])
+
+        timed("append (chunks)", write)
+        df = timed("load completo", store.load)
+        assert len(df) == len(rows)
+        timed("load scores (solo columnas numéricas)", lambda: store.load(columns=["run", *SCORE_COLUMNS]))
+        low = timed(
+            "load filtrado (faithfulness < 0.1)",
+            lambda: store.load(runs=["exp_0"], filter=ds.field("faithfulness") < 0.1),
+        )
+        print(f"{'':<40}{len(low):>8,} filas")
+        timed(
+            "agregado por experimento",
+            lambda: store.load(columns=["run", *SCORE_COLUMNS]).groupby("run")[SCORE_COLUMNS].agg(["mean", "median"]),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark de arranque de evals.py
+=================================
+
+Mide el tiempo de arranque de los modos livianos de evals.py (--help,
+--validate) y muestra el perfil de importación (`python -X importtime`):
+los módulos con mayor tiempo acumulado. Como referencia, mide también
+cuánto cuesta importar el stack completo de evaluación, que evals.py
+ahora carga solo al ejecutar el experimento o el reporte.
+
+Uso:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --repeat 10 --top 20
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ["ragas", "openai", "pandas", "pyarrow", "matplotlib.pyplot"]
+
+
+def wall_time(args, repeat: int) -> float:
+    """Mediana del tiempo total (proceso nuevo) de `python <args>`."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=ROOT, check=True, capture_output=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def import_profile(args):
+    """[(acumulado_us, módulo)] de `python -X importtime <args>`, de mayor a menor."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # "import time:   self_us | cumulative_us | módulo"
+        _self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), name.strip()))
+    return sorted(rows, reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    print(f"{'Comando':<48}{'mediana (s)':>12}")
+    for command in (["evals.py", "--help"], ["evals.py", "--validate"], ["-c", "pass"]):
+        print(f"{'python ' + ' '.join(command):<48}{wall_time(command, args.repeat):>12.3f}")
+
+    print(f"\nPerfil de importación de `evals.py --help` (top {args.top}, acumulado):")
+    for cumulative_us, name in import_profile(["evals.py", "--help"])[: args.top]:
+        print(f"  {cumulative_us / 1000:>8.1f} ms  {name}")
+
+    print("\nReferencia: stack completo (se importa solo al evaluar o reportar)")
+    for module in HEAVY_MODULES:
+        try:
+            seconds = wall_time(["-c", f"import {module}"], 1)
+        except subprocess.CalledProcessError:
+            print(f"  {module:<20} no instalado")
+            continue
+        print(f"  {module:<20}{seconds:>8.3f} s")
+
+
+if __name__ == "__main__":
+    main()
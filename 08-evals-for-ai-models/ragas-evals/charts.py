@@ -0,0 +1,233 @@
+"""
+Gráficos del Reporte de Evaluación
+==================================
+
+Genera los 3 PNG del reporte (comparación, promedios y heatmap) sin
+ventana (backend Agg). matplotlib se importa recién al dibujar, así que
+importar este módulo no cuesta nada si no se piden gráficos.
+
+- Hasta `max_rows` preguntas: una barra y una celda por pregunta
+- Con más preguntas: histogramas por métrica y un heatmap de métrica x
+  rango de score (el tamaño del gráfico ya no depende de N)
+
+submit_render() envía el dibujo a un único proceso de gráficos (se crea al
+primer uso y se reutiliza), para que evals.py imprima el reporte y guarde
+los resultados mientras tanto. Los gráficos usan los scores finales, así que
+se envían cuando termina la evaluación. shutdown() cierra el proceso.
+
+Ejemplo de uso:
+    future = submit_render(scores, averages, global_avg)
+    ...
+    for label, path in future.result():
+        print(label, path)
+    shutdown()
+"""
+
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Columna -> (etiqueta, etiqueta larga, color), en el orden del reporte
+METRIC_STYLES = {
+    "faithfulness": ("Faithfulness", "Faithfulness\n(RAGAS)", "#3498db"),
+    "formalidad": ("Formalidad", "Formalidad\ndel Tono", "#9b59b6"),
+    "completitud": ("Completitud", "Completitud\nde Respuesta", "#2ecc71"),
+    "claridad": ("Claridad", "Claridad y\nConcisión", "#f39c12"),
+}
+BACKGROUND = "#f8f9fa"
+EDGE = "#2c3e50"
+SCORE_BINS = 10
+
+# Proceso de gráficos compartido (ver submit_render)
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _pyplot():
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    return plt
+
+
+def _save(plt, fig, path: Path) -> Path:
+    plt.tight_layout()
+    fig.savefig(path, dpi=300, bbox_inches="tight", facecolor=BACKGROUND)
+    plt.close(fig)
+    return path
+
+
+def _comparison_bars(plt, scores: Dict[str, List[float]], global_avg: float, path: Path) -> Path:
+    """Una barra por pregunta y métrica (pocas preguntas)."""
+    fig, ax = plt.subplots(figsize=(16, 10))
+    fig.patch.set_facecolor(BACKGROUND)
+
+    n = len(next(iter(scores.values())))
+    x = range(1, n + 1)
+    width = 0.2
+    for offset, (column, values) in zip((-1.5, -0.5, 0.5, 1.5), scores.items()):
+        label, _, color = METRIC_STYLES[column]
+        ax.bar([i + offset * width for i in x], values, width,
+               label=label, color=color, edgecolor=EDGE, linewidth=1.5)
+
+    # Línea de promedio global
+    ax.axhline(y=global_avg, color='#e74c3c', linestyle='--', linewidth=2.5,
+               label=f'Promedio Global: {global_avg:.3f}', alpha=0.7)
+
+    ax.set_xlabel('Número de Pregunta', fontsize=13, fontweight='bold')
+    ax.set_ylabel('Score', fontsize=13, fontweight='bold')
+    ax.set_title('📊 Comparación de Métricas por Pregunta', fontsize=16, fontweight='bold', pad=20)
+    ax.set_ylim([0, 1.1])
+    ax.set_xticks(x)
+    ax.grid(axis='y', alpha=0.3, linestyle='--')
+    ax.legend(fontsize=11, loc='upper right', framealpha=0.9)
+    return _save(plt, fig, path)
+
+
+def _comparison_histograms(plt, scores: Dict[str, List[float]], global_avg: float, path: Path) -> Path:
+    """Distribución de cada métrica (muchas preguntas)."""
+    import numpy as np
+
+    fig, axes = plt.subplots(2, 2, figsize=(16, 10), sharex=True)
+    fig.patch.set_facecolor(BACKGROUND)
+    bins = np.linspace(0, 1, 21)
+
+    n = len(next(iter(scores.values())))
+    for ax, (column, values) in zip(axes.flat, scores.items()):
+        label, _, color = METRIC_STYLES[column]
+        values = np.asarray(values, dtype=float)
+        ax.hist(values, bins=bins, color=color, edgecolor=EDGE, linewidth=1)
+        ax.axvline(values.mean(), color=EDGE, linestyle='-', linewidth=2, label=f'Promedio: {values.mean():.3f}')
+        ax.axvline(global_avg, color='#e74c3c', linestyle='--', linewidth=2, alpha=0.7,
+                   label=f'Promedio Global: {global_avg:.3f}')
+        ax.set_title(label, fontsize=13, fontweight='bold')
+        ax.set_ylabel('Preguntas', fontsize=11)
+        ax.grid(axis='y', alpha=0.3, linestyle='--')
+        ax.legend(fontsize=10, loc='upper left', framealpha=0.9)
+    for ax in axes[-1]:
+        ax.set_xlabel('Score', fontsize=12, fontweight='bold')
+
+    fig.suptitle(f'📊 Distribución de Scores por Métrica ({n:,} preguntas)', fontsize=16, fontweight='bold')
+    return _save(plt, fig, path)
+
+
+def _averages(plt, averages: Dict[str, float], path: Path) -> Path:
+    """Promedio por métrica (barras horizontales)."""
+    fig, ax = plt.subplots(figsize=(12, 8))
+    fig.patch.set_facecolor(BACKGROUND)
+
+    names = [METRIC_STYLES[column][1] for column in averages]
+    colors = [METRIC_STYLES[column][2] for column in averages]
+    values = list(averages.values())
+    bars = ax.barh(names, values, color=colors, edgecolor=EDGE, linewidth=2)
+
+    # Agregar valores en las barras
+    for bar, val in zip(bars, values):
+        ax.text(bar.get_width() + 0.02, bar.get_y() + bar.get_height()/2,
+                f'{val:.4f}', ha='left', va='center', fontweight='bold', fontsize=12)
+
+    ax.set_xlabel('Score Promedio', fontsize=13, fontweight='bold')
+    ax.set_title('📈 Promedio por Métrica', fontsize=16, fontweight='bold', pad=20)
+    ax.set_xlim([0, 1.1])
+    ax.grid(axis='x', alpha=0.3, linestyle='--')
+    return _save(plt, fig, path)
+
+
+def _heatmap_per_question(plt, scores: Dict[str, List[float]], path: Path) -> Path:
+    """Una celda por pregunta y métrica (pocas preguntas)."""
+    fig, ax = plt.subplots(figsize=(14, 8))
+    fig.patch.set_facecolor(BACKGROUND)
+
+    data_matrix = list(scores.values())
+    n = len(data_matrix[0])
+    im = ax.imshow(data_matrix, cmap='RdYlGn', aspect='auto', vmin=0, vmax=1)
+
+    ax.set_xticks(range(n))
+    ax.set_xticklabels([f'P{i+1}' for i in range(n)], fontsize=11)
+    ax.set_yticks(range(len(data_matrix)))
+    ax.set_yticklabels([METRIC_STYLES[column][0] for column in scores], fontsize=12)
+
+    # Agregar valores en celdas
+    for i, row in enumerate(data_matrix):
+        for j, value in enumerate(row):
+            ax.text(j, i, f'{value:.2f}', ha="center", va="center", color="black", fontweight='bold', fontsize=10)
+
+    ax.set_title('🗺️ Heatmap de Scores por Pregunta y Métrica', fontsize=16, fontweight='bold', pad=20)
+    cbar = plt.colorbar(im, ax=ax)
+    cbar.set_label('Score', fontsize=12, fontweight='bold')
+    return _save(plt, fig, path)
+
+
+def _heatmap_binned(plt, scores: Dict[str, List[float]], path: Path) -> Path:
+    """% de preguntas por métrica y rango de score (muchas preguntas)."""
+    import numpy as np
+
+    fig, ax = plt.subplots(figsize=(14, 8))
+    fig.patch.set_facecolor(BACKGROUND)
+
+    edges = np.linspace(0, 1, SCORE_BINS + 1)
+    matrix = np.array([
+        np.histogram(np.asarray(values, dtype=float), bins=edges)[0] for values in scores.values()
+    ], dtype=float)
+    n = len(next(iter(scores.values())))
+    matrix = 100 * matrix / max(n, 1)
+    im = ax.imshow(matrix, cmap='Blues', aspect='auto', vmin=0)
+
+    ax.set_xticks(range(SCORE_BINS))
+    ax.set_xticklabels([f'{lo:.1f}-{hi:.1f}' for lo, hi in zip(edges[:-1], edges[1:])], fontsize=11)
+    ax.set_yticks(range(len(matrix)))
+    ax.set_yticklabels([METRIC_STYLES[column][0] for column in scores], fontsize=12)
+
+    for i in range(matrix.shape[0]):
+        for j in range(matrix.shape[1]):
+            ax.text(j, i, f'{matrix[i, j]:.1f}%', ha="center", va="center", color="black", fontweight='bold', fontsize=10)
+
+    ax.set_xlabel('Rango de Score', fontsize=13, fontweight='bold')
+    ax.set_title(f'🗺️ Distribución de Scores por Métrica ({n:,} preguntas)', fontsize=16, fontweight='bold', pad=20)
+    cbar = plt.colorbar(im, ax=ax)
+    cbar.set_label('% de preguntas', fontsize=12, fontweight='bold')
+    return _save(plt, fig, path)
+
+
+def render_charts(
+    scores: Dict[str, List[float]],
+    averages: Dict[str, float],
+    global_avg: float,
+    outdir: str = "experiments",
+    max_rows: int = 50,
+) -> List[Tuple[str, Path]]:
+    """
+    Dibuja los 3 gráficos del reporte y devuelve [(descripción, ruta)].
+
+    `scores` y `averages` van indexados por columna de métrica (ver
+    METRIC_STYLES), en el orden en que se muestran.
+    """
+    plt = _pyplot()
+    outdir = Path(outdir)
+    outdir.mkdir(parents=True, exist_ok=True)
+    aggregated = len(next(iter(scores.values()))) > max_rows
+
+    comparison = _comparison_histograms if aggregated else _comparison_bars
+    heatmap = _heatmap_binned if aggregated else _heatmap_per_question
+    return [
+        ("Gráfico de comparación", comparison(plt, scores, global_avg, outdir / "metricas_comparacion.png")),
+        ("Gráfico de promedios", _averages(plt, averages, outdir / "metricas_promedios.png")),
+        ("Heatmap", heatmap(plt, scores, outdir / "metricas_heatmap.png")),
+    ]
+
+
+def submit_render(*args, **kwargs) -> Future:
+    """Ejecuta render_charts() en el proceso de gráficos; el resultado queda en el Future."""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=1)
+    return _executor.submit(render_charts, *args, **kwargs)
+
+
+def shutdown() -> None:
+    """Espera los gráficos ya enviados y cierra el proceso de gráficos."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
@@ -0,0 +1,109 @@
+"""
+Checkpoints de Experimentos
+===========================
+
+Guarda cada fila terminada en un archivo JSONL append-only para que un
+experimento interrumpido (crash, rate limit, Ctrl+C) pueda retomarse sin
+repetir llamadas pagas al LLM.
+
+Cada registro se identifica por:
+- row_hash: hash de la fila del dataset (pregunta + referencias)
+- config_hash: hash de la configuración que produjo el resultado
+
+Se guardan dos etapas por fila:
+- "rag": respuesta y contextos del sistema RAG (clave: configuración del RAG)
+- "row": fila completa con todos los scores (clave: configuración completa)
+
+Así, si solo cambia la configuración de una métrica, la re-ejecución
+reutiliza las respuestas del RAG y recalcula únicamente los scores.
+
+Ejemplo de uso:
+    store = CheckpointStore("experiments/checkpoints.jsonl")
+    view = store.get("row", row, config_hash)
+    if view is None:
+        view = await evaluate(row)
+        store.put("row", row, config_hash, view)
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+
+def stable_hash(value: Any) -> str:
+    """Hash SHA-256 de un valor serializado a JSON canónico (claves ordenadas)."""
+    payload = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CheckpointStore:
+    """
+    Almacén append-only de resultados por fila en formato JSONL.
+
+    Al iniciar se carga el archivo completo en memoria; cada put() agrega una
+    línea y hace flush inmediato, por lo que un crash pierde como mucho la
+    fila en curso. Si una clave aparece varias veces, gana la última.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._records: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        needs_newline = self._load()
+        self._file = open(self.path, "a", encoding="utf-8")
+        if needs_newline:
+            # Cerrar la línea truncada para no corromper el próximo registro
+            self._file.write("\n")
+
+    def _load(self) -> bool:
+        """Carga los registros existentes; devuelve True si falta el salto de línea final."""
+        if not self.path.exists():
+            return False
+        line = ""
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                text = line.strip()
+                if not text:
+                    continue
+                try:
+                    record = json.loads(text)
+                except json.JSONDecodeError:
+                    # Última línea truncada por un crash: se ignora
+                    continue
+                key = (record["stage"], record["row_hash"], record["config_hash"])
+                self._records[key] = record["data"]
+        return bool(line) and not line.endswith("\n")
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def get(
+        self, stage: str, row: Dict[str, Any], config_hash: str
+    ) -> Optional[Dict[str, Any]]:
+        """Resultado guardado para (stage, fila, config), o None si no existe."""
+        return self._records.get((stage, stable_hash(row), config_hash))
+
+    def put(
+        self,
+        stage: str,
+        row: Dict[str, Any],
+        config_hash: str,
+        data: Dict[str, Any],
+    ) -> None:
+        """Agrega un resultado al archivo y lo deja disponible para get()."""
+        row_hash = stable_hash(row)
+        record = {
+            "stage": stage,
+            "row_hash": row_hash,
+            "config_hash": config_hash,
+            "data": data,
+        }
+        self._file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._records[(stage, row_hash, config_hash)] = data
+
+    def close(self) -> None:
+        self._file.close()
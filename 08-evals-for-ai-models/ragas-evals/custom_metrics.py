@@ -10,12 +10,87 @@ del Ejercicio 3 del Lab 8:
 - Métrica C: Claridad y Concisión
 
 Cada métrica hereda de DiscreteMetric y retorna un score 0-1.
+
+Los patrones se compilan una sola vez al importar el módulo. Las palabras
+y frases informales de FormalidadMetric se buscan con una única alternancia
+por conjunto (PatternSet): un recorrido del texto en lugar de uno por patrón.
+`_score(row)` es la versión síncrona de `_ascore(row)` (la usan los
+backends de metric_backend.py).
+Las estadísticas de palabras, oraciones, bigramas y conectores salen de
+text_stats.analyze(), calculado una vez por respuesta y compartido.
+CompletitudMetric no usa ese análisis: calcula solo lo que lee (palabras,
+oraciones y conceptos presentes). Sus conjuntos de conceptos usan un autómata
+Aho-Corasick (aho_corasick.py) solo a partir de AUTOMATON_MIN_CONCEPTS
+conceptos; con menos, `concept in texto` es más rápido.
+Benchmark: python benchmarks/bench_custom_metrics.py
 """
 
 import re
-import string
+from functools import lru_cache
+from typing import Iterable, List, Sequence, Set, Tuple
+
 from ragas.metrics import DiscreteMetric
 
+from aho_corasick import AhoCorasick
+from text_stats import WORD_RE, analyze
+
+# Conceptos a partir de los cuales el autómata (más tokenizar la respuesta)
+# le gana a un `concept in texto` por concepto (ver benchmarks/)
+AUTOMATON_MIN_CONCEPTS = 192
+
+
+class PatternSet:
+    """
+    Patrones compilados una vez para contar cuántos aparecen en un texto.
+
+    Las palabras y frases (`words`, buscadas como `\\bpalabra\\b`) van en una
+    única alternancia `\\b(?:ok|okay|...)\\b` con un grupo por entrada: un solo
+    recorrido del texto encuentra todas las presentes. Los demás patrones
+    (`others`: emojis, puntuación, `pa\\s`) se buscan cada uno con su regex.
+
+    `count(text)` es igual a contar `re.search(p, text, flags)` sobre
+    `patterns`, siempre que ninguna frase de `words` contenga a otra entrada
+    como palabra completa (ej. "muy" y "muy muy"): la alternancia no reporta
+    coincidencias superpuestas.
+    """
+
+    def __init__(self, words: Sequence[str], others: Sequence[str] = (), flags: int = re.IGNORECASE):
+        self.patterns = [rf'\b{word}\b' for word in words] + list(others)
+        alternation = "|".join(f"(?P<w{i}>{word})" for i, word in enumerate(words))
+        self.words_re = re.compile(rf'\b(?:{alternation})\b', flags) if words else None
+        self.others = [re.compile(pattern, flags) for pattern in others]
+
+    def count(self, text: str) -> int:
+        found = 0
+        if self.words_re is not None:
+            found = len({match.lastgroup for match in self.words_re.finditer(text)})
+        return found + sum(1 for pattern in self.others if pattern.search(text))
+
+
+class ConceptMatcher:
+    """
+    Conjunto de conceptos (palabras) a buscar como substring en respuestas.
+
+    `found(lower)` devuelve los conceptos presentes en el texto ya en
+    minúsculas, igual que `concept in lower` concepto por concepto:
+    - Con menos de `min_automaton` conceptos se hace exactamente eso: cada
+      `in` corre en C y es más barato que tokenizar la respuesta.
+    - Con más (ej. referencias largas) se construye una vez un autómata
+      Aho-Corasick y cada respuesta se resuelve en una pasada por sus
+      palabras distintas, sin importar cuántos conceptos haya.
+    """
+
+    def __init__(self, concepts: Iterable[str], min_automaton: int = AUTOMATON_MIN_CONCEPTS):
+        self.concepts = tuple(set(concepts))
+        self.automaton = AhoCorasick(self.concepts) if len(self.concepts) >= min_automaton else None
+
+    def found(self, lower: str) -> Set[str]:
+        if self.automaton is None:
+            return {concept for concept in self.concepts if concept in lower}
+        # Los conceptos son solo letras (\w+): nunca cruzan de una palabra a otra
+        concepts = self.concepts
+        return {concepts[i] for i in self.automaton.matches_in(set(WORD_RE.findall(lower)))}
+
 
 class FormalidadMetric(DiscreteMetric):
     """
@@ -41,16 +116,36 @@ class FormalidadMetric(DiscreteMetric):
     
     name = "formalidad_tono"
     
-    # Patrones informales a detectar
-    INFORMAL_PATTERNS = [
-        r'\bemoji\b', r'👍', r'😀', r'💪', r'🎯', r'✨', r'🔥',  # Emojis
-        r'\bok\b', r'\bokay\b', r'\bgenial\b', r'\bsuper\b', r'\btotal\b',  # Coloquial
-        r'\bre\b', r'\bmuy\s+muy\b', r'\bun\s+montón\b',  # Intensificadores informales
+    # Palabras y frases informales a detectar (como \bpalabra\b)
+    INFORMAL_WORDS = [
+        r'emoji',  # Emojis
+        r'ok', r'okay', r'genial', r'super', r'total',  # Coloquial
+        r're', r'muy\s+muy', r'un\s+montón',  # Intensificadores informales
+        r'creo\s+que', r'pienso\s+que',  # Primera persona informal
+        r'vamos', r'hey', r'bueno', r'pues',  # Muletillas
+    ]
+    INFORMAL_SYMBOLS = [
+        r'👍', r'😀', r'💪', r'🎯', r'✨', r'🔥',  # Emojis
         r'¿\w+\?{2,}', r'!{2,}',  # Múltiples signos de puntuación
-        r'\bcreo\s+que\b', r'\bpienso\s+que\b',  # Primera persona informal
-        r'\bvamos\b', r'\bhey\b', r'\bbueno\b', r'\bpues\b',  # Muletillas
     ]
     
+    # Contracciones informales en español
+    CONTRACTION_WORDS = [r'pa', r'q', r'xq', r'x']
+    CONTRACTION_SYMBOLS = [r'pa\s', r"q\s"]
+    
+    # Patrones precompilados una sola vez (no en cada llamada)
+    EMOJI_RE = re.compile("["
+        u"\U0001F600-\U0001F64F"  # emoticonos
+        u"\U0001F300-\U0001F5FF"  # símbolos y pictogramas
+        u"\U0001F680-\U0001F6FF"  # transporte y símbolos de mapa
+        u"\U0001F1E0-\U0001F1FF"  # banderas
+    "]+", flags=re.UNICODE)
+    INFORMAL_SET = PatternSet(INFORMAL_WORDS, INFORMAL_SYMBOLS)
+    CONTRACTION_SET = PatternSet(CONTRACTION_WORDS, CONTRACTION_SYMBOLS)
+    # Los mismos patrones, uno por entrada (como re.search patrón por patrón)
+    INFORMAL_PATTERNS = INFORMAL_SET.patterns
+    CONTRACTIONS = CONTRACTION_SET.patterns
+    
     async def _ascore(self, row: dict, **kwargs) -> float:
         """
         Calcula el score de formalidad para una respuesta.
@@ -62,6 +157,9 @@ class FormalidadMetric(DiscreteMetric):
         Returns:
             float: Score entre 0.0 (muy informal) y 1.0 (perfectamente formal)
         """
+        return self._score(row)
+    
+    def _score(self, row: dict) -> float:
         response = row.get("response", "")
         
         if not response:
@@ -70,26 +168,18 @@ class FormalidadMetric(DiscreteMetric):
         penalties = 0.0
         
         # 1. Detectar emojis (penalización fuerte)
-        emoji_pattern = re.compile("["
-            u"\U0001F600-\U0001F64F"  # emoticonos
-            u"\U0001F300-\U0001F5FF"  # símbolos y pictogramas
-            u"\U0001F680-\U0001F6FF"  # transporte y símbolos de mapa
-            u"\U0001F1E0-\U0001F1FF"  # banderas
-        "]+", flags=re.UNICODE)
-        
-        if emoji_pattern.search(response):
+        if self.EMOJI_RE.search(response):
             penalties += 0.3
         
+        stats = analyze(response)
+        
         # 2. Detectar patrones informales
-        for pattern in self.INFORMAL_PATTERNS:
-            if re.search(pattern, response, re.IGNORECASE):
-                penalties += 0.05
+        for _ in range(self.INFORMAL_SET.count(response)):
+            penalties += 0.05
         
         # 3. Detectar contracciones informales en español
-        contractions = [r'pa\s', r'\bpa\b', r"q\s", r'\bq\b', r'\bxq\b', r'\bx\b']
-        for contraction in contractions:
-            if re.search(contraction, response, re.IGNORECASE):
-                penalties += 0.1
+        for _ in range(self.CONTRACTION_SET.count(response)):
+            penalties += 0.1
         
         # 4. Penalizar exceso de signos de exclamación
         exclamation_count = response.count('!')
@@ -97,15 +187,13 @@ class FormalidadMetric(DiscreteMetric):
             penalties += 0.1
         
         # 5. Verificar uso de mayúsculas al inicio de oraciones
-        sentences = re.split(r'[.!?]+', response)
-        lowercase_starts = sum(1 for s in sentences if s.strip() and s.strip()[0].islower())
+        lowercase_starts = stats.lowercase_starts
         if lowercase_starts > 0:
             penalties += 0.05 * lowercase_starts
         
         # 6. Detectar lenguaje muy simple (palabras muy cortas en promedio)
-        words = response.split()
-        if words:
-            avg_word_length = sum(len(w.strip(string.punctuation)) for w in words) / len(words)
+        if stats.num_words:
+            avg_word_length = stats.stripped_length_sum / stats.num_words
             if avg_word_length < 4:
                 penalties += 0.1
         
@@ -140,6 +228,14 @@ class CompletitudMetric(DiscreteMetric):
     
     name = "completitud_respuesta"
     
+    STOPWORDS = frozenset({'cuál', 'cuáles', 'qué', 'cómo', 'dónde', 'cuándo', 'quién', 'para', 'sobre', 'cual', 'cuales', 'como', 'donde', 'cuando', 'quien'})
+    QUESTION_WORD_RE = re.compile(r'\b\w{4,}\b')
+    REFERENCE_WORD_RE = re.compile(r'\b\w{5,}\b')
+    SENTENCE_SPLIT_RE = re.compile(r'[.!?]+')
+    
+    # Conectores que indican preguntas múltiples
+    MULTI_QUESTION_MARKERS = [' y ', '¿', ' o ', ', ']
+    
     async def _ascore(self, row: dict, **kwargs) -> float:
         """
         Calcula el score de completitud para una respuesta.
@@ -154,6 +250,29 @@ class CompletitudMetric(DiscreteMetric):
         Returns:
             float: Score entre 0.0 (incompleta) y 1.0 (completamente completa)
         """
+        return self._score(row)
+    
+    # Preguntas y referencias se repiten entre filas: se preprocesan una vez
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _question_concepts(question: str) -> Tuple[int, List[str], ConceptMatcher]:
+        """Sub-preguntas, conceptos clave (con repeticiones) y su matcher."""
+        # 1. Detectar preguntas múltiples (usando conectores)
+        sub_questions = 1 + sum(question.count(marker) for marker in CompletitudMetric.MULTI_QUESTION_MARKERS)
+        
+        # 2. Contar conceptos clave en la pregunta (filtrando palabras comunes)
+        question_words = CompletitudMetric.QUESTION_WORD_RE.findall(question.lower())
+        key_concepts = [w for w in question_words if w not in CompletitudMetric.STOPWORDS]
+        return sub_questions, key_concepts, ConceptMatcher(key_concepts)
+    
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _reference_concepts(reference: str) -> ConceptMatcher:
+        """Matcher con los conceptos únicos de la referencia."""
+        ref_concepts = CompletitudMetric.REFERENCE_WORD_RE.findall(reference.lower())
+        return ConceptMatcher(set(ref_concepts) - CompletitudMetric.STOPWORDS)
+    
+    def _score(self, row: dict) -> float:
         question = row.get("user_input", "")
         response = row.get("response", "")
         reference = row.get("reference", "")
@@ -164,20 +283,13 @@ class CompletitudMetric(DiscreteMetric):
         score = 1.0
         penalties = 0.0
         
-        # 1. Detectar preguntas múltiples (usando conectores)
-        multi_question_markers = [' y ', '¿', ' o ', ', ']
-        sub_questions = 1
-        for marker in multi_question_markers:
-            sub_questions += question.count(marker)
-        
-        # 2. Contar conceptos clave en la pregunta
-        question_words = re.findall(r'\b\w{4,}\b', question.lower())
-        # Filtrar palabras comunes
-        stopwords = {'cuál', 'cuáles', 'qué', 'cómo', 'dónde', 'cuándo', 'quién', 'para', 'sobre', 'cual', 'cuales', 'como', 'donde', 'cuando', 'quien'}
-        key_concepts = [w for w in question_words if w not in stopwords]
-        
-        # 3. Verificar cobertura de conceptos clave
-        concepts_covered = sum(1 for concept in key_concepts if concept in response.lower())
+        # 1-2. Sub-preguntas y conceptos de la pregunta y la referencia
+        sub_questions, key_concepts, question_matcher = self._question_concepts(question)
+        
+        # 3. Verificar cobertura de conceptos clave (todos los conceptos a la vez)
+        response_lower = response.lower()
+        found = question_matcher.found(response_lower)
+        concepts_covered = sum(1 for concept in key_concepts if concept in found)
         if key_concepts:
             coverage_ratio = concepts_covered / len(key_concepts)
             if coverage_ratio < 0.5:
@@ -197,23 +309,21 @@ class CompletitudMetric(DiscreteMetric):
             penalties += 0.1
         
         # 5. Verificar si hay desarrollo de ideas (múltiples oraciones)
-        sentences = re.split(r'[.!?]+', response)
-        meaningful_sentences = [s for s in sentences if len(s.split()) > 3]
+        meaningful_sentences = sum(
+            1 for sentence in self.SENTENCE_SPLIT_RE.split(response) if len(sentence.split()) > 3
+        )
         
-        if len(meaningful_sentences) < 2:
+        if meaningful_sentences < 2:
             penalties += 0.2
-        elif len(meaningful_sentences) < 3:
+        elif meaningful_sentences < 3:
             penalties += 0.1
         
         # 6. Comparar con referencia si está disponible
         if reference:
-            ref_concepts = re.findall(r'\b\w{5,}\b', reference.lower())
-            ref_concepts_unique = set(ref_concepts) - stopwords
-            response_lower = response.lower()
-            
-            ref_coverage = sum(1 for concept in ref_concepts_unique if concept in response_lower)
-            if ref_concepts_unique:
-                ref_ratio = ref_coverage / len(ref_concepts_unique)
+            ref_matcher = self._reference_concepts(reference)
+            ref_coverage = len(ref_matcher.found(response_lower))
+            if ref_matcher.concepts:
+                ref_ratio = ref_coverage / len(ref_matcher.concepts)
                 if ref_ratio < 0.4:
                     penalties += 0.2
                 elif ref_ratio < 0.6:
@@ -259,6 +369,9 @@ class ClaridadMetric(DiscreteMetric):
         Returns:
             float: Score entre 0.0 (confusa/redundante) y 1.0 (clara/concisa)
         """
+        return self._score(row)
+    
+    def _score(self, row: dict) -> float:
         response = row.get("response", "")
         
         if not response:
@@ -266,11 +379,12 @@ class ClaridadMetric(DiscreteMetric):
         
         penalties = 0.0
         
+        # Palabras, oraciones, bigramas y conectores en una sola pasada
+        stats = analyze(response)
+        
         # 1. Analizar redundancia (diversidad léxica)
-        words = [w.lower().strip(string.punctuation) for w in response.split() if w.strip()]
-        if len(words) > 0:
-            unique_words = set(words)
-            lexical_diversity = len(unique_words) / len(words)
+        if stats.num_words > 0:
+            lexical_diversity = stats.lexical_diversity
             
             # Penalizar baja diversidad léxica (muchas repeticiones)
             if lexical_diversity < 0.5:
@@ -285,8 +399,8 @@ class ClaridadMetric(DiscreteMetric):
             penalties += 0.1
         
         # 3. Analizar complejidad de palabras
-        if words:
-            avg_word_length = sum(len(w) for w in words) / len(words)
+        if stats.num_words:
+            avg_word_length = stats.avg_word_length
             # Penalizar palabras promedio muy largas (difícil de leer)
             if avg_word_length > 7:
                 penalties += 0.2
@@ -294,10 +408,8 @@ class ClaridadMetric(DiscreteMetric):
                 penalties += 0.1
         
         # 4. Analizar longitud de oraciones
-        sentences = [s.strip() for s in re.split(r'[.!?]+', response) if s.strip()]
-        if sentences:
-            sentence_lengths = [len(s.split()) for s in sentences]
-            avg_sentence_length = sum(sentence_lengths) / len(sentences)
+        if stats.sentence_lengths:
+            avg_sentence_length = stats.avg_sentence_length
             
             # Penalizar oraciones muy largas (difíciles de seguir)
             if avg_sentence_length > 30:
@@ -309,18 +421,14 @@ class ClaridadMetric(DiscreteMetric):
             if avg_sentence_length < 8:
                 penalties += 0.1
         
-        # 5. Detectar repeticiones de frases
-        bigrams = [' '.join(words[i:i+2]) for i in range(len(words)-1)]
-        if bigrams:
-            unique_bigrams = len(set(bigrams))
-            bigram_diversity = unique_bigrams / len(bigrams)
+        # 5. Detectar repeticiones de frases (bigramas contados como tuplas)
+        if stats.num_bigrams:
+            bigram_diversity = stats.bigram_diversity
             if bigram_diversity < 0.8:
                 penalties += 0.15
         
         # 6. Detectar conectores y fluidez
-        connectors = ['además', 'sin embargo', 'por lo tanto', 'asimismo', 'mientras', 
-                     'aunque', 'porque', 'ya que', 'debido a', 'en consecuencia']
-        connector_count = sum(1 for conn in connectors if conn in response.lower())
+        connector_count = stats.connector_count
         
         # Buena señal si hay algunos conectores (estructura clara)
         if connector_count >= 1 and connector_count <= 3:
@@ -1,109 +1,309 @@
+"""
+Evaluación del sistema RAG con RAGAS (Lab 8)
+
+Uso:
+    python evals.py                 # ejecuta el experimento completo
+    python evals.py --validate      # valida el dataset (sin API key ni LLM)
+    python evals.py --report [RUN]  # reporte desde experiments/results (sin LLM)
+    python evals.py --sample 500 --baseline RUN  # muestra estratificada vs un run base
+    python evals.py --help
+
+ragas, openai, pandas y matplotlib se importan recién cuando se usan:
+--help, --validate y --report arrancan sin cargar el stack de evaluación.
+Perfil de importación: python benchmarks/bench_startup.py
+"""
+
+import argparse
+import asyncio
+import functools
 import os
 import sys
 from pathlib import Path
-from dotenv import load_dotenv
-import pandas as pd
-import matplotlib.pyplot as plt
-from datetime import datetime
-
-# Parche para multiprocess en Python 3.12
-import multiprocess.resource_tracker as rt
-if not hasattr(rt.ResourceTracker, '_patched'):
-    original_stop = rt.ResourceTracker._stop
-    
-    def patched_stop(self, *args, **kwargs):
-        try:
-            original_stop(self, *args, **kwargs)
-        except (AttributeError, TypeError):
-            pass
-    
-    rt.ResourceTracker._stop = patched_stop
-    rt.ResourceTracker._patched = True
 
-from openai import AsyncOpenAI, OpenAI
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))  # common/
+sys.path.insert(0, str(Path(__file__).parent))
+from checkpoint import CheckpointStore, stable_hash
+from runner import ExperimentRunner, estimate_tokens
+from score_cache import CachedMetric, ScoreCache
+from metric_backend import InlineMetricBackend, ProcessPoolMetricBackend
+from charts import shutdown as shutdown_charts, submit_render
 
-from ragas import Dataset, experiment
-from ragas.llms import llm_factory
-from ragas.metrics import DiscreteMetric
-from ragas.metrics.collections import Faithfulness
+# Concurrencia y rate limit del experimento (configurables por entorno)
+EVAL_CONCURRENCY = int(os.getenv("EVAL_CONCURRENCY", "8"))
+EVAL_RPM = float(os.getenv("EVAL_RPM", "0")) or None  # requests por minuto
+EVAL_TPM = float(os.getenv("EVAL_TPM", "0")) or None  # tokens por minuto
+EVAL_MAX_RETRIES = int(os.getenv("EVAL_MAX_RETRIES", "5"))
+# Tokens estimados por llamada al LLM (prompt con contextos + respuesta)
+EVAL_TOKENS_PER_CALL = int(os.getenv("EVAL_TOKENS_PER_CALL", "1500"))
+# Checkpoints por fila para retomar experimentos ("" lo desactiva)
+EVAL_CHECKPOINT = os.getenv("EVAL_CHECKPOINT", "experiments/checkpoints.jsonl")
+# Cache persistente de scores del juez LLM ("" lo desactiva)
+EVAL_SCORE_CACHE = os.getenv("EVAL_SCORE_CACHE", "experiments/score_cache.sqlite")
+# Filas por request al juez de Faithfulness (0 = un juicio por fila, con Ragas).
+# En la práctica el lote no supera EVAL_CONCURRENCY (filas en vuelo)
+EVAL_JUDGE_BATCH = int(os.getenv("EVAL_JUDGE_BATCH", "0"))
+# Procesos para las métricas heurísticas (0 = en el mismo proceso)
+EVAL_METRIC_WORKERS = int(os.getenv("EVAL_METRIC_WORKERS", "0"))
+# Filas detalladas en consola; con más filas se muestran solo mejores y peores
+EVAL_REPORT_ROWS = int(os.getenv("EVAL_REPORT_ROWS", "20"))
+# Gráficos PNG ("0" los desactiva); con más preguntas que EVAL_CHART_MAX_ROWS
+# se dibujan histogramas y un heatmap por rangos en lugar de una barra por pregunta
+EVAL_CHARTS = os.getenv("EVAL_CHARTS", "1") != "0"
+EVAL_CHART_MAX_ROWS = int(os.getenv("EVAL_CHART_MAX_ROWS", "50"))
+# Resultados en Parquet, un directorio por experimento ("" lo desactiva)
+EVAL_RESULTS_DIR = os.getenv("EVAL_RESULTS_DIR", "experiments/results")
+
+
+# Clientes, métricas y stores del experimento: los crea setup()
+rag_client = None
+runner = None
+faithfulness_metric = None
+score_cache = None
+metric_backend = None
+checkpoints = None
+RAG_CONFIG_HASH = None
+ROW_CONFIG_HASH = None
+
+
+def _patch_multiprocess():
+    # Parche para multiprocess en Python 3.12
+    import multiprocess.resource_tracker as rt
+    if not hasattr(rt.ResourceTracker, '_patched'):
+        original_stop = rt.ResourceTracker._stop
+
+        def patched_stop(self, *args, **kwargs):
+            try:
+                original_stop(self, *args, **kwargs)
+            except (AttributeError, TypeError):
+                pass
+
+        rt.ResourceTracker._stop = patched_stop
+        rt.ResourceTracker._patched = True
+
+
+def _load_api_key():
+    # Cargar API key desde variable de entorno (prioridad)
+    api_key = os.getenv("OPENAI_API_KEY")
+
+    # Si no está en variable de entorno, buscar en archivo .env
+    if not api_key:
+        env_path = Path(__file__).parent / ".env"
+        if env_path.exists():
+            from dotenv import load_dotenv
+            load_dotenv(dotenv_path=env_path)
+            api_key = os.getenv("OPENAI_API_KEY")
+
+    if not api_key:
+        print("\n❌ Error: OPENAI_API_KEY no configurada\n")
+        print("Opciones para configurar:")
+        print("  1️⃣  Variable de entorno (RECOMENDADO):")
+        print("      PowerShell: $env:OPENAI_API_KEY = 'sk-proj-...'")
+        print("      Bash: export OPENAI_API_KEY='sk-proj-...'")
+        print()
+        print("  2️⃣  Archivo .env (Desarrollo local):")
+        print(f"      1. Copia: cp .env.example .env")
+        print(f"      2. Edita: .env y reemplaza con tu clave real")
+        print()
+        print("   Obtén tu clave en: https://platform.openai.com/api-keys")
+        print()
+        sys.exit(1)
+    return api_key
+
+
+def setup():
+    """Crea clientes, métricas, runner y stores (importa ragas y openai)."""
+    global rag_client, runner, faithfulness_metric, score_cache, metric_backend
+    global checkpoints, RAG_CONFIG_HASH, ROW_CONFIG_HASH
+
+    api_key = _load_api_key()
+    _patch_multiprocess()
+
+    from openai import AsyncOpenAI, OpenAI
+
+    import ragas
+    from ragas.llms import llm_factory
+    from ragas.metrics.collections import Faithfulness
+
+    from rag import default_rag_client
+    from custom_metrics import FormalidadMetric, CompletitudMetric, ClaridadMetric
+
+    openai_client = OpenAI(api_key=api_key)
+    async_openai_client = AsyncOpenAI(api_key=api_key)
+    rag_client = default_rag_client(llm_client=openai_client, raise_errors=True)
+    async_llm = llm_factory("gpt-4o-mini", client=async_openai_client)
+
+    # Configuración determinística para resultados consistentes
+    async_llm.temperature = 0
+    async_llm.top_p = 1
+
+    runner = ExperimentRunner(
+        concurrency=EVAL_CONCURRENCY,
+        requests_per_minute=EVAL_RPM,
+        tokens_per_minute=EVAL_TPM,
+        max_retries=EVAL_MAX_RETRIES,
+    )
+
+    faithfulness_metric = Faithfulness(llm=async_llm)
+    faithfulness_version = f"ragas=={ragas.__version__}"
+    faithfulness_call = functools.partial(runner.call, estimated_tokens=EVAL_TOKENS_PER_CALL)
+    if EVAL_JUDGE_BATCH > 0:
+        from batched_judge import BatchedFaithfulness
+
+        # Un request al juez por lote de filas; rate limit y reintentos se aplican
+        # por request (las filas que el juez no devuelve se re-evalúan con Ragas)
+        faithfulness_metric = BatchedFaithfulness(
+            async_openai_client,
+            model="gpt-4o-mini",
+            batch_size=EVAL_JUDGE_BATCH,
+            temperature=async_llm.temperature,
+            call=runner.call,
+            fallback=faithfulness_metric,
+            tokens_per_row=EVAL_TOKENS_PER_CALL,
+        )
+        faithfulness_version = f"batched-judge-v1 ({faithfulness_version})"
+        faithfulness_call = None
+
+    # Memoizar Faithfulness: solo se llama al juez si cambian pregunta, respuesta o contextos
+    score_cache = ScoreCache(EVAL_SCORE_CACHE) if EVAL_SCORE_CACHE else None
+    if score_cache is not None:
+        faithfulness_metric = CachedMetric(
+            faithfulness_metric,
+            score_cache,
+            name="faithfulness",
+            version=faithfulness_version,
+            judge_model="gpt-4o-mini",
+            temperature=async_llm.temperature,
+            call=faithfulness_call,
+        )
+
+    # Instanciar métricas personalizadas desde custom_metrics.py
+    formalidad_metric = FormalidadMetric(name="formalidad_tono")
+    completitud_metric = CompletitudMetric(name="completitud_respuesta")
+    claridad_metric = ClaridadMetric(name="claridad_concision")
+
+    # Las métricas personalizadas son CPU-bound: con EVAL_METRIC_WORKERS > 0 se
+    # evalúan en lotes en un pool de procesos, fuera del event loop
+    custom_metrics = {
+        "formalidad": formalidad_metric,
+        "completitud": completitud_metric,
+        "claridad": claridad_metric,
+    }
+    if EVAL_METRIC_WORKERS > 0:
+        metric_backend = ProcessPoolMetricBackend(custom_metrics, max_workers=EVAL_METRIC_WORKERS)
+    else:
+        metric_backend = InlineMetricBackend(custom_metrics)
+
+    # Configuración que determina las respuestas del RAG y los scores.
+    # Si cambia, las filas afectadas se recalculan en lugar de leerse del checkpoint.
+    RAG_CONFIG = {
+        "model": "gpt-4o-mini",
+        "top_k": 3,
+        "retriever": type(rag_client.retriever).__name__,
+        "reranker": type(rag_client.reranker).__name__ if rag_client.reranker else None,
+        "system_prompt": rag_client.system_prompt,
+        "documents": stable_hash(rag_client.documents),
+    }
+    METRICS_CONFIG = {
+        "judge_model": "gpt-4o-mini",
+        "temperature": async_llm.temperature,
+        "metrics": [
+            "faithfulness_batched" if EVAL_JUDGE_BATCH > 0 else "faithfulness",
+            formalidad_metric.name,
+            completitud_metric.name,
+            claridad_metric.name,
+        ],
+    }
+    RAG_CONFIG_HASH = stable_hash(RAG_CONFIG)
+    ROW_CONFIG_HASH = stable_hash({"rag": RAG_CONFIG, "metrics": METRICS_CONFIG})
+
+    checkpoints = CheckpointStore(EVAL_CHECKPOINT) if EVAL_CHECKPOINT else None
+
+
+def teardown():
+    """Cierra checkpoints, workers y el cache de scores, e informa su uso."""
+    if checkpoints is not None:
+        checkpoints.close()
+    metric_backend.close()
+    if EVAL_JUDGE_BATCH > 0:
+        judge = getattr(faithfulness_metric, "metric", faithfulness_metric)
+        judge.close()
+        print(f"📦 Juez por lotes: {judge.rows} filas en {judge.requests} requests, {judge.fallbacks} re-evaluadas sin lote, "
+              f"{judge.failed_batches} lotes con error")
+    if score_cache is not None:
+        print(f"🗄️  Cache de scores: {score_cache.hits} aciertos, {score_cache.misses} llamadas al juez")
+        score_cache.close()
 
-sys.path.insert(0, str(Path(__file__).parent))
-from rag import default_rag_client
-from custom_metrics import FormalidadMetric, CompletitudMetric, ClaridadMetric
-
-# Cargar API key desde variable de entorno (prioridad)
-api_key = os.getenv("OPENAI_API_KEY")
-
-# Si no está en variable de entorno, buscar en archivo .env
-if not api_key:
-    env_path = Path(__file__).parent / ".env"
-    if env_path.exists():
-        load_dotenv(dotenv_path=env_path)
-        api_key = os.getenv("OPENAI_API_KEY")
-
-if not api_key:
-    print("\n❌ Error: OPENAI_API_KEY no configurada\n")
-    print("Opciones para configurar:")
-    print("  1️⃣  Variable de entorno (RECOMENDADO):")
-    print("      PowerShell: $env:OPENAI_API_KEY = 'sk-proj-...'")
-    print("      Bash: export OPENAI_API_KEY='sk-proj-...'")
-    print()
-    print("  2️⃣  Archivo .env (Desarrollo local):")
-    print(f"      1. Copia: cp .env.example .env")
-    print(f"      2. Edita: .env y reemplaza con tu clave real")
-    print()
-    print("   Obtén tu clave en: https://platform.openai.com/api-keys")
-    print()
-    sys.exit(1)
 
-openai_client = OpenAI(api_key=api_key)
-async_openai_client = AsyncOpenAI(api_key=api_key)
-rag_client = default_rag_client(llm_client=openai_client)
-async_llm = llm_factory("gpt-4o-mini", client=async_openai_client)
+def open_results_store():
+    """ResultsStore de EVAL_RESULTS_DIR, o None si está desactivado."""
+    if not EVAL_RESULTS_DIR:
+        return None
+    from results_store import ResultsStore
+    return ResultsStore(EVAL_RESULTS_DIR)
 
-# Configuración determinística para resultados consistentes
-async_llm.temperature = 0
-async_llm.top_p = 1
 
-faithfulness_metric = Faithfulness(llm=async_llm)
+DATA_SAMPLES = [
+    {
+        "question": "¿Cuál fue el impacto de la Revolución Industrial en la sociedad?",
+        "category": "historia",
+        "references": ["La Revolución Industrial transformó la sociedad mediante la mecanización de la manufactura, provocando la migración rural-urbana y la creación de la clase obrera moderna. Aunque aumentó significativamente la producción de bienes y contribuyó al surgimiento del capitalismo moderno, también generó condiciones laborales precarias, contaminación ambiental y una brecha de desigualdad socioeconómica entre propietarios de fábricas y trabajadores."]
+    },
+    {
+        "question": "¿Cuál es el proceso de fotosíntesis en las plantas?",
+        "category": "ciencia",
+        "references": ["La fotosíntesis es el proceso donde las plantas convierten luz solar, agua y CO2 en glucosa y oxígeno. Ocurre en dos fases: la reacción luminosa genera ATP y NADPH usando energía de la luz, mientras que el ciclo de Calvin sintetiza glucosa a partir del CO2. Es esencial para producir oxígeno respirable y alimento para la mayoría de los organismos vivos."]
+    },
+    {
+        "question": "¿Qué es el cambio climático y cuáles son sus causas principales?",
+        "category": "ciencia",
+        "references": ["El cambio climático es el aumento de temperaturas globales causado principalmente por emisiones humanas de gases de efecto invernadero (CO2, metano, N2O) desde la quema de combustibles fósiles, deforestación y ganadería intensiva. Estos gases atrapan calor en la atmósfera. Sus consecuencias incluyen aumento del nivel del mar, eventos climáticos extremos más frecuentes, pérdida de biodiversidad y disrupciones en la producción agrícola."]
+    },
+    {
+        "question": "¿Cuál fue el papel de Ada Lovelace en la historia de la informática?",
+        "category": "historia",
+        "references": ["Ada Lovelace fue una matemática pionera que escribió el primer algoritmo pensado para la Máquina Analítica de Babbage en 1843, ganándose el título de primer programador del mundo. Sus notas matemáticas demostraban una comprensión profunda de la lógica computacional y anticiparon conceptos modernos de programación como loops y funciones más de un siglo antes de que existieran computadoras electrónicas."]
+    },
+    {
+        "question": "¿Cuáles son los beneficios del ejercicio regular para la salud?",
+        "category": "salud",
+        "references": ["El ejercicio regular mejora la salud cardiovascular, fuerza muscular y flexibilidad, mientras reduce significativamente el riesgo de enfermedades crónicas como diabetes, hipertensión y ciertos cánceres. Psicológicamente, reduce estrés y depresión, mejora el estado de ánimo mediante endorfinas y fortalece la función cognitiva. Se recomienda 150 minutos de actividad aeróbica moderada por semana más ejercicios de resistencia."]
+    }
+]
+
 
-# Instanciar métricas personalizadas desde custom_metrics.py
-formalidad_metric = FormalidadMetric(name="formalidad_tono")
-completitud_metric = CompletitudMetric(name="completitud_respuesta")
-claridad_metric = ClaridadMetric(name="claridad_concision")
+def validate_dataset(samples):
+    """Errores de formato del dataset (lista vacía si es válido)."""
+    errors = []
+    seen = set()
+    for i, sample in enumerate(samples, 1):
+        question = sample.get("question")
+        references = sample.get("references")
+        if not isinstance(question, str) or not question.strip():
+            errors.append(f"Muestra {i}: 'question' debe ser un texto no vacío")
+        elif question in seen:
+            errors.append(f"Muestra {i}: pregunta duplicada")
+        else:
+            seen.add(question)
+        if (not isinstance(references, list) or not references
+                or not all(isinstance(ref, str) and ref.strip() for ref in references)):
+            errors.append(f"Muestra {i}: 'references' debe ser una lista de textos no vacíos")
+    return errors
 
 
 def load_dataset():
+    from ragas import Dataset
+
+    errors = validate_dataset(DATA_SAMPLES)
+    if errors:
+        raise ValueError("Dataset inválido:\n" + "\n".join(errors))
+
     dataset = Dataset(
         name="test_dataset",
         backend="local/csv",
         root_dir=".",
     )
 
-    data_samples = [
-        {
-            "question": "¿Cuál fue el impacto de la Revolución Industrial en la sociedad?",
-            "references": ["La Revolución Industrial transformó la sociedad mediante la mecanización de la manufactura, provocando la migración rural-urbana y la creación de la clase obrera moderna. Aunque aumentó significativamente la producción de bienes y contribuyó al surgimiento del capitalismo moderno, también generó condiciones laborales precarias, contaminación ambiental y una brecha de desigualdad socioeconómica entre propietarios de fábricas y trabajadores."]
-        },
-        {
-            "question": "¿Cuál es el proceso de fotosíntesis en las plantas?",
-            "references": ["La fotosíntesis es el proceso donde las plantas convierten luz solar, agua y CO2 en glucosa y oxígeno. Ocurre en dos fases: la reacción luminosa genera ATP y NADPH usando energía de la luz, mientras que el ciclo de Calvin sintetiza glucosa a partir del CO2. Es esencial para producir oxígeno respirable y alimento para la mayoría de los organismos vivos."]
-        },
-        {
-            "question": "¿Qué es el cambio climático y cuáles son sus causas principales?",
-            "references": ["El cambio climático es el aumento de temperaturas globales causado principalmente por emisiones humanas de gases de efecto invernadero (CO2, metano, N2O) desde la quema de combustibles fósiles, deforestación y ganadería intensiva. Estos gases atrapan calor en la atmósfera. Sus consecuencias incluyen aumento del nivel del mar, eventos climáticos extremos más frecuentes, pérdida de biodiversidad y disrupciones en la producción agrícola."]
-        },
-        {
-            "question": "¿Cuál fue el papel de Ada Lovelace en la historia de la informática?",
-            "references": ["Ada Lovelace fue una matemática pionera que escribió el primer algoritmo pensado para la Máquina Analítica de Babbage en 1843, ganándose el título de primer programador del mundo. Sus notas matemáticas demostraban una comprensión profunda de la lógica computacional y anticiparon conceptos modernos de programación como loops y funciones más de un siglo antes de que existieran computadoras electrónicas."]
-        },
-        {
-            "question": "¿Cuáles son los beneficios del ejercicio regular para la salud?",
-            "references": ["El ejercicio regular mejora la salud cardiovascular, fuerza muscular y flexibilidad, mientras reduce significativamente el riesgo de enfermedades crónicas como diabetes, hipertensión y ciertos cánceres. Psicológicamente, reduce estrés y depresión, mejora el estado de ánimo mediante endorfinas y fortalece la función cognitiva. Se recomienda 150 minutos de actividad aeróbica moderada por semana más ejercicios de resistencia."]
-        }
-    ]
-
-    for sample in data_samples:
+    for sample in DATA_SAMPLES:
         row = {"question": sample["question"], "references": sample["references"]}
         dataset.append(row)
 
@@ -111,23 +311,62 @@ def load_dataset():
     return dataset
 
 
-@experiment()
+# Se registra como @experiment() de Ragas en main(), al ejecutar
 async def run_experiment(row):
-    response = rag_client.query(row["question"])
-    
-    answer = response.get("answer", "")
-    contexts = response.get("contexts", [])
+    row_key = {"question": row["question"], "references": row["references"]}
+
+    # Fila ya evaluada con esta misma configuración: se reutiliza sin llamar al LLM
+    if checkpoints is not None:
+        cached_view = checkpoints.get("row", row_key, ROW_CONFIG_HASH)
+        if cached_view is not None:
+            return cached_view
+
+    # Como máximo EVAL_CONCURRENCY filas en vuelo; el resto espera su turno
+    async with runner.slot():
+        experiment_view, rag_ok = await _evaluate_row(row, row_key)
+
+    # Las filas con error en el RAG no se guardan para reintentarlas en la próxima ejecución
+    if checkpoints is not None and rag_ok:
+        checkpoints.put("row", row_key, ROW_CONFIG_HASH, experiment_view)
+    return experiment_view
+
+
+def _score_faithfulness(question, answer, contexts):
+    inputs = {"user_input": question, "response": answer, "retrieved_contexts": contexts}
+    # CachedMetric y BatchedFaithfulness ya aplican rate limit y reintentos al llamar al juez
+    if isinstance(faithfulness_metric, CachedMetric) or EVAL_JUDGE_BATCH > 0:
+        return faithfulness_metric.ascore(**inputs)
+    return runner.call(faithfulness_metric.ascore, estimated_tokens=EVAL_TOKENS_PER_CALL, **inputs)
+
+
+async def _evaluate_row(row, row_key):
     question = row["question"]
     ground_truth = row["references"][0] if isinstance(row["references"], list) else row["references"]
 
-    # Métrica RAGAS: Faithfulness
-    faithfulness_result = await faithfulness_metric.ascore(
-        user_input=question,
-        response=answer,
-        retrieved_contexts=contexts
-    )
-    faithfulness_score = faithfulness_result.score if hasattr(faithfulness_result, 'score') else faithfulness_result
-    
+    response = None
+    if checkpoints is not None:
+        response = checkpoints.get("rag", row_key, RAG_CONFIG_HASH)
+
+    rag_ok = True
+    error = None
+    if response is None:
+        # rag_client.query es síncrono: se ejecuta en un thread con rate limit y reintentos
+        try:
+            response = await runner.call(
+                rag_client.query,
+                question,
+                estimated_tokens=estimate_tokens(question) + EVAL_TOKENS_PER_CALL,
+            )
+            if checkpoints is not None:
+                checkpoints.put("rag", row_key, RAG_CONFIG_HASH, response)
+        except Exception as e:
+            rag_ok = False
+            error = f"RAG: {e}"
+            response = {"answer": f"Error processing query: {e}", "contexts": [], "logs": " "}
+
+    answer = response.get("answer", "")
+    contexts = response.get("contexts", [])
+
     # Métricas Personalizadas
     # Preparar datos para métricas
     metric_row = {
@@ -135,11 +374,26 @@ async def run_experiment(row):
         "response": answer,
         "reference": ground_truth
     }
-    
-    # Calcular métricas personalizadas
-    formalidad_score = await formalidad_metric._ascore(metric_row)
-    completitud_score = await completitud_metric._ascore(metric_row)
-    claridad_score = await claridad_metric._ascore(metric_row)
+
+    # Las 4 métricas son independientes: se calculan concurrentemente
+    custom_scores = asyncio.gather(
+        metric_backend.ascore("formalidad", metric_row),
+        metric_backend.ascore("completitud", metric_row),
+        metric_backend.ascore("claridad", metric_row),
+    )
+    if rag_ok:
+        # Métrica RAGAS: Faithfulness
+        faithfulness_result, (formalidad_score, completitud_score, claridad_score) = await asyncio.gather(
+            _score_faithfulness(question, answer, contexts),
+            custom_scores,
+        )
+        faithfulness_score = faithfulness_result.score if hasattr(faithfulness_result, 'score') else faithfulness_result
+        # Guardar el valor numérico (serializable) en lugar del objeto MetricResult
+        faithfulness_score = getattr(faithfulness_score, 'value', faithfulness_score)
+    else:
+        # Sin respuesta del RAG no hay nada que juzgar: la fila queda como error, sin llamar al juez
+        faithfulness_score = None
+        formalidad_score, completitud_score, claridad_score = await custom_scores
 
     experiment_view = {
         **row,
@@ -150,86 +404,259 @@ async def run_experiment(row):
         "completitud": completitud_score,
         "claridad": claridad_score,
         "log_file": response.get("logs", " "),
+        "error": error,
     }
 
-    return experiment_view
+    return experiment_view, rag_ok
 
 
-async def main():
+async def main(charts=EVAL_CHARTS):
     print("\n" + "="*90)
     print("🚀 INICIANDO EVALUACIÓN CON RAGAS - FAITHFULNESS METRIC")
     print("="*90 + "\n")
     
+    setup()
+    from ragas import experiment
+    results_store = open_results_store()
+    
     # Cargar dataset
     print("📚 Cargando dataset...")
     dataset = load_dataset()
     print(f"✅ Dataset cargado: {dataset.name} con {len(dataset)} muestras\n")
     
     # Ejecutar experimento
-    print("🔄 Ejecutando experimento...")
-    experiment_results = await run_experiment.arun(dataset)
+    print(f"🔄 Ejecutando experimento (concurrencia: {EVAL_CONCURRENCY})...")
+    if checkpoints is not None and len(checkpoints):
+        print(f"♻️  Checkpoint: {len(checkpoints)} resultados previos en {EVAL_CHECKPOINT}")
+    try:
+        experiment_results = await experiment()(run_experiment).arun(dataset)
+    finally:
+        # También si el experimento falla: el cache de scores queda confirmado y cerrado
+        teardown()
     print("\n✅ Experimento completado!\n")
     
     # Convertir a DataFrame
     df = experiment_results.to_pandas()
     
-    # Extraer scores numéricos para todas las métricas
-    def extract_scores(df, column_name):
-        scores = []
-        for score in df[column_name]:
-            if hasattr(score, 'value'):
-                scores.append(score.value)
+    # Guardar en formato columnar (Parquet): scores tipados y contextos como listas
+    parquet_path = None
+    if results_store is not None:
+        parquet_path = results_store.append(experiment_results.name, df.to_dict("records"))
+    
+    chart_future = print_report(df, charts)
+    
+    # Guardar resultados (mientras tanto los gráficos se dibujan en otro proceso)
+    experiment_results.save()
+    csv_path = Path(".") / "experiments" / f"{experiment_results.name}.csv"
+    print(f"💾 Resultados guardados en: {csv_path.resolve()}")
+    if parquet_path is not None:
+        print(f"🗃️  Resultados columnares (Parquet) en: {parquet_path.resolve()}")
+    
+    finish_report(df, chart_future)
+
+
+async def sample_main(max_rows, baseline_run=None, max_half_width=0.05, seed=42, confidence=0.95):
+    """
+    Evalúa una muestra estratificada (por "category") en tandas y se detiene
+    cuando el IC de la diferencia de faithfulness contra `baseline_run` (o
+    de su media, sin base) tiene semiancho <= `max_half_width`. Si ninguna
+    fila tiene par en la base, evalúa la muestra completa y termina con
+    código 1 (sin comparación).
+    """
+    from datetime import datetime
+    from report import METRIC_COLUMNS, score_frame
+    from sampling import SequentialEstimator, stratified_order, stratum_sizes
+    
+    print("\n" + "="*90)
+    print("🎲 EVALUACIÓN POR MUESTREO ESTRATIFICADO")
+    print("="*90 + "\n")
+    
+    errors = validate_dataset(DATA_SAMPLES)
+    if errors:
+        raise ValueError("Dataset inválido:\n" + "\n".join(errors))
+    
+    setup()
+    results_store = open_results_store()
+    
+    # Scores del run base por pregunta, para diferencias pareadas
+    baseline = {}
+    if baseline_run:
+        if results_store is None:
+            print("❌ --baseline requiere EVAL_RESULTS_DIR (resultados en Parquet)")
+            sys.exit(1)
+        base_df = results_store.load(runs=[baseline_run], columns=["question", *METRIC_COLUMNS])
+        if base_df.empty:
+            print(f"❌ El experimento base '{baseline_run}' no existe en {EVAL_RESULTS_DIR}")
+            sys.exit(1)
+        base_scores = score_frame(base_df)[list(METRIC_COLUMNS)]
+        baseline = dict(zip(base_df["question"], base_scores.to_dict("records")))
+        print(f"📏 Base: '{baseline_run}' ({len(baseline)} preguntas)")
+    
+    def stratum(sample):
+        return sample.get("category", "")
+    
+    order = stratified_order(DATA_SAMPLES, stratum, seed=seed)[:max_rows]
+    estimator = SequentialEstimator(
+        stratum_sizes(DATA_SAMPLES, stratum), confidence=confidence, with_baseline=bool(baseline)
+    )
+    batch_size = max(2 * EVAL_CONCURRENCY, 10)
+    print(f"🔄 Hasta {len(order)} de {len(DATA_SAMPLES)} filas, en tandas de {batch_size} "
+          f"(objetivo: IC {confidence:.0%} con semiancho ≤ {max_half_width})\n")
+    
+    views = []
+    stopped = False
+    try:
+        for start in range(0, len(order), batch_size):
+            batch = [DATA_SAMPLES[i] for i in order[start:start + batch_size]]
+            batch_views = await asyncio.gather(*(
+                run_experiment({"question": sample["question"], "references": sample["references"]})
+                for sample in batch
+            ))
+            for sample, view in zip(batch, batch_views):
+                # Las filas con error no tienen faithfulness: no entran en su estimación
+                scores = {
+                    column: float(getattr(view[column], "value", view[column]))
+                    for column in METRIC_COLUMNS
+                    if view[column] is not None
+                }
+                estimator.add(stratum(sample), scores, baseline.get(sample["question"]))
+            views.extend(batch_views)
+        
+            # Sin filas pareadas con la base todavía no hay diferencia: se muestra la
+            # media, pero la parada espera a la diferencia
+            difference = estimator.difference("faithfulness") if baseline else None
+            interval = difference or estimator.estimate("faithfulness")
+            label = "Δ faithfulness" if difference is not None else "faithfulness"
+            if interval is not None:
+                print(f"   {estimator.n:>6} filas | {label}: {interval.mean:+.4f} ± {interval.half_width:.4f}")
+            if estimator.should_stop("faithfulness", max_half_width):
+                stopped = True
+                break
+    finally:
+        teardown()
+    
+    print()
+    if stopped:
+        print(f"⏹️  Parada temprana: {estimator.n} de {len(DATA_SAMPLES)} filas evaluadas")
+    else:
+        print(f"⏹️  Muestra completa ({estimator.n} filas) sin alcanzar el semiancho objetivo")
+    if baseline and estimator.paired < estimator.n:
+        print(f"⚠️  {estimator.n - estimator.paired} filas sin pregunta equivalente en el run base")
+    
+    print("\n" + "="*100)
+    print(f"📊 RESULTADOS DE LA MUESTRA (IC {confidence:.0%})")
+    print("="*100 + "\n")
+    for column, metric_name in METRIC_COLUMNS.items():
+        estimate = estimator.estimate(column)
+        if estimate is None:
+            continue
+        line = f"   {metric_name:13s}: {estimate.mean:.4f} [{estimate.low:.4f}, {estimate.high:.4f}]"
+        difference = estimator.difference(column) if baseline else None
+        if difference is not None:
+            if difference.high < 0:
+                verdict = "❌ Regresión"
+            elif difference.low > 0:
+                verdict = "✅ Mejora"
             else:
-                try:
-                    scores.append(float(str(score).split('(value=')[1].split(')')[0]))
-                except:
-                    try:
-                        scores.append(float(score))
-                    except:
-                        scores.append(0.0)
-        return scores
+                verdict = "➖ Sin diferencia significativa"
+            line += f" | Δ vs base: {difference.mean:+.4f} [{difference.low:+.4f}, {difference.high:+.4f}] {verdict}"
+        elif baseline:
+            line += " | Δ vs base: sin comparación"
+        print(line)
+    print()
+    
+    if results_store is not None:
+        run = f"muestra-{datetime.now():%Y%m%d-%H%M%S}"
+        path = results_store.append(run, views)
+        print(f"🗃️  Filas de la muestra guardadas en: {path.resolve()}")
     
-    # Extraer scores de todas las métricas
+    if baseline and estimator.paired == 0:
+        print(f"❌ Sin comparación: ninguna fila de la muestra tiene par en el run base '{baseline_run}'")
+        sys.exit(1)
+
+
+def report_from_results(run=None, charts=EVAL_CHARTS):
+    """Reporte de un experimento guardado en EVAL_RESULTS_DIR, sin llamar al LLM."""
+    results_store = open_results_store()
+    if results_store is None:
+        print("❌ EVAL_RESULTS_DIR está desactivado: no hay resultados guardados para reportar")
+        sys.exit(1)
+    run = run or results_store.latest_run()
+    if run is None:
+        print(f"❌ No hay experimentos guardados en {EVAL_RESULTS_DIR}")
+        sys.exit(1)
+    
+    df = results_store.load(runs=[run])
+    if df.empty:
+        print(f"❌ El experimento '{run}' no existe en {EVAL_RESULTS_DIR}")
+        sys.exit(1)
+    print(f"\n📂 Reporte del experimento '{run}' ({len(df)} filas, desde {EVAL_RESULTS_DIR})\n")
+    
+    chart_future = print_report(df, charts)
+    finish_report(df, chart_future)
+
+
+def print_report(df, charts=EVAL_CHARTS):
+    """Imprime el reporte por consola y lanza los gráficos; devuelve su Future (o None)."""
+    from report import METRIC_COLUMNS, global_average, rank_rows, score_frame, summarize
+    
+    # Extraer scores de todas las métricas (vectorizado, ver report.py)
+    chart_future = None
     if "faithfulness" in df.columns:
-        faithfulness_scores = extract_scores(df, "faithfulness")
-        formalidad_scores = extract_scores(df, "formalidad")
-        completitud_scores = extract_scores(df, "completitud")
-        claridad_scores = extract_scores(df, "claridad")
+        scores = score_frame(df)
+        summary = summarize(scores)
+        ranking = rank_rows(df, scores)
+        global_avg = global_average(scores)
+        
+        if "error" in df.columns:
+            failed = int(df["error"].notna().sum())
+            if failed:
+                print(f"⚠️  {failed} filas con error en el RAG: sin Faithfulness (cuenta como 0 en el reporte)\n")
+        
+        # Los gráficos se dibujan en otro proceso mientras se imprime el reporte
+        if charts:
+            chart_future = submit_render(
+                {column: scores[column].tolist() for column in METRIC_COLUMNS},
+                {column: float(summary.loc[column, "mean"]) for column in METRIC_COLUMNS},
+                global_avg,
+                outdir=str(Path(".") / "experiments"),
+                max_rows=EVAL_CHART_MAX_ROWS,
+            )
         
         # Mostrar resultados en consola con formato atractivo
         print("="*100)
         print("📊 RESULTADOS DE EVALUACIÓN - TODAS LAS MÉTRICAS")
         print("="*100 + "\n")
         
-        for i, (idx, row) in enumerate(df.iterrows(), 1):
-            question = row['question'][:60] + "..." if len(row['question']) > 60 else row['question']
-            
-            f_score = faithfulness_scores[i-1]
-            fo_score = formalidad_scores[i-1]
-            co_score = completitud_scores[i-1]
-            cl_score = claridad_scores[i-1]
-            
+        metric_icons = {"faithfulness": "🎯", "formalidad": "👔", "completitud": "📋", "claridad": "💡"}
+        
+        def print_row(i, question, row_scores):
+            question = question[:60] + "..." if len(question) > 60 else question
             print(f"🔹 PREGUNTA {i}: {question}")
             print(f"   {'─'*90}")
             
             # Mostrar cada métrica con barra visual
-            metrics = [
-                ("Faithfulness", f_score, "🎯"),
-                ("Formalidad", fo_score, "👔"),
-                ("Completitud", co_score, "📋"),
-                ("Claridad", cl_score, "💡")
-            ]
-            
-            for metric_name, score, icon in metrics:
+            for column, metric_name in METRIC_COLUMNS.items():
+                score = row_scores[column]
                 bar_length = int(score * 20)
                 bar = "█" * bar_length + "░" * (20 - bar_length)
                 status = "✅" if score >= 0.8 else "⚠️" if score >= 0.6 else "❌"
-                print(f"   {icon} {metric_name:13s}: {score:.4f} [{bar}] {status}")
+                print(f"   {metric_icons[column]} {metric_name:13s}: {score:.4f} [{bar}] {status}")
             
             # Promedio de todas las métricas
-            avg_score = (f_score + fo_score + co_score + cl_score) / 4
             print(f"   {'─'*90}")
-            print(f"   📊 PROMEDIO GENERAL: {avg_score:.4f}\n")
+            print(f"   📊 PROMEDIO GENERAL: {row_scores['average']:.4f}\n")
+        
+        if len(df) <= EVAL_REPORT_ROWS:
+            for i, row_scores in enumerate(scores.itertuples(index=False), 1):
+                print_row(i, df["question"].iat[i - 1], row_scores._asdict())
+        else:
+            # Con muchas filas solo se detallan los extremos del ranking
+            n = EVAL_REPORT_ROWS // 2
+            for title, rows in (("🏆 MEJORES", ranking.head(n)), ("🔻 PEORES", ranking.tail(n))):
+                print(f"{title} {n} de {len(df)} (por promedio)\n")
+                for row in rows.itertuples(index=False):
+                    print_row(row.row, row.question, row._asdict())
         
         # Estadísticas generales por métrica
         print("="*100)
@@ -237,164 +664,99 @@ async def main():
         print("="*100 + "\n")
         
         all_metrics = [
-            ("Faithfulness (RAGAS)", faithfulness_scores, "🎯"),
-            ("Formalidad del Tono", formalidad_scores, "👔"),
-            ("Completitud de Respuesta", completitud_scores, "📋"),
-            ("Claridad y Concisión", claridad_scores, "💡")
+            ("Faithfulness (RAGAS)", "faithfulness", "🎯"),
+            ("Formalidad del Tono", "formalidad", "👔"),
+            ("Completitud de Respuesta", "completitud", "📋"),
+            ("Claridad y Concisión", "claridad", "💡")
         ]
         
-        for metric_name, scores, icon in all_metrics:
-            avg = sum(scores) / len(scores)
-            max_s = max(scores)
-            min_s = min(scores)
-            std = pd.Series(scores).std()
-            
-            excellent = sum(1 for s in scores if s >= 0.8)
-            good = sum(1 for s in scores if 0.6 <= s < 0.8)
-            needs_improvement = sum(1 for s in scores if s < 0.6)
+        for metric_name, column, icon in all_metrics:
+            stats = summary.loc[column]
+            total = int(stats["count"])
             
             print(f"{icon} {metric_name}")
             print(f"   {'─'*85}")
-            print(f"   Promedio: {avg:.4f} | Máximo: {max_s:.4f} | Mínimo: {min_s:.4f} | Desv. Est.: {std:.4f}")
-            print(f"   Distribución: ✅ Excelente (≥0.8): {excellent}/{len(scores)} | "
-                  f"⚠️ Bueno (0.6-0.8): {good}/{len(scores)} | "
-                  f"❌ Mejorar (<0.6): {needs_improvement}/{len(scores)}\n")
-        
-        # Promedio global de todas las métricas
-        all_scores_flat = faithfulness_scores + formalidad_scores + completitud_scores + claridad_scores
-        global_avg = sum(all_scores_flat) / len(all_scores_flat)
+            print(f"   Promedio: {stats['mean']:.4f} | Máximo: {stats['max']:.4f} | Mínimo: {stats['min']:.4f} | Desv. Est.: {stats['std']:.4f}")
+            print(f"   Percentiles: p10 {stats['p10']:.4f} | p25 {stats['p25']:.4f} | p50 {stats['p50']:.4f} | "
+                  f"p75 {stats['p75']:.4f} | p90 {stats['p90']:.4f}")
+            print(f"   Distribución: ✅ Excelente (≥0.8): {int(stats['excellent'])}/{total} | "
+                  f"⚠️ Bueno (0.6-0.8): {int(stats['good'])}/{total} | "
+                  f"❌ Mejorar (<0.6): {int(stats['needs_improvement'])}/{total}\n")
         
         print("="*100)
         print(f"🌟 SCORE GLOBAL PROMEDIO (todas las métricas): {global_avg:.4f}")
         print("="*100 + "\n")
-        
-        # Generar visualización completa
+    
+    return chart_future
+
+
+def finish_report(df, chart_future):
+    if chart_future is not None:
         print("\n📊 Generando visualizaciones...")
-        
-        # ============================================================================
-        # GRÁFICO 1: Comparación de todas las métricas por pregunta
-        # ============================================================================
-        fig1, ax1 = plt.subplots(figsize=(16, 10))
-        fig1.patch.set_facecolor('#f8f9fa')
-        
-        x = range(1, len(faithfulness_scores) + 1)
-        width = 0.2
-        
-        bars1 = ax1.bar([i - 1.5*width for i in x], faithfulness_scores, width, 
-                        label='Faithfulness', color='#3498db', edgecolor='#2c3e50', linewidth=1.5)
-        bars2 = ax1.bar([i - 0.5*width for i in x], formalidad_scores, width,
-                        label='Formalidad', color='#9b59b6', edgecolor='#2c3e50', linewidth=1.5)
-        bars3 = ax1.bar([i + 0.5*width for i in x], completitud_scores, width,
-                        label='Completitud', color='#2ecc71', edgecolor='#2c3e50', linewidth=1.5)
-        bars4 = ax1.bar([i + 1.5*width for i in x], claridad_scores, width,
-                        label='Claridad', color='#f39c12', edgecolor='#2c3e50', linewidth=1.5)
-        
-        # Línea de promedio global
-        ax1.axhline(y=global_avg, color='#e74c3c', linestyle='--', linewidth=2.5, 
-                    label=f'Promedio Global: {global_avg:.3f}', alpha=0.7)
-        
-        ax1.set_xlabel('Número de Pregunta', fontsize=13, fontweight='bold')
-        ax1.set_ylabel('Score', fontsize=13, fontweight='bold')
-        ax1.set_title('📊 Comparación de Métricas por Pregunta', fontsize=16, fontweight='bold', pad=20)
-        ax1.set_ylim([0, 1.1])
-        ax1.set_xticks(x)
-        ax1.grid(axis='y', alpha=0.3, linestyle='--')
-        ax1.legend(fontsize=11, loc='upper right', framealpha=0.9)
-        
-        plt.tight_layout()
-        img_path1 = Path(".") / "experiments" / "metricas_comparacion.png"
-        img_path1.parent.mkdir(parents=True, exist_ok=True)
-        plt.savefig(img_path1, dpi=300, bbox_inches='tight', facecolor='#f8f9fa')
-        print(f"✅ Gráfico de comparación guardado en: {img_path1.resolve()}")
-        plt.close()
-        
-        # ============================================================================
-        # GRÁFICO 2: Promedios por métrica (gráfico de barras horizontal)
-        # ============================================================================
-        fig2, ax2 = plt.subplots(figsize=(12, 8))
-        fig2.patch.set_facecolor('#f8f9fa')
-        
-        metrics_names = ['Faithfulness\n(RAGAS)', 'Formalidad\ndel Tono', 
-                        'Completitud\nde Respuesta', 'Claridad y\nConcisión']
-        metrics_avgs = [
-            sum(faithfulness_scores) / len(faithfulness_scores),
-            sum(formalidad_scores) / len(formalidad_scores),
-            sum(completitud_scores) / len(completitud_scores),
-            sum(claridad_scores) / len(claridad_scores)
-        ]
-        colors_avg = ['#3498db', '#9b59b6', '#2ecc71', '#f39c12']
-        
-        bars = ax2.barh(metrics_names, metrics_avgs, color=colors_avg, 
-                       edgecolor='#2c3e50', linewidth=2)
-        
-        # Agregar valores en las barras
-        for i, (bar, val) in enumerate(zip(bars, metrics_avgs)):
-            width = bar.get_width()
-            ax2.text(width + 0.02, bar.get_y() + bar.get_height()/2,
-                    f'{val:.4f}', ha='left', va='center', fontweight='bold', fontsize=12)
-        
-        ax2.set_xlabel('Score Promedio', fontsize=13, fontweight='bold')
-        ax2.set_title('📈 Promedio por Métrica', fontsize=16, fontweight='bold', pad=20)
-        ax2.set_xlim([0, 1.1])
-        ax2.grid(axis='x', alpha=0.3, linestyle='--')
-        
-        plt.tight_layout()
-        img_path2 = Path(".") / "experiments" / "metricas_promedios.png"
-        plt.savefig(img_path2, dpi=300, bbox_inches='tight', facecolor='#f8f9fa')
-        print(f"✅ Gráfico de promedios guardado en: {img_path2.resolve()}")
-        plt.close()
-        
-        # ============================================================================
-        # GRÁFICO 3: Heatmap de scores
-        # ============================================================================
-        fig3, ax3 = plt.subplots(figsize=(14, 8))
-        fig3.patch.set_facecolor('#f8f9fa')
-        
-        # Crear matriz de datos
-        data_matrix = [
-            faithfulness_scores,
-            formalidad_scores,
-            completitud_scores,
-            claridad_scores
-        ]
-        
-        im = ax3.imshow(data_matrix, cmap='RdYlGn', aspect='auto', vmin=0, vmax=1)
-        
-        # Configurar ejes
-        ax3.set_xticks(range(len(faithfulness_scores)))
-        ax3.set_xticklabels([f'P{i+1}' for i in range(len(faithfulness_scores))], fontsize=11)
-        ax3.set_yticks(range(4))
-        ax3.set_yticklabels(['Faithfulness', 'Formalidad', 'Completitud', 'Claridad'], fontsize=12)
-        
-        # Agregar valores en celdas
-        for i in range(4):
-            for j in range(len(faithfulness_scores)):
-                text = ax3.text(j, i, f'{data_matrix[i][j]:.2f}',
-                              ha="center", va="center", color="black", fontweight='bold', fontsize=10)
-        
-        ax3.set_title('🗺️ Heatmap de Scores por Pregunta y Métrica', fontsize=16, fontweight='bold', pad=20)
-        
-        # Barra de color
-        cbar = plt.colorbar(im, ax=ax3)
-        cbar.set_label('Score', fontsize=12, fontweight='bold')
-        
-        plt.tight_layout()
-        img_path3 = Path(".") / "experiments" / "metricas_heatmap.png"
-        plt.savefig(img_path3, dpi=300, bbox_inches='tight', facecolor='#f8f9fa')
-        print(f"✅ Heatmap guardado en: {img_path3.resolve()}")
-        plt.close()
-        
+        try:
+            for label, path in chart_future.result():
+                print(f"✅ {label} guardado en: {path.resolve()}")
+        except Exception as e:
+            print(f"⚠️  No se pudieron generar los gráficos: {e}")
+    
+    if "faithfulness" in df.columns:
         print("\n" + "="*90)
         print("✨ ¡EVALUACIÓN COMPLETADA! ✨")
         print("="*90 + "\n")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Evaluación del sistema RAG con RAGAS (Lab 8).",
+        epilog="Concurrencia, rate limit, caches y salidas se configuran con variables EVAL_* (ver README).",
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--validate", action="store_true",
+                      help="valida el dataset y termina (no requiere API key)")
+    mode.add_argument("--report", nargs="?", const="", metavar="RUN",
+                      help="reporte desde los resultados guardados, sin llamar al LLM "
+                           "(por defecto, el último experimento)")
+    mode.add_argument("--sample", type=int, metavar="N",
+                      help="evalúa como máximo N filas de una muestra estratificada, con "
+                           "intervalos de confianza y parada temprana")
+    parser.add_argument("--baseline", metavar="RUN",
+                        help="con --sample: run guardado contra el que se comparan los scores")
+    parser.add_argument("--ci-width", type=float, default=0.05, metavar="W",
+                        help="con --sample: semiancho del IC 95%% que detiene el muestreo (default: 0.05)")
+    parser.add_argument("--seed", type=int, default=42, help="con --sample: semilla del muestreo")
+    parser.add_argument("--no-charts", action="store_true", help="no generar gráficos PNG")
+    args = parser.parse_args(argv)
+    if args.sample is not None and args.sample < 1:
+        parser.error("--sample debe ser >= 1")
+    if args.baseline and args.sample is None:
+        parser.error("--baseline requiere --sample")
+    return args
+
+
+def cli(argv=None):
+    args = parse_args(argv)
+    charts = EVAL_CHARTS and not args.no_charts
     
-    # Guardar resultados
-    experiment_results.save()
-    csv_path = Path(".") / "experiments" / f"{experiment_results.name}.csv"
-    print(f"💾 Resultados guardados en: {csv_path.resolve()}")
+    if args.validate:
+        errors = validate_dataset(DATA_SAMPLES)
+        for error in errors:
+            print(f"❌ {error}")
+        if errors:
+            sys.exit(1)
+        print(f"✅ Dataset válido: {len(DATA_SAMPLES)} muestras")
+        return
+    
+    try:
+        if args.report is not None:
+            report_from_results(args.report or None, charts=charts)
+        elif args.sample is not None:
+            asyncio.run(sample_main(args.sample, args.baseline, max_half_width=args.ci_width, seed=args.seed))
+        else:
+            asyncio.run(main(charts=charts))
+    finally:
+        # El proceso de gráficos se comparte entre reportes: se cierra al salir
+        shutdown_charts()
 
 
 if __name__ == "__main__":
-    import asyncio
-
-    asyncio.run(main())
+    cli()
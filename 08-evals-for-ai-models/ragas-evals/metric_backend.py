@@ -0,0 +1,143 @@
+"""
+Backends de Ejecución para Métricas Heurísticas
+===============================================
+
+Las métricas de custom_metrics.py son `async` pero 100% CPU (regex y
+strings): ejecutadas dentro del event loop lo bloquean y compiten por el GIL
+con las métricas LLM, que son de red.
+
+Este módulo ofrece dos backends con la misma interfaz async:
+
+- InlineMetricBackend: evalúa en el mismo proceso (datasets chicos)
+- ProcessPoolMetricBackend: envía lotes de filas a un ProcessPoolExecutor
+  y usa todos los núcleos sin bloquear el event loop
+
+Ejemplo de uso:
+    backend = ProcessPoolMetricBackend(
+        {"formalidad": FormalidadMetric(name="formalidad_tono")},
+        max_workers=8,
+    )
+    score = await backend.ascore("formalidad", row)           # fila a fila
+    scores = await backend.score_batch("formalidad", rows)    # dataset completo
+    backend.close()
+"""
+
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+# Métricas instanciadas una sola vez por proceso worker
+_WORKER_METRICS: Dict[str, Any] = {}
+
+
+def _metric_specs(metrics: Dict[str, Any]) -> Dict[str, Tuple[type, str]]:
+    """(clase, name) de cada métrica: se re-crean en los workers en lugar de picklearlas."""
+    return {key: (type(metric), metric.name) for key, metric in metrics.items()}
+
+
+def _init_worker(specs: Dict[str, Tuple[type, str]]) -> None:
+    for key, (metric_cls, name) in specs.items():
+        _WORKER_METRICS[key] = metric_cls(name=name)
+
+
+def _score_items(items: List[Tuple[str, dict]]) -> List[float]:
+    """Ejecutado en el worker: evalúa una lista de (métrica, fila)."""
+    return [_WORKER_METRICS[key]._score(row) for key, row in items]
+
+
+class InlineMetricBackend:
+    """Evalúa las métricas en el proceso actual (sin overhead de IPC)."""
+
+    def __init__(self, metrics: Dict[str, Any]):
+        self.metrics = metrics
+
+    async def ascore(self, key: str, row: dict) -> float:
+        return self.metrics[key]._score(row)
+
+    async def score_batch(self, key: str, rows: List[dict]) -> List[float]:
+        metric = self.metrics[key]
+        return [metric._score(row) for row in rows]
+
+    def close(self) -> None:
+        pass
+
+
+class ProcessPoolMetricBackend:
+    """
+    Evalúa métricas heurísticas en un pool de procesos.
+
+    - ascore(): agrupa las llamadas fila a fila en lotes de `chunk_size`
+      (o lo pendiente tras `max_delay` segundos) y envía cada lote al pool
+    - score_batch(): divide un dataset completo en chunks y los reparte
+      entre los workers
+    """
+
+    def __init__(
+        self,
+        metrics: Dict[str, Any],
+        max_workers: Optional[int] = None,
+        chunk_size: int = 256,
+        max_delay: float = 0.01,
+    ):
+        if chunk_size < 1:
+            raise ValueError("chunk_size debe ser >= 1")
+        self.chunk_size = chunk_size
+        self.max_delay = max_delay
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            initializer=_init_worker,
+            initargs=(_metric_specs(metrics),),
+        )
+        self._pending: List[Tuple[str, dict, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    async def ascore(self, key: str, row: dict) -> float:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((key, row, future))
+        if len(self._pending) >= self.chunk_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_delay, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        loop = asyncio.get_running_loop()
+        items = [(key, row) for key, row, _ in batch]
+        pool_future = loop.run_in_executor(self._executor, _score_items, items)
+
+        def resolve(done: asyncio.Future) -> None:
+            error = done.exception() if not done.cancelled() else asyncio.CancelledError()
+            scores = done.result() if error is None else None
+            for i, (_, _, future) in enumerate(batch):
+                if future.done():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(scores[i])
+
+        pool_future.add_done_callback(resolve)
+
+    async def score_batch(self, key: str, rows: List[dict]) -> List[float]:
+        loop = asyncio.get_running_loop()
+        chunks = [
+            [(key, row) for row in rows[i : i + self.chunk_size]]
+            for i in range(0, len(rows), self.chunk_size)
+        ]
+        results = await asyncio.gather(
+            *(loop.run_in_executor(self._executor, _score_items, chunk) for chunk in chunks)
+        )
+        return [score for chunk_scores in results for score in chunk_scores]
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
@@ -1,8 +1,10 @@
 import json
 import os
-from dataclasses import asdict, dataclass
+import threading
+import time
+from dataclasses import asdict, dataclass, field
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
 
 from openai import OpenAI
 
@@ -15,6 +17,23 @@ DOCUMENTS = [
 ]
 
 
+DOCUMENT_METADATA = [
+    {"source": "historia", "language": "es", "date": "2024-01-15", "tenant": "lab8"},
+    {"source": "biologia", "language": "es", "date": "2024-02-03", "tenant": "lab8"},
+    {"source": "ciencias", "language": "es", "date": "2024-03-12", "tenant": "lab8"},
+    {"source": "informatica", "language": "es", "date": "2024-04-20", "tenant": "lab8"},
+    {"source": "salud", "language": "es", "date": "2024-05-08", "tenant": "lab8"},
+]
+
+
+@dataclass
+class Document:
+    """Document content plus filterable metadata (source, language, date, tenant...)"""
+
+    content: str
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
 @dataclass
 class TraceEvent:
     """Single event in the RAG application trace"""
@@ -24,6 +43,100 @@ class TraceEvent:
     data: Dict[str, Any]
 
 
+class MetadataIndex:
+    """
+    Precomputed bitmap index over document metadata.
+
+    For every (field, value) pair a bitmap is stored as a Python int where bit
+    i is set if document i has that value. Filters are resolved by AND/OR of
+    bitmaps before any scoring happens, so retrievers only scan the eligible
+    subset.
+
+    Filters use the Pinecone syntax already used in Lab 5:
+        {"language": "es"}
+        {"tenant": {"$in": ["lab8", "lab5"]}, "date": {"$gte": "2024-03-01"}}
+        {"$or": [{"source": "historia"}, {"source": "salud"}]}
+    Supported operators: $eq, $ne, $in, $nin, $gt, $gte, $lt, $lte, $and, $or.
+    """
+
+    def __init__(self, metadata: List[Dict[str, Any]]):
+        self.size = len(metadata)
+        self.all_bits = (1 << self.size) - 1
+        self.bitmaps: Dict[str, Dict[Any, int]] = {}
+        for i, meta in enumerate(metadata):
+            for key, value in meta.items():
+                values = value if isinstance(value, (list, tuple, set)) else [value]
+                field_index = self.bitmaps.setdefault(key, {})
+                for v in values:
+                    field_index[v] = field_index.get(v, 0) | (1 << i)
+
+    def _field_bits(self, key: str, condition: Any) -> int:
+        field_index = self.bitmaps.get(key, {})
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+
+        bits = self.all_bits
+        for op, operand in condition.items():
+            if op == "$eq":
+                match = field_index.get(operand, 0)
+            elif op == "$ne":
+                match = self.all_bits & ~field_index.get(operand, 0)
+            elif op in ("$in", "$nin"):
+                match = 0
+                for v in operand:
+                    match |= field_index.get(v, 0)
+                if op == "$nin":
+                    match = self.all_bits & ~match
+            elif op in ("$gt", "$gte", "$lt", "$lte"):
+                compare = {
+                    "$gt": lambda v: v > operand,
+                    "$gte": lambda v: v >= operand,
+                    "$lt": lambda v: v < operand,
+                    "$lte": lambda v: v <= operand,
+                }[op]
+                match = 0
+                for v, v_bits in field_index.items():
+                    try:
+                        if compare(v):
+                            match |= v_bits
+                    except TypeError:
+                        continue
+            else:
+                raise ValueError(f"Unsupported filter operator: {op}")
+            bits &= match
+        return bits
+
+    def evaluate(self, filters: Dict[str, Any]) -> int:
+        """Resolve a filter expression to a bitmap of eligible document ids"""
+        bits = self.all_bits
+        for key, condition in filters.items():
+            if key == "$and":
+                for sub in condition:
+                    bits &= self.evaluate(sub)
+            elif key == "$or":
+                any_bits = 0
+                for sub in condition:
+                    any_bits |= self.evaluate(sub)
+                bits &= any_bits
+            else:
+                bits &= self._field_bits(key, condition)
+            if not bits:
+                break
+        return bits
+
+    def select(self, filters: Optional[Dict[str, Any]]) -> Iterable[int]:
+        """Document ids matching the filters, in ascending order"""
+        if not filters:
+            return range(self.size)
+        bits = self.evaluate(filters)
+        ids = []
+        while bits:
+            lowest = bits & -bits
+            ids.append(lowest.bit_length() - 1)
+            bits ^= lowest
+        return ids
+
+
 class BaseRetriever:
     """
     Base class for retrievers.
@@ -32,13 +145,21 @@ class BaseRetriever:
 
     def __init__(self):
         self.documents = []
+        self.metadata_index = MetadataIndex([])
 
-    def fit(self, documents: List[str]):
-        """Store the documents"""
+    def fit(
+        self,
+        documents: List[str],
+        metadata: Optional[List[Dict[str, Any]]] = None,
+    ):
+        """Store the documents and build the metadata bitmap index"""
         self.documents = documents
+        self.metadata_index = MetadataIndex(metadata or [{} for _ in documents])
 
-    def get_top_k(self, query: str, k: int = 3) -> List[tuple]:
-        """Retrieve top-k most relevant documents for the query."""
+    def get_top_k(
+        self, query: str, k: int = 3, filters: Optional[Dict[str, Any]] = None
+    ) -> List[tuple]:
+        """Retrieve top-k most relevant documents among those matching filters."""
         raise NotImplementedError("Subclasses should implement this method.")
 
 
@@ -58,12 +179,15 @@ class SimpleKeywordRetriever(BaseRetriever):
                 matches += 1
         return matches
 
-    def get_top_k(self, query: str, k: int = 3) -> List[tuple]:
+    def get_top_k(
+        self, query: str, k: int = 3, filters: Optional[Dict[str, Any]] = None
+    ) -> List[tuple]:
         """Get top k documents by keyword match count"""
         scores = []
 
-        for i, doc in enumerate(self.documents):
-            match_count = self._count_keyword_matches(query, doc)
+        # Only documents passing the filters are scored
+        for i in self.metadata_index.select(filters):
+            match_count = self._count_keyword_matches(query, self.documents[i])
             scores.append((i, match_count))
 
         # Sort by match count (descending)
@@ -72,6 +196,108 @@ class SimpleKeywordRetriever(BaseRetriever):
         return scores[:k]
 
 
+class CrossEncoderReranker:
+    """
+    Re-ranks retriever candidates with a local cross-encoder running on CPU.
+
+    (query, passage) pairs are scored in batches of ``batch_size``. If scoring
+    does not finish within ``time_budget_s`` seconds (or the model fails), the
+    candidates are returned in the original retriever order.
+
+    The budget covers scoring only: the clock starts after the model is
+    loaded, so a cold load does not push the first queries into the fallback
+    (call ``warmup()`` up front to keep the load out of query latency too).
+    The deadline is checked between batches, so a single slow batch can still
+    overrun it by up to one batch; lower ``batch_size`` for a tighter bound.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+        batch_size: int = 16,
+        time_budget_s: float = 2.0,
+        model=None,
+    ):
+        """
+        Initialize the reranker
+
+        Args:
+            model_name: sentence-transformers cross-encoder to load on first use
+            batch_size: Number of (query, passage) pairs scored per forward pass
+            time_budget_s: Maximum seconds spent scoring before falling back
+            model: Optional preloaded model exposing predict(pairs, batch_size=...)
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be >= 1")
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.time_budget_s = time_budget_s
+        self._model = model
+
+    def _load_model(self):
+        """Load the cross-encoder lazily so importing rag.py stays cheap"""
+        if self._model is None:
+            from sentence_transformers import CrossEncoder
+
+            self._model = CrossEncoder(self.model_name, device="cpu")
+        return self._model
+
+    def warmup(self) -> None:
+        """Load the model and run one tiny batch so the first query pays no load cost"""
+        self._load_model().predict([("warmup", "warmup")], batch_size=1)
+
+    def rerank(
+        self, query: str, candidates: List[Dict[str, Any]], top_n: int
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Score candidates against the query and keep the best top_n
+
+        Args:
+            query: Search query
+            candidates: Retrieved documents, in retriever order
+            top_n: Number of documents to keep
+
+        Returns:
+            Tuple of (kept documents, stats for tracing)
+        """
+        start = time.perf_counter()
+        stats = {
+            "num_candidates": len(candidates),
+            "batch_size": self.batch_size,
+            "num_batches": 0,
+            "fallback": None,
+        }
+
+        scores: List[float] = []
+        try:
+            model = self._load_model()
+            stats["model_load_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            # The budget applies to scoring only, not to a cold model load
+            deadline = time.perf_counter() + self.time_budget_s
+            for i in range(0, len(candidates), self.batch_size):
+                if time.perf_counter() > deadline:
+                    stats["fallback"] = "time_budget_exceeded"
+                    break
+                batch = candidates[i : i + self.batch_size]
+                pairs = [(query, doc["content"]) for doc in batch]
+                scores.extend(
+                    float(s) for s in model.predict(pairs, batch_size=self.batch_size)
+                )
+                stats["num_batches"] += 1
+        except Exception as e:
+            stats["fallback"] = f"error: {e}"
+
+        stats["duration_ms"] = round((time.perf_counter() - start) * 1000, 3)
+
+        if stats["fallback"] is not None:
+            return candidates[:top_n], stats
+
+        ranked = sorted(
+            zip(candidates, scores), key=lambda pair: pair[1], reverse=True
+        )
+        return [{**doc, "rerank_score": score} for doc, score in ranked[:top_n]], stats
+
+
 class ExampleRAG:
     """
     Simple RAG system that:
@@ -86,6 +312,9 @@ class ExampleRAG:
         retriever: Optional[BaseRetriever] = None,
         system_prompt: Optional[str] = None,
         logdir: str = "logs",
+        reranker: Optional[CrossEncoderReranker] = None,
+        rerank_candidates: int = 20,
+        raise_errors: bool = False,
     ):
         """
         Initialize RAG system
@@ -95,9 +324,15 @@ class ExampleRAG:
             retriever: Document retriever (defaults to SimpleKeywordRetriever)
             system_prompt: System prompt template for generation
             logdir: Directory for trace log files
+            reranker: Optional re-ranking stage applied to the retrieved candidates
+            rerank_candidates: Candidates fetched from the retriever when re-ranking
+            raise_errors: Re-raise LLM errors instead of returning an error answer
+                (lets callers such as runner.ExperimentRunner retry them)
         """
         self.llm_client = llm_client
         self.retriever = retriever or SimpleKeywordRetriever()
+        self.reranker = reranker
+        self.rerank_candidates = rerank_candidates
         self.system_prompt = (
             system_prompt
             or """Answer the following question based on the provided documents:
@@ -108,7 +343,10 @@ class ExampleRAG:
                             """
         )
         self.documents = []
+        self.metadata = []
         self.is_fitted = False
+        self.raise_errors = raise_errors
+        self._local = threading.local()
         self.traces = []
         self.logdir = logdir
 
@@ -122,14 +360,44 @@ class ExampleRAG:
                 component="rag_system",
                 data={
                     "retriever_type": type(self.retriever).__name__,
+                    "reranker_type": (
+                        type(self.reranker).__name__ if self.reranker else None
+                    ),
                     "system_prompt_length": len(self.system_prompt),
                     "logdir": self.logdir,
                 },
             )
         )
 
-    def add_documents(self, documents: List[str]):
+    @property
+    def traces(self) -> List[TraceEvent]:
+        """Per-thread trace buffer, so concurrent queries do not mix their events"""
+        if not hasattr(self._local, "traces"):
+            self._local.traces = []
+        return self._local.traces
+
+    @traces.setter
+    def traces(self, value: List[TraceEvent]):
+        self._local.traces = value
+
+    @staticmethod
+    def _split_documents(
+        documents: List[Union[str, Document]],
+    ) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """Split plain strings or Document objects into contents and metadata"""
+        contents, metadata = [], []
+        for doc in documents:
+            if isinstance(doc, Document):
+                contents.append(doc.content)
+                metadata.append(dict(doc.metadata))
+            else:
+                contents.append(doc)
+                metadata.append({})
+        return contents, metadata
+
+    def add_documents(self, documents: List[Union[str, Document]]):
         """Add documents to the knowledge base"""
+        documents, metadata = self._split_documents(documents)
         self.traces.append(
             TraceEvent(
                 event_type="document_operation",
@@ -144,8 +412,9 @@ class ExampleRAG:
         )
 
         self.documents.extend(documents)
+        self.metadata.extend(metadata)
         # Refit retriever with all documents
-        self.retriever.fit(self.documents)
+        self.retriever.fit(self.documents, self.metadata)
         self.is_fitted = True
 
         self.traces.append(
@@ -160,8 +429,9 @@ class ExampleRAG:
             )
         )
 
-    def set_documents(self, documents: List[str]):
+    def set_documents(self, documents: List[Union[str, Document]]):
         """Set documents (replacing any existing ones)"""
+        documents, metadata = self._split_documents(documents)
         old_doc_count = len(self.documents)
 
         self.traces.append(
@@ -178,7 +448,8 @@ class ExampleRAG:
         )
 
         self.documents = documents
-        self.retriever.fit(self.documents)
+        self.metadata = metadata
+        self.retriever.fit(self.documents, self.metadata)
         self.is_fitted = True
 
         self.traces.append(
@@ -193,13 +464,23 @@ class ExampleRAG:
             )
         )
 
-    def retrieve_documents(self, query: str, top_k: int = 3) -> List[Dict[str, Any]]:
+    def retrieve_documents(
+        self,
+        query: str,
+        top_k: int = 3,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
         """
         Retrieve top-k most relevant documents for the query
 
+        When a reranker is configured, a wider set of rerank_candidates is
+        fetched from the retriever and only the best top_k after re-ranking
+        are returned.
+
         Args:
             query: Search query
             top_k: Number of documents to retrieve
+            filters: Optional metadata filter (see MetadataIndex)
 
         Returns:
             List of dictionaries containing document info
@@ -209,6 +490,8 @@ class ExampleRAG:
                 "No documents have been added. Call add_documents() or set_documents() first."
             )
 
+        fetch_k = max(top_k, self.rerank_candidates) if self.reranker else top_k
+
         self.traces.append(
             TraceEvent(
                 event_type="retrieval",
@@ -218,12 +501,15 @@ class ExampleRAG:
                     "query": query,
                     "query_length": len(query),
                     "top_k": top_k,
+                    "fetch_k": fetch_k,
+                    "filters": filters,
                     "total_documents": len(self.documents),
                 },
             )
         )
 
-        top_docs = self.retriever.get_top_k(query, k=top_k)
+        start = time.perf_counter()
+        top_docs = self.retriever.get_top_k(query, k=fetch_k, filters=filters)
 
         retrieved_docs = []
         for idx, score in top_docs:
@@ -233,8 +519,28 @@ class ExampleRAG:
                         "content": self.documents[idx],
                         "similarity_score": score,
                         "document_id": idx,
+                        "metadata": self.metadata[idx],
                     }
                 )
+        retrieval_ms = round((time.perf_counter() - start) * 1000, 3)
+
+        if self.reranker and retrieved_docs:
+            retrieved_docs, rerank_stats = self.reranker.rerank(
+                query, retrieved_docs, top_k
+            )
+            self.traces.append(
+                TraceEvent(
+                    event_type="rerank",
+                    component="reranker",
+                    data={
+                        "operation": "rerank_complete",
+                        "reranker_type": type(self.reranker).__name__,
+                        **rerank_stats,
+                    },
+                )
+            )
+        else:
+            retrieved_docs = retrieved_docs[:top_k]
 
         self.traces.append(
             TraceEvent(
@@ -245,19 +551,28 @@ class ExampleRAG:
                     "num_retrieved": len(retrieved_docs),
                     "scores": [doc["similarity_score"] for doc in retrieved_docs],
                     "document_ids": [doc["document_id"] for doc in retrieved_docs],
+                    "retrieval_ms": retrieval_ms,
                 },
             )
         )
 
         return retrieved_docs
 
-    def generate_response(self, query: str, top_k: int = 3) -> str:
+    def generate_response(
+        self,
+        query: str,
+        top_k: int = 3,
+        retrieved_docs: Optional[List[Dict[str, Any]]] = None,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> str:
         """
         Generate response to query using retrieved documents
 
         Args:
             query: User query
             top_k: Number of documents to retrieve
+            retrieved_docs: Already retrieved documents (skips a second retrieval)
+            filters: Optional metadata filter used when retrieving
 
         Returns:
             Generated response
@@ -268,7 +583,8 @@ class ExampleRAG:
             )
 
         # Retrieve relevant documents
-        retrieved_docs = self.retrieve_documents(query, top_k)
+        if retrieved_docs is None:
+            retrieved_docs = self.retrieve_documents(query, top_k, filters=filters)
 
         if not retrieved_docs:
             return "I couldn't find any relevant documents to answer your question."
@@ -299,6 +615,7 @@ class ExampleRAG:
         )
 
         try:
+            start = time.perf_counter()
             response = self.llm_client.chat.completions.create(
                 model="gpt-4o-mini",
                 messages=[
@@ -320,6 +637,7 @@ class ExampleRAG:
                             response.usage.model_dump() if response.usage else None
                         ),
                         "model": "gpt-4o-mini",
+                        "duration_ms": round((time.perf_counter() - start) * 1000, 3),
                     },
                 )
             )
@@ -334,10 +652,16 @@ class ExampleRAG:
                     data={"operation": "generate_response", "error": str(e)},
                 )
             )
+            if self.raise_errors:
+                raise
             return f"Error generating response: {str(e)}"
 
     def query(
-        self, question: str, top_k: int = 3, run_id: Optional[str] = None
+        self,
+        question: str,
+        top_k: int = 3,
+        run_id: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
         """
         Complete RAG pipeline: retrieve documents and generate response
@@ -346,6 +670,7 @@ class ExampleRAG:
             question: User question
             top_k: Number of documents to retrieve
             run_id: Optional run ID for tracing (auto-generated if not provided)
+            filters: Optional metadata filter (see MetadataIndex)
 
         Returns:
             Dictionary containing response and retrieved documents
@@ -366,14 +691,17 @@ class ExampleRAG:
                     "question": question,
                     "question_length": len(question),
                     "top_k": top_k,
+                    "filters": filters,
                     "total_documents": len(self.documents),
                 },
             )
         )
 
         try:
-            retrieved_docs = self.retrieve_documents(question, top_k)
-            response = self.generate_response(question, top_k)
+            retrieved_docs = self.retrieve_documents(question, top_k, filters=filters)
+            response = self.generate_response(
+                question, top_k, retrieved_docs=retrieved_docs
+            )
 
             result = {"answer": response, "run_id": run_id}
 
@@ -411,6 +739,8 @@ class ExampleRAG:
 
             # Return error result
             logs_path = self.export_traces_to_log(run_id, question, None)
+            if self.raise_errors:
+                raise
             return {
                 "answer": f"Error processing query: {str(e)}",
                 "contexts": [],
@@ -447,19 +777,34 @@ class ExampleRAG:
         return log_filepath
 
 
-def default_rag_client(llm_client, logdir: str = "logs") -> ExampleRAG:
+def default_rag_client(
+    llm_client,
+    logdir: str = "logs",
+    reranker: Optional[CrossEncoderReranker] = None,
+    raise_errors: bool = False,
+) -> ExampleRAG:
     """
-    Create a default RAG client with OpenAI LLM and optional retriever.
+    Create a default RAG client with OpenAI LLM and optional reranker.
 
     Args:
-        retriever: Optional retriever instance (defaults to SimpleKeywordRetriever)
+        llm_client: OpenAI client used for generation
         logdir: Directory for trace logs
+        reranker: Optional CrossEncoderReranker applied after retrieval
+        raise_errors: Re-raise LLM errors instead of returning an error answer
     Returns:
         ExampleRAG instance
     """
     retriever = SimpleKeywordRetriever()
-    client = ExampleRAG(llm_client=llm_client, retriever=retriever, logdir=logdir)
-    client.add_documents(DOCUMENTS)  # Add default documents
+    client = ExampleRAG(
+        llm_client=llm_client,
+        retriever=retriever,
+        logdir=logdir,
+        reranker=reranker,
+        raise_errors=raise_errors,
+    )
+    client.add_documents(  # Add default documents
+        [Document(content, meta) for content, meta in zip(DOCUMENTS, DOCUMENT_METADATA)]
+    )
     return client
 
 
@@ -0,0 +1,95 @@
+"""
+Agregación de Scores de Experimentos
+====================================
+
+Convierte los resultados de un experimento en un DataFrame de scores y
+calcula el resumen por métrica con operaciones vectorizadas de pandas
+(sin recorrer filas en Python), de modo que el reporte siga siendo
+instantáneo con 100k filas:
+
+- score_frame(df): una columna float por métrica + promedio por fila
+- summarize(scores): promedio, desvío, mínimo, máximo, cuantiles y
+  cantidad de filas por rango (excelente / bueno / mejorar)
+- rank_rows(df, scores): filas ordenadas por promedio, con su ranking
+
+Sirve tanto para `experiment_results.to_pandas()` como para
+`ResultsStore.load()`.
+
+Ejemplo de uso:
+    scores = score_frame(df)
+    summary = summarize(scores)
+    summary.loc["faithfulness", ["mean", "p50", "excellent"]]
+"""
+
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+# Columna del DataFrame -> nombre corto usado en el reporte
+METRIC_COLUMNS: Dict[str, str] = {
+    "faithfulness": "Faithfulness",
+    "formalidad": "Formalidad",
+    "completitud": "Completitud",
+    "claridad": "Claridad",
+}
+EXCELLENT = 0.8
+GOOD = 0.6
+QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+_VALUE_RE = r"\(value=([^)]+)\)"
+
+
+def extract_scores(column: pd.Series) -> pd.Series:
+    """
+    Scores numéricos de una columna de resultados.
+
+    Acepta floats, MetricResult (`.value`) y su representación en texto
+    (`MetricResult(value=0.8)`, como queda al leer el CSV). Lo que no se
+    puede interpretar como número vale 0.0.
+    """
+    if column.dtype == object:
+        column = column.map(lambda score: getattr(score, "value", score))
+    scores = pd.to_numeric(column, errors="coerce")
+    missing = scores.isna() & column.notna()
+    if missing.any():
+        parsed = column[missing].astype(str).str.extract(_VALUE_RE, expand=False)
+        scores[missing] = pd.to_numeric(parsed, errors="coerce")
+    return scores.fillna(0.0).astype(float)
+
+
+def score_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Una columna float por métrica presente en `df`, más `average` por fila."""
+    scores = pd.DataFrame(
+        {column: extract_scores(df[column]) for column in METRIC_COLUMNS if column in df.columns},
+        index=df.index,
+    )
+    scores["average"] = scores.mean(axis=1)
+    return scores
+
+
+def summarize(scores: pd.DataFrame) -> pd.DataFrame:
+    """Resumen por métrica (filas) con estadísticos y conteos por rango (columnas)."""
+    metrics = scores[[column for column in scores.columns if column in METRIC_COLUMNS]]
+    summary = metrics.agg(["mean", "std", "min", "max"]).T
+    quantiles = metrics.quantile(list(QUANTILES)).T
+    quantiles.columns = [f"p{int(q * 100)}" for q in QUANTILES]
+    summary = summary.join(quantiles)
+    summary["excellent"] = (metrics >= EXCELLENT).sum()
+    summary["good"] = ((metrics >= GOOD) & (metrics < EXCELLENT)).sum()
+    summary["needs_improvement"] = (metrics < GOOD).sum()
+    summary["count"] = metrics.count()
+    return summary
+
+
+def global_average(scores: pd.DataFrame) -> float:
+    """Promedio de todos los scores de todas las métricas."""
+    values = scores[[column for column in scores.columns if column in METRIC_COLUMNS]].to_numpy()
+    return float(values.mean()) if values.size else 0.0
+
+
+def rank_rows(df: pd.DataFrame, scores: pd.DataFrame) -> pd.DataFrame:
+    """Pregunta + scores ordenados de mejor a peor promedio, con columna `rank` (1 = mejor)."""
+    ranked = scores.assign(question=df["question"], row=np.arange(1, len(df) + 1))
+    ranked["rank"] = ranked["average"].rank(ascending=False, method="min").astype(int)
+    return ranked.sort_values(["rank", "row"])
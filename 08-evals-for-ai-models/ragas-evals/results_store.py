@@ -0,0 +1,157 @@
+"""
+Resultados de Experimentos en Formato Columnar
+==============================================
+
+Guarda las filas y scores de cada experimento en Parquet (pyarrow), en
+lugar de depender solo del CSV de Ragas:
+
+- Columnas tipadas: scores como float64 y referencias/contextos como
+  list<string> (sin escapar listas dentro de celdas CSV)
+- Un directorio por experimento (partición `run=<nombre>`); cada append()
+  escribe un archivo nuevo, sin reescribir lo ya guardado
+- load() lee solo las columnas y filas pedidas: los filtros se aplican al
+  leer (pyarrow.dataset), sin cargar el resto en memoria
+
+Ejemplo de uso:
+    store = ResultsStore("experiments/results")
+    store.append("experimento_1", rows)
+    df = store.load(
+        runs=["experimento_1"],
+        columns=["question", "faithfulness"],
+        filter=ds.field("faithfulness") < 0.6,
+    )
+"""
+
+import ast
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+SCORE_COLUMNS = ["faithfulness", "formalidad", "completitud", "claridad"]
+
+RESULTS_SCHEMA = pa.schema(
+    [
+        ("question", pa.string()),
+        ("references", pa.list_(pa.string())),
+        ("response", pa.string()),
+        ("contexts", pa.list_(pa.string())),
+        *[(column, pa.float64()) for column in SCORE_COLUMNS],
+        ("log_file", pa.string()),
+        ("error", pa.string()),  # error del RAG (filas sin faithfulness), None si no hubo
+    ]
+)
+
+
+def _as_list(value: Any) -> List[str]:
+    """Lista de strings; acepta listas ya serializadas por el backend CSV."""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        text = value.strip()
+        if text.startswith("["):
+            for parse in (json.loads, ast.literal_eval):
+                try:
+                    return [str(item) for item in parse(text)]
+                except (ValueError, SyntaxError):
+                    continue
+        return [value]
+    return [str(item) for item in value]
+
+
+def _as_float(value: Any) -> Optional[float]:
+    """Score numérico (MetricResult.value si corresponde); None si no hay score."""
+    value = getattr(value, "value", value)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _as_str(value: Any) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+_CONVERTERS = {
+    pa.string(): _as_str,
+    pa.list_(pa.string()): _as_list,
+    pa.float64(): _as_float,
+}
+
+
+class ResultsStore:
+    """Dataset Parquet particionado por experimento (`root/run=<nombre>/*.parquet`)."""
+
+    def __init__(self, root: str, schema: pa.Schema = RESULTS_SCHEMA):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.schema = schema
+        self.partitioning = ds.partitioning(pa.schema([("run", pa.string())]), flavor="hive")
+
+    def append(self, run: str, rows: Iterable[Dict[str, Any]]) -> Path:
+        """Agrega filas al experimento `run` en un archivo Parquet nuevo."""
+        rows = list(rows)
+        columns = {
+            field.name: pa.array(
+                [_CONVERTERS[field.type](row.get(field.name)) for row in rows],
+                type=field.type,
+            )
+            for field in self.schema
+        }
+        table = pa.Table.from_pydict(columns, schema=self.schema)
+
+        run_dir = self.root / f"run={run}"
+        run_dir.mkdir(parents=True, exist_ok=True)
+        name = f"part-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet"
+        # Se escribe con prefijo "." (ignorado por los lectores) y se renombra:
+        # un crash a mitad de escritura nunca deja un archivo parcial visible
+        tmp_path = run_dir / f".{name}"
+        pq.write_table(table, tmp_path, compression="zstd")
+        path = run_dir / name
+        os.replace(tmp_path, path)
+        return path
+
+    def runs(self) -> List[str]:
+        """Nombres de los experimentos guardados."""
+        return sorted(
+            path.name.split("=", 1)[1]
+            for path in self.root.glob("run=*")
+            if path.is_dir()
+        )
+
+    def latest_run(self) -> Optional[str]:
+        """Experimento modificado más recientemente (el último append)."""
+        run_dirs = [path for path in self.root.glob("run=*") if path.is_dir()]
+        if not run_dirs:
+            return None
+        latest = max(run_dirs, key=lambda path: path.stat().st_mtime)
+        return latest.name.split("=", 1)[1]
+
+    def dataset(self) -> ds.Dataset:
+        """Vista lazy de todos los experimentos (columna `run` incluida)."""
+        return ds.dataset(
+            self.root,
+            schema=self.schema.append(pa.field("run", pa.string())),
+            format="parquet",
+            partitioning=self.partitioning,
+        )
+
+    def load(
+        self,
+        runs: Optional[List[str]] = None,
+        columns: Optional[List[str]] = None,
+        filter: Optional[ds.Expression] = None,
+    ):
+        """DataFrame con las columnas y filas pedidas de uno o varios experimentos."""
+        if runs is not None:
+            run_filter = ds.field("run").isin(runs)
+            filter = run_filter if filter is None else run_filter & filter
+        return self.dataset().to_table(columns=columns, filter=filter).to_pandas()
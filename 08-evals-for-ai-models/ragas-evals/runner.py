@@ -0,0 +1,83 @@
+"""
+Ejecución Concurrente de Experimentos
+=====================================
+
+Utilidades para correr las filas de un experimento en paralelo sin
+saturar la API de OpenAI:
+
+- ExperimentRunner: límite de concurrencia + rate limit + reintentos
+
+El token bucket (RateLimiter) y los reintentos con backoff (with_retries)
+vienen de `common/rate_limit.py`, compartido con el Lab 6; evals.py agrega
+la raíz del repositorio al path.
+
+Ejemplo de uso:
+    runner = ExperimentRunner(concurrency=8, requests_per_minute=500)
+    async with runner.slot():
+        response = await runner.call(rag_client.query, question)
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Optional
+
+from common.rate_limit import RateLimiter, estimate_tokens, with_retries
+
+__all__ = ["ExperimentRunner", "RateLimiter", "estimate_tokens", "with_retries"]
+
+
+class ExperimentRunner:
+    """
+    Limita la concurrencia de un experimento y envuelve cada llamada externa
+    con rate limit y reintentos.
+
+    - slot(): como máximo `concurrency` filas se procesan a la vez
+    - call(): ejecuta una función (sync en un thread, o async) respetando
+      el rate limit y reintentando errores transitorios
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 8,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+    ):
+        if concurrency < 1:
+            raise ValueError("concurrency debe ser >= 1")
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    @asynccontextmanager
+    async def slot(self):
+        """Reserva uno de los `concurrency` lugares para procesar una fila."""
+        async with self._semaphore:
+            yield
+
+    async def call(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        estimated_tokens: int = 1,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        Llama a `fn(*args, **kwargs)` con rate limit y reintentos.
+
+        Las funciones síncronas (ej. rag_client.query) se ejecutan con
+        asyncio.to_thread para no bloquear el event loop.
+        """
+
+        async def attempt():
+            await self.limiter.acquire(estimated_tokens)
+            if asyncio.iscoroutinefunction(fn):
+                return await fn(*args, **kwargs)
+            return await asyncio.to_thread(fn, *args, **kwargs)
+
+        return await with_retries(
+            attempt, max_retries=self.max_retries, base_delay=self.base_delay
+        )
@@ -0,0 +1,177 @@
+"""
+Muestreo Estratificado con Parada Temprana
+==========================================
+
+Para chequeos de rutina ("¿este cambio empeoró faithfulness?") no hace
+falta evaluar el dataset completo: alcanza con una muestra aleatoria
+estratificada y un intervalo de confianza lo bastante angosto.
+
+- stratified_order(): orden aleatorio en el que cualquier prefijo respeta
+  la proporción de cada estrato (se puede cortar en cualquier punto)
+- SequentialEstimator: acumula scores por estrato y calcula intervalos de
+  confianza de la media estratificada de cada métrica y de la diferencia
+  pareada contra un experimento base (misma pregunta, run anterior)
+- should_stop(): la muestra alcanza cuando el intervalo de la diferencia
+  (o de la media, si no hay base) tiene un semiancho <= `max_half_width`.
+  Con base pero sin filas pareadas no hay comparación: no se detiene
+
+Ejemplo de uso:
+    order = stratified_order(samples, lambda s: s["category"], seed=42)
+    estimator = SequentialEstimator(stratum_sizes(samples, key), with_baseline=True)
+    for i in order:
+        scores = await evaluate(samples[i])
+        estimator.add(key(samples[i]), scores, baseline.get(samples[i]["question"]))
+        if estimator.should_stop("faithfulness", max_half_width=0.05):
+            break
+    estimator.difference("faithfulness")   # Interval(mean, low, high, n)
+"""
+
+import math
+import random
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from statistics import NormalDist
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+
+@dataclass
+class Interval:
+    """Estimación puntual con su intervalo de confianza."""
+
+    mean: float
+    low: float
+    high: float
+    n: int
+
+    @property
+    def half_width(self) -> float:
+        return (self.high - self.low) / 2
+
+
+def stratum_sizes(samples: Sequence[Any], key: Callable[[Any], str]) -> Dict[str, int]:
+    """Tamaño de cada estrato en el dataset completo."""
+    return dict(Counter(key(sample) for sample in samples))
+
+
+def stratified_order(
+    samples: Sequence[Any], key: Callable[[Any], str], seed: int = 42
+) -> List[int]:
+    """
+    Índices de `samples` en un orden aleatorio estratificado.
+
+    Dentro de cada estrato el orden es aleatorio; entre estratos se elige
+    siempre el más atrasado respecto de su cuota proporcional, así que los
+    primeros n índices son (aproximadamente) una muestra estratificada
+    proporcional de tamaño n.
+    """
+    rng = random.Random(seed)
+    by_stratum: Dict[str, List[int]] = defaultdict(list)
+    for i, sample in enumerate(samples):
+        by_stratum[key(sample)].append(i)
+    for indices in by_stratum.values():
+        rng.shuffle(indices)
+
+    total = len(samples)
+    taken = {stratum: 0 for stratum in by_stratum}
+    order = []
+    for position in range(1, total + 1):
+        stratum = max(
+            (s for s in by_stratum if taken[s] < len(by_stratum[s])),
+            key=lambda s: position * len(by_stratum[s]) / total - taken[s],
+        )
+        order.append(by_stratum[stratum][taken[stratum]])
+        taken[stratum] += 1
+    return order
+
+
+class SequentialEstimator:
+    """
+    Medias estratificadas e intervalos de confianza (aproximación normal).
+
+    Cada estrato pesa según su tamaño en el dataset completo; la varianza
+    incluye la corrección por población finita, así que al evaluar un
+    estrato entero su aporte a la incertidumbre es cero. Con
+    `with_baseline=True` la parada depende solo de la diferencia contra la
+    base, aunque ninguna fila tenga par en ella.
+    """
+
+    def __init__(
+        self,
+        stratum_sizes: Dict[str, int],
+        confidence: float = 0.95,
+        with_baseline: bool = False,
+    ):
+        self.stratum_sizes = stratum_sizes
+        self.with_baseline = with_baseline
+        self.total = sum(stratum_sizes.values())
+        self.z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        self._scores: Dict[str, Dict[str, List[float]]] = defaultdict(lambda: defaultdict(list))
+        self._differences: Dict[str, Dict[str, List[float]]] = defaultdict(lambda: defaultdict(list))
+        self.n = 0
+        self.paired = 0
+
+    def add(
+        self,
+        stratum: str,
+        scores: Dict[str, float],
+        baseline: Optional[Dict[str, float]] = None,
+    ) -> None:
+        """Registra los scores de una fila y, si hay base, su diferencia con ella."""
+        self.n += 1
+        for metric, value in scores.items():
+            self._scores[metric][stratum].append(value)
+        if baseline is not None:
+            self.paired += 1
+            for metric, value in scores.items():
+                if metric in baseline:
+                    self._differences[metric][stratum].append(value - baseline[metric])
+
+    def _interval(self, values_by_stratum: Dict[str, List[float]], max_variance: float) -> Optional[Interval]:
+        sampled = {s: v for s, v in values_by_stratum.items() if v}
+        if not sampled:
+            return None
+        # Los pesos se renormalizan sobre los estratos ya muestreados
+        weight_total = sum(self.stratum_sizes[s] for s in sampled)
+        mean = 0.0
+        variance = 0.0
+        for stratum, values in sampled.items():
+            n_h = len(values)
+            size = self.stratum_sizes[stratum]
+            weight = size / weight_total
+            mean_h = sum(values) / n_h
+            mean += weight * mean_h
+            if n_h > 1:
+                var_h = sum((v - mean_h) ** 2 for v in values) / (n_h - 1)
+            else:
+                # Con una sola fila no hay varianza observable: se asume la máxima posible
+                var_h = max_variance
+            variance += weight ** 2 * (1 - n_h / size) * var_h / n_h
+        margin = self.z * math.sqrt(max(variance, 0.0))
+        n = sum(len(values) for values in sampled.values())
+        return Interval(mean, mean - margin, mean + margin, n)
+
+    def estimate(self, metric: str) -> Optional[Interval]:
+        """Media estratificada de `metric` con su intervalo de confianza (None sin filas)."""
+        return self._interval(self._scores.get(metric, {}), max_variance=0.25)  # scores en [0, 1]
+
+    def difference(self, metric: str) -> Optional[Interval]:
+        """Diferencia media (nuevo - base) sobre las filas pareadas (None si no hay ninguna)."""
+        return self._interval(self._differences.get(metric, {}), max_variance=1.0)  # diferencias en [-1, 1]
+
+    def target(self, metric: str) -> Optional[Interval]:
+        """
+        Intervalo que decide la parada: la diferencia contra la base si hay
+        filas pareadas con `metric`, si no la media. Con `with_baseline`,
+        solo la diferencia (None mientras no haya pares).
+        """
+        interval = self.difference(metric) if self.paired or self.with_baseline else None
+        if interval is not None or self.with_baseline:
+            return interval
+        return self.estimate(metric)
+
+    def should_stop(self, metric: str, max_half_width: float, min_rows: int = 30) -> bool:
+        """True si ya hay `min_rows` filas y el intervalo de target() es angosto."""
+        if self.n < min(min_rows, self.total):
+            return False
+        interval = self.target(metric)
+        return interval is not None and interval.half_width <= max_half_width
@@ -0,0 +1,147 @@
+"""
+Cache de Scores de Métricas
+===========================
+
+Memoización persistente (SQLite) de métricas evaluadas con LLM, como
+Faithfulness. Si la pregunta, la respuesta y los contextos no cambiaron
+desde el último experimento, el score se lee del cache en lugar de volver
+a pagar las llamadas al juez.
+
+La clave es un hash de:
+- nombre y versión de la métrica
+- modelo juez y temperatura
+- los inputs exactos (user_input, response, retrieved_contexts, ...)
+
+Ejemplo de uso:
+    cache = ScoreCache("experiments/score_cache.sqlite")
+    faithfulness = CachedMetric(
+        Faithfulness(llm=async_llm), cache,
+        name="faithfulness", version="ragas==0.3.0",
+        judge_model="gpt-4o-mini", temperature=0,
+    )
+    score = await faithfulness.ascore(user_input=q, response=a, retrieved_contexts=ctx)
+"""
+
+import asyncio
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from checkpoint import stable_hash
+
+
+class ScoreCache:
+    """Tabla SQLite clave -> score (JSON) compartida por todas las métricas."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS scores ("
+            " key TEXT PRIMARY KEY,"
+            " metric TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        row = self._conn.execute(
+            "SELECT value FROM scores WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, metric: str, value: Any) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO scores (key, metric, value, created_at) VALUES (?, ?, ?, ?)",
+            (key, metric, json.dumps(value), time.time()),
+        )
+        self._conn.commit()
+
+    def close(self) -> None:
+        """Confirma cualquier escritura pendiente y cierra la base."""
+        self._conn.commit()
+        self._conn.close()
+
+
+class CachedMetric:
+    """
+    Envuelve una métrica con ascore(**inputs) y memoiza su resultado.
+
+    Se guarda el valor numérico del score (MetricResult.value si existe).
+    Llamadas concurrentes con la misma clave comparten una única evaluación.
+    `call` permite envolver solo las evaluaciones reales (ej. runner.call con
+    rate limit y reintentos); los aciertos de cache no pasan por ahí.
+    """
+
+    def __init__(
+        self,
+        metric: Any,
+        cache: ScoreCache,
+        name: str,
+        version: str,
+        judge_model: Optional[str] = None,
+        temperature: Optional[float] = None,
+        call: Optional[Callable[..., Awaitable[Any]]] = None,
+    ):
+        self.metric = metric
+        self.call = call
+        self.cache = cache
+        self.name = name
+        self.version = version
+        self.judge_model = judge_model
+        self.temperature = temperature
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    def cache_key(self, inputs: Dict[str, Any]) -> str:
+        return stable_hash(
+            {
+                "metric": self.name,
+                "version": self.version,
+                "judge_model": self.judge_model,
+                "temperature": self.temperature,
+                "inputs": inputs,
+            }
+        )
+
+    async def ascore(self, **inputs: Any) -> Any:
+        key = self.cache_key(inputs)
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        if key in self._in_flight:
+            return await asyncio.shield(self._in_flight[key])
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            if self.call is not None:
+                result = await self.call(self.metric.ascore, **inputs)
+            else:
+                result = await self.metric.ascore(**inputs)
+            value = getattr(result, "value", result)
+            self.cache.put(key, self.name, value)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Evita el warning "exception was never retrieved" si nadie más espera
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
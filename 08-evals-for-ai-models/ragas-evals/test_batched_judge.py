@@ -0,0 +1,111 @@
+"""Tests del juez de Faithfulness por lotes con un cliente simulado (sin red)"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from batched_judge import BatchedFaithfulness, BatchError
+
+ROWS = [
+    {
+        "user_input": f"Pregunta {i}",
+        "response": ". ".join(["El sol es una estrella", "La luna es de queso", "El agua moja"][: i % 3 + 1]),
+        "retrieved_contexts": ["El sol es una estrella", "El agua moja"],
+    }
+    for i in range(7)
+]
+
+
+def verdicts(answer, contexts):
+    """Juez determinista: una afirmación por oración, respaldada si está en un contexto."""
+    return [
+        {"statement": statement, "verdict": int(any(statement in context for context in contexts))}
+        for statement in answer.split(". ")
+    ]
+
+
+class FakeFaithfulness:
+    """Fallback fila por fila con el mismo criterio que el juez simulado."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def ascore(self, user_input, response, retrieved_contexts):
+        self.calls += 1
+        statements = verdicts(response, retrieved_contexts)
+        return sum(s["verdict"] for s in statements) / len(statements)
+
+
+class FakeClient:
+    """Imita `client.chat.completions.create` de openai."""
+
+    def __init__(self, error=None, skip_ids=()):
+        self.error = error
+        self.skip_ids = set(skip_ids)
+        self.requests = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, messages, **kwargs):
+        self.requests += 1
+        if self.error is not None:
+            raise self.error
+        payload = json.loads(messages[-1]["content"])
+        items = [
+            {"id": item["id"], "statements": verdicts(item["answer"], item["contexts"])}
+            for item in payload["items"]
+            if item["id"] not in self.skip_ids
+        ]
+        content = json.dumps({"items": items})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def score_rows(judge):
+    async def main():
+        try:
+            return await asyncio.gather(*(judge.ascore(**row) for row in ROWS), return_exceptions=True)
+        finally:
+            judge.close()
+
+    return asyncio.run(main())
+
+
+def test_batched_scores_match_unbatched():
+    client = FakeClient()
+    fallback = FakeFaithfulness()
+    judge = BatchedFaithfulness(client, batch_size=4, max_delay=0.01, fallback=fallback)
+
+    batched = score_rows(judge)
+    unbatched = [asyncio.run(FakeFaithfulness().ascore(**row)) for row in ROWS]
+
+    assert batched == pytest.approx(unbatched)
+    assert client.requests == 2
+    assert fallback.calls == 0
+
+
+def test_rows_missing_from_the_batch_use_the_fallback():
+    fallback = FakeFaithfulness()
+    judge = BatchedFaithfulness(FakeClient(skip_ids={"1"}), batch_size=len(ROWS), fallback=fallback)
+
+    scores = score_rows(judge)
+
+    assert scores == pytest.approx([asyncio.run(FakeFaithfulness().ascore(**row)) for row in ROWS])
+    assert fallback.calls == 1
+    assert judge.fallbacks == 1
+
+
+def test_batch_error_reaches_every_row():
+    error = RuntimeError("429 Too Many Requests")
+    fallback = FakeFaithfulness()
+    judge = BatchedFaithfulness(FakeClient(error=error), batch_size=len(ROWS), fallback=fallback)
+
+    results = score_rows(judge)
+
+    assert all(isinstance(result, BatchError) for result in results)
+    assert [result.row_index for result in results] == list(range(len(ROWS)))
+    assert all(result.__cause__ is error for result in results)
+    # Una excepción por fila: no comparten traceback
+    assert len({id(result) for result in results}) == len(ROWS)
+    assert judge.failed_batches == 1
+    assert fallback.calls == 0
@@ -0,0 +1,75 @@
+"""Tests de las métricas personalizadas contra su implementación original"""
+
+import asyncio
+import re
+
+import pytest
+
+pytest.importorskip("ragas")
+pytest.importorskip("openai")
+
+from benchmarks import baseline_metrics  # noqa: E402
+from benchmarks.bench_custom_metrics import make_rows  # noqa: E402
+from custom_metrics import (  # noqa: E402
+    ClaridadMetric,
+    CompletitudMetric,
+    ConceptMatcher,
+    FormalidadMetric,
+    PatternSet,
+)
+
+ROWS = make_rows(300) + [
+    {"user_input": "¿Qué es?", "response": "", "reference": ""},
+    {"user_input": "", "response": "Sin pregunta.", "reference": ""},
+    {"user_input": "¿Cuál es la energía solar?", "response": "ENERGÍA solar!!! ok, q tal 👍", "reference": ""},
+]
+
+
+@pytest.mark.parametrize(
+    "current, original",
+    [
+        (FormalidadMetric, baseline_metrics.FormalidadMetric),
+        (CompletitudMetric, baseline_metrics.CompletitudMetric),
+        (ClaridadMetric, baseline_metrics.ClaridadMetric),
+    ],
+)
+def test_scores_match_original_implementation(current, original):
+    async def scores(metric):
+        return [await metric._ascore(row) for row in ROWS]
+
+    assert asyncio.run(scores(current(name="m"))) == asyncio.run(scores(original(name="m")))
+
+
+@pytest.mark.parametrize("min_automaton", [1, 1000])
+def test_concept_matcher_paths_agree_with_substring_search(min_automaton):
+    concepts = ["energía", "fotosíntesis", "planta", "luz", "síntesis", "ausente"]
+    matcher = ConceptMatcher(concepts, min_automaton=min_automaton)
+    assert (matcher.automaton is not None) == (min_automaton == 1)
+    for text in ("las plantas convierten luz en energía", "fotosíntesis: la síntesis", "nada", ""):
+        assert matcher.found(text) == {concept for concept in concepts if concept in text}
+
+
+EDGE_TEXTS = [
+    "OK okay Okay okey", "muy muy muy bueno", "xq x q pa", "Creo que PUES", "mapa q\n",
+    "re-hacer", "¿qué???!!", "İok ſuper super", "un   montón", "pa\tq", "👍🔥✨", "",
+]
+
+
+@pytest.mark.parametrize(
+    "pattern_set",
+    [FormalidadMetric.INFORMAL_SET, FormalidadMetric.CONTRACTION_SET],
+    ids=["informal", "contracciones"],
+)
+def test_pattern_set_counts_like_one_search_per_pattern(pattern_set):
+    for text in EDGE_TEXTS + [row["response"] for row in ROWS]:
+        expected = sum(1 for pattern in pattern_set.patterns if re.search(pattern, text, re.IGNORECASE))
+        assert pattern_set.count(text) == expected, text
+
+
+def test_pattern_set_without_words():
+    assert PatternSet([], [r"!{2,}"]).count("hola!!") == 1
+    assert PatternSet([r"hola"]).count("HOLA hola") == 1
+
+
+def test_informal_patterns_are_the_original_ones():
+    assert sorted(FormalidadMetric.INFORMAL_PATTERNS) == sorted(baseline_metrics.FormalidadMetric.INFORMAL_PATTERNS)
@@ -0,0 +1,66 @@
+"""Tests for the MetadataIndex filter operators and select()"""
+
+import pytest
+
+pytest.importorskip("openai")
+
+from rag import MetadataIndex  # noqa: E402
+
+METADATA = [
+    {"source": "historia", "date": "2024-01-15", "tenant": "lab8", "tags": ["a", "b"]},
+    {"source": "biologia", "date": "2024-02-03", "tenant": "lab8", "tags": ["b"]},
+    {"source": "ciencias", "date": "2024-03-12", "tenant": "lab5"},
+    {"source": "informatica", "date": "2024-04-20", "tenant": "lab8", "tags": ["c"]},
+    {"source": "salud", "date": "2024-05-08", "tenant": "lab5"},
+]
+
+
+@pytest.fixture
+def index():
+    return MetadataIndex(METADATA)
+
+
+@pytest.mark.parametrize(
+    "filters, expected",
+    [
+        ({"source": "historia"}, [0]),
+        ({"source": {"$eq": "salud"}}, [4]),
+        ({"tenant": {"$ne": "lab8"}}, [2, 4]),
+        ({"source": {"$in": ["historia", "salud", "missing"]}}, [0, 4]),
+        ({"source": {"$nin": ["historia", "salud"]}}, [1, 2, 3]),
+        ({"date": {"$gt": "2024-03-12"}}, [3, 4]),
+        ({"date": {"$gte": "2024-03-12"}}, [2, 3, 4]),
+        ({"date": {"$lt": "2024-02-03"}}, [0]),
+        ({"date": {"$lte": "2024-02-03"}}, [0, 1]),
+        ({"date": {"$gte": "2024-02-01", "$lt": "2024-04-01"}}, [1, 2]),
+        ({"tags": "b"}, [0, 1]),
+        ({"tenant": "lab8", "date": {"$gte": "2024-02-01"}}, [1, 3]),
+        ({"$and": [{"tenant": "lab5"}, {"date": {"$lt": "2024-05-01"}}]}, [2]),
+        ({"$or": [{"source": "historia"}, {"source": "salud"}]}, [0, 4]),
+        ({"tenant": "lab8", "$or": [{"tags": "c"}, {"source": "historia"}]}, [0, 3]),
+        ({"source": "missing"}, []),
+        ({"missing_field": "x"}, []),
+        ({"missing_field": {"$ne": "x"}}, [0, 1, 2, 3, 4]),
+    ],
+)
+def test_select_operators(index, filters, expected):
+    assert list(index.select(filters)) == expected
+
+
+def test_select_without_filters_returns_every_document(index):
+    assert list(index.select(None)) == [0, 1, 2, 3, 4]
+    assert list(index.select({})) == [0, 1, 2, 3, 4]
+
+
+def test_range_operators_skip_incomparable_values():
+    index = MetadataIndex([{"year": 2020}, {"year": "unknown"}, {"year": 2024}])
+    assert list(index.select({"year": {"$gte": 2021}})) == [2]
+
+
+def test_unsupported_operator_raises(index):
+    with pytest.raises(ValueError):
+        index.select({"source": {"$regex": "h.*"}})
+
+
+def test_evaluate_returns_bitmap(index):
+    assert index.evaluate({"tenant": "lab5"}) == 0b10100
@@ -0,0 +1,78 @@
+"""Tests del muestreo estratificado y del estimador secuencial"""
+
+from collections import Counter
+
+import pytest
+
+from sampling import SequentialEstimator, stratified_order, stratum_sizes
+
+SAMPLES = [{"category": "historia"}] * 6 + [{"category": "ciencia"}] * 3 + [{"category": "salud"}]
+
+
+def category(sample):
+    return sample["category"]
+
+
+def test_stratified_order_is_a_permutation():
+    order = stratified_order(SAMPLES, category, seed=7)
+    assert sorted(order) == list(range(len(SAMPLES)))
+    assert order == stratified_order(SAMPLES, category, seed=7)
+
+
+def test_stratified_order_prefixes_keep_proportions():
+    order = stratified_order(SAMPLES, category, seed=7)
+    sizes = stratum_sizes(SAMPLES, category)
+    for n in range(1, len(order) + 1):
+        prefix = Counter(category(SAMPLES[i]) for i in order[:n])
+        for stratum, size in sizes.items():
+            # Cada estrato queda a menos de una fila de su cuota proporcional
+            assert abs(prefix[stratum] - n * size / len(SAMPLES)) < 1
+
+
+def test_difference_is_none_without_paired_rows():
+    estimator = SequentialEstimator(stratum_sizes(SAMPLES, category))
+    estimator.add("historia", {"faithfulness": 0.8}, baseline=None)
+    estimator.add("ciencia", {"faithfulness": 0.6}, baseline=None)
+
+    assert estimator.paired == 0
+    assert estimator.difference("faithfulness") is None
+    # Sin pares con la base, la parada se decide con la media
+    assert estimator.target("faithfulness") == estimator.estimate("faithfulness")
+    assert estimator.should_stop("faithfulness", max_half_width=1.0, min_rows=2)
+
+
+def test_no_overlap_does_not_create_difference_entries():
+    estimator = SequentialEstimator({"historia": 2})
+    estimator.difference("faithfulness")
+    estimator.add("historia", {"faithfulness": 0.5})
+    assert estimator.difference("faithfulness") is None
+    assert not estimator.should_stop("faithfulness", max_half_width=0.0, min_rows=1)
+
+
+def test_paired_difference_drives_should_stop():
+    estimator = SequentialEstimator({"historia": 2})
+    estimator.add("historia", {"faithfulness": 0.9}, baseline={"faithfulness": 0.7})
+    estimator.add("historia", {"faithfulness": 0.8}, baseline={"faithfulness": 0.6})
+
+    difference = estimator.difference("faithfulness")
+    assert difference.mean == pytest.approx(0.2)
+    # El estrato completo está evaluado: la corrección por población finita anula la varianza
+    assert difference.half_width == pytest.approx(0.0)
+    assert estimator.target("faithfulness") == difference
+    assert estimator.should_stop("faithfulness", max_half_width=0.01, min_rows=2)
+
+
+def test_estimate_is_none_before_any_row():
+    estimator = SequentialEstimator({"historia": 2})
+    assert estimator.estimate("faithfulness") is None
+    assert not estimator.should_stop("faithfulness", max_half_width=1.0, min_rows=0)
+
+
+def test_baseline_without_pairs_never_stops_on_the_mean():
+    estimator = SequentialEstimator({"historia": 2}, with_baseline=True)
+    estimator.add("historia", {"faithfulness": 0.8}, baseline=None)
+    estimator.add("historia", {"faithfulness": 0.8}, baseline=None)
+
+    assert estimator.estimate("faithfulness").half_width == pytest.approx(0.0)
+    assert estimator.target("faithfulness") is None
+    assert not estimator.should_stop("faithfulness", max_half_width=1.0, min_rows=1)
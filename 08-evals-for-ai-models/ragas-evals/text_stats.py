@@ -0,0 +1,111 @@
+"""
+Análisis de Texto en una Pasada
+===============================
+
+Calcula de una sola vez las estadísticas de palabras, oraciones, bigramas
+y conectores que usan las métricas de custom_metrics.py:
+
+- Conteo con Counter / hashing (bigramas como tuplas, sin armar strings
+  con ' '.join)
+- El texto se pasa a minúsculas una única vez
+- Resultado cacheado por texto: las 3 métricas reutilizan el mismo análisis
+
+Ejemplo de uso:
+    stats = analyze("La fotosíntesis convierte luz en energía. Además...")
+    stats.lexical_diversity, stats.bigram_diversity, stats.connector_count
+"""
+
+import re
+import string
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List
+
+PUNCTUATION = string.punctuation
+WORD_RE = re.compile(r'\w+')
+SENTENCE_RE = re.compile(r'[^.!?]+')
+
+# Conectores que indican una estructura clara (ClaridadMetric)
+CONNECTORS = ('además', 'sin embargo', 'por lo tanto', 'asimismo', 'mientras',
+              'aunque', 'porque', 'ya que', 'debido a', 'en consecuencia')
+
+
+@dataclass
+class TextStats:
+    """Estadísticas de un texto. Las palabras son tokens separados por espacios."""
+
+    text: str
+    lower: str
+    num_words: int
+    stripped_length_sum: int      # suma de len(palabra sin puntuación)
+    word_counts: Counter          # palabra en minúsculas sin puntuación -> apariciones
+    lower_length_sum: int         # suma de len() de esas palabras
+    bigram_counts: Counter        # (palabra, siguiente) -> apariciones
+    sentence_lengths: List[int]   # palabras por oración no vacía
+    lowercase_starts: int         # oraciones que empiezan en minúscula
+    connector_count: int          # conectores distintos presentes
+
+    @property
+    def num_bigrams(self) -> int:
+        return max(0, self.num_words - 1)
+
+    @property
+    def lexical_diversity(self) -> float:
+        return len(self.word_counts) / self.num_words if self.num_words else 0.0
+
+    @property
+    def bigram_diversity(self) -> float:
+        return len(self.bigram_counts) / self.num_bigrams if self.num_bigrams else 0.0
+
+    @property
+    def avg_word_length(self) -> float:
+        """Largo promedio de palabra (minúsculas, sin puntuación)."""
+        return self.lower_length_sum / self.num_words if self.num_words else 0.0
+
+    @property
+    def avg_sentence_length(self) -> float:
+        if not self.sentence_lengths:
+            return 0.0
+        return sum(self.sentence_lengths) / len(self.sentence_lengths)
+
+
+@lru_cache(maxsize=4096)
+def analyze(text: str) -> TextStats:
+    """
+    Analiza `text` en una pasada por palabras y otra por oraciones.
+
+    El resultado se comparte entre métricas (lru_cache): no modificarlo.
+    """
+    lower = text.lower()
+
+    tokens = text.split()
+    stripped = [token.strip(PUNCTUATION) for token in tokens]
+    words = [word.lower() for word in stripped]
+    # Counter y zip cuentan en C; los bigramas son tuplas, no strings nuevos
+    word_counts = Counter(words)
+    bigram_counts = Counter(zip(words, words[1:]))
+
+    sentence_lengths = []
+    lowercase_starts = 0
+    for match in SENTENCE_RE.finditer(text):
+        sentence = match.group().strip()
+        if sentence:
+            sentence_lengths.append(len(sentence.split()))
+            if sentence[0].islower():
+                lowercase_starts += 1
+
+    connector_count = sum(1 for conn in CONNECTORS if conn in lower)
+
+    return TextStats(
+        text=text,
+        lower=lower,
+        num_words=len(words),
+        stripped_length_sum=sum(map(len, stripped)),
+        word_counts=word_counts,
+        lower_length_sum=sum(map(len, words)),
+        bigram_counts=bigram_counts,
+        sentence_lengths=sentence_lengths,
+        lowercase_starts=lowercase_starts,
+        connector_count=connector_count,
+    )
@@ -0,0 +1,18 @@
+"""
+Utilidades compartidas entre laboratorios
+=========================================
+
+Una sola copia de los módulos que usan varios labs:
+
+- mcp_sse: decodificador incremental de respuestas SSE (JSON-RPC) — Labs 6 y 7
+- mcp_cache: caché LRU + TTL de resultados MCP — Labs 6 y 7
+- mcp_metrics: histogramas de latencia/tamaño y errores por herramienta — Labs 6 y 7
+- rate_limit: token bucket (RPM/TPM) y reintentos con backoff — Labs 6 y 8
+
+Cada script agrega la raíz del repositorio al path antes de importarlos:
+
+    import sys
+    from pathlib import Path
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+    from common.mcp_sse import raise_for_status
+"""
@@ -0,0 +1,178 @@
+"""
+Caché de resultados MCP del lado del cliente
+============================================
+
+Resources como `ideas://guide`, prompts y herramientas puras (ej.
+`analyze_text`, `count_character`) devuelven siempre lo mismo para los
+mismos argumentos, pero cada llamada vuelve a viajar al servidor. Este
+módulo guarda la respuesta JSON-RPC en memoria con:
+
+- Clave (servidor, método, nombre, argumentos canónicos): el mismo dict de
+  argumentos en otro orden da la misma clave
+- Expulsión LRU (máximo de entradas) y TTL (segundos de vida)
+- Una sola petición en vuelo por clave: llamadas concurrentes a lo mismo
+  esperan la primera en lugar de repetirla
+- Invalidación por notificaciones del servidor (`notifications/resources/updated`,
+  `notifications/*/list_changed`)
+- Solo se guardan respuestas con `result`: los errores nunca se cachean
+
+Qué se puede cachear lo decide quien llama: `is_cacheable_tool()` acepta una
+allow-list y/o las anotaciones MCP de la herramienta (`readOnlyHint`).
+MCP no tiene peticiones condicionales (ETag / If-None-Match), así que la
+revalidación se hace con el TTL y las notificaciones.
+
+Ejemplo de uso:
+    cache = ResultCache(max_entries=256, ttl=300)
+
+    key = cache.key(SERVER_URL, "resources/read", "ideas://guide")
+    message = await cache.get_or_fetch(key, lambda: post("resources/read", {"uri": "ideas://guide"}))
+"""
+
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+# Notificación -> método cuyas entradas quedan obsoletas
+LIST_CHANGED = {
+    "notifications/tools/list_changed": "tools/call",
+    "notifications/resources/list_changed": "resources/read",
+    "notifications/prompts/list_changed": "prompts/get",
+}
+
+
+def is_cacheable_tool(
+    name: str,
+    allow_list: Iterable[str] = (),
+    annotations: Optional[Dict[str, Any]] = None,
+) -> bool:
+    """True si la herramienta está en la allow-list o se declara de solo lectura."""
+    if name in allow_list:
+        return True
+    return bool(annotations and annotations.get("readOnlyHint"))
+
+
+class ResultCache:
+    """
+    Caché LRU + TTL de respuestas JSON-RPC.
+
+    Un `ttl` en None o 0 hace que las entradas no expiren por tiempo
+    (solo por LRU o invalidación); `max_entries=0` desactiva la caché.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: Optional[float] = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # clave -> (método, nombre, instante de expiración o None, mensaje)
+        self._entries: "OrderedDict[str, Tuple[str, str, Optional[float], Dict[str, Any]]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(server: str, method: str, name: str, arguments: Optional[Dict[str, Any]] = None) -> str:
+        """Clave estable: JSON con claves ordenadas de (servidor, método, nombre, argumentos)."""
+        return json.dumps(
+            [server, method, name, arguments or {}],
+            sort_keys=True,
+            separators=(",", ":"),
+            ensure_ascii=False,
+            default=str,
+        )
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Mensaje cacheado para `key`, o None si no está o ya expiró."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires = entry[2]
+        if expires is not None and time.monotonic() >= expires:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[3]
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """Como `get`, pero cuenta un hit si el mensaje estaba cacheado."""
+        message = self.get(key)
+        if message is not None:
+            self.hits += 1
+        return message
+
+    def put(self, key: str, message: Dict[str, Any]) -> None:
+        """Guarda `message` si es una respuesta con `result`, expulsando la entrada menos usada."""
+        if self.max_entries <= 0 or "result" not in message:
+            return
+        method, name = json.loads(key)[1:3]
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        self._entries[key] = (method, name, expires, message)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def store(self, key: str, message: Dict[str, Any]) -> None:
+        """Guarda un mensaje que se pidió al servidor (cuenta un miss)."""
+        self.misses += 1
+        self.put(key, message)
+
+    async def get_or_fetch(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[Dict[str, Any]]],
+    ) -> Dict[str, Any]:
+        """
+        Devuelve el mensaje cacheado o lo obtiene con `fetch()` y lo guarda.
+
+        Si ya hay un `fetch` en vuelo para la misma clave, se espera ese
+        resultado en lugar de hacer otra petición.
+        """
+        message = self.lookup(key)
+        if message is not None:
+            return message
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.hits += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            message = await fetch()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Nadie más esperaba: evita "Future exception was never retrieved"
+            future.exception()
+            raise
+        else:
+            self.put(key, message)
+            future.set_result(message)
+            return message
+        finally:
+            self._inflight.pop(key, None)
+
+    def invalidate(self, method: Optional[str] = None, name: Optional[str] = None) -> int:
+        """Borra las entradas de `method` (y `name`), o todas si no se indica nada."""
+        stale = [
+            key for key, (entry_method, entry_name, _, _) in self._entries.items()
+            if (method is None or entry_method == method) and (name is None or entry_name == name)
+        ]
+        for key in stale:
+            del self._entries[key]
+        return len(stale)
+
+    def handle_notification(self, message: Dict[str, Any]) -> None:
+        """Callback on_notification: invalida lo que el servidor anuncia como cambiado."""
+        method = message.get("method")
+        if method == "notifications/resources/updated":
+            self.invalidate("resources/read", (message.get("params") or {}).get("uri"))
+        elif method in LIST_CHANGED:
+            self.invalidate(LIST_CHANGED[method])
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
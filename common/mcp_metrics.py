@@ -0,0 +1,295 @@
+"""
+Métricas de latencia y throughput de los clientes MCP
+=====================================================
+
+Cuando una tool call es lenta, no se sabe si es la red, el servidor o la
+herramienta. Este módulo registra, por método JSON-RPC y por herramienta:
+
+- Histogramas de latencia: conexión (TCP + TLS, solo cuando se abre una
+  conexión nueva), TTFB (hasta recibir los headers) y total
+- Histogramas de tamaño del request y de la respuesta (bytes)
+- Contadores de requests, errores por clase (`http_503`, `timeout`,
+  `connect`, `jsonrpc_-32602`, `tool_error`, ...) y reintentos
+  (`mcp_retries_total`: peticiones re-enviadas, ej. llamadas de un batch
+  que se repiten una por una)
+
+Los histogramas usan buckets fijos (como Prometheus): registrar un valor es
+una búsqueda binaria y una suma, así que se puede dejar activo siempre
+(`MCP_METRICS=0` lo desactiva). Se exporta en formato de texto Prometheus o
+como snapshot JSON (`MCP_METRICS_FILE`).
+
+Ejemplo de uso:
+    with METRICS.track("tools/call", tool_name) as span:
+        async with client.stream("POST", url, json=payload, extensions=span.extensions) as response:
+            span.first_byte()
+            await raise_for_status(response)
+            message = await read_jsonrpc_response(response)
+            span.done(response, message)
+
+    print(METRICS.to_prometheus())
+    METRICS.write("metrics.json")
+"""
+
+import asyncio
+import json
+import os
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Buckets por defecto (segundos y bytes)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+MCP_METRICS = os.getenv("MCP_METRICS", "1") != "0"
+MCP_METRICS_FILE = os.getenv("MCP_METRICS_FILE")
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def error_class(exc: BaseException) -> str:
+    """Clase de error agregable: http_<status>, timeout, connect o el tipo de excepción."""
+    response = getattr(exc, "response", None)
+    status = getattr(exc, "status_code", None) or getattr(response, "status_code", None)
+    if status is not None:
+        return f"http_{status}"
+    name = type(exc).__name__
+    if isinstance(exc, asyncio.TimeoutError) or "Timeout" in name:
+        return "timeout"
+    if isinstance(exc, ConnectionError) or "Connect" in name:
+        return "connect"
+    return name
+
+
+class Histogram:
+    """Histograma de buckets fijos (acumulables al exportar), con suma y cuenta."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # el último es +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[int]:
+        total, result = 0, []
+        for count in self.counts:
+            total += count
+            result.append(total)
+        return result
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimación del cuantil `q` interpolando dentro del bucket (como histogram_quantile)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        lower, seen = 0.0, 0
+        for bound, count in zip(self.buckets, self.counts):
+            if count and seen + count >= rank:
+                return lower + (bound - lower) * (rank - seen) / count
+            seen += count
+            lower = bound
+        return self.buckets[-1] if self.buckets else None
+
+
+class RequestSpan:
+    """
+    Mide una petición HTTP: conexión (vía el trace de httpcore), TTFB y total.
+
+    Se usa como context manager síncrono alrededor de `client.stream(...)`;
+    si sale por una excepción, cuenta el error con su clase.
+    """
+
+    def __init__(self, metrics: "Metrics", method: str, tool: str = ""):
+        self.metrics = metrics
+        self.labels = {"method": method, "tool": tool}
+        self.start = time.perf_counter()
+        self._connect_start: Optional[float] = None
+        self._connect: Optional[float] = None
+
+    @property
+    def extensions(self) -> Dict[str, Any]:
+        """`extensions` para httpx: engancha el trace de conexión."""
+        return {"trace": self.trace} if self.metrics.enabled else {}
+
+    async def trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        # httpcore (async) espera una corrutina. Solo hay eventos de conexión
+        # si no había una reutilizable en el pool; con TLS, start_tls cierra la medida
+        if event_name == "connection.connect_tcp.started":
+            self._connect_start = time.perf_counter()
+        elif event_name in ("connection.connect_tcp.complete", "connection.start_tls.complete"):
+            if self._connect_start is not None:
+                self._connect = time.perf_counter() - self._connect_start
+
+    def first_byte(self) -> None:
+        """Llamar al recibir los headers de la respuesta."""
+        self.metrics.observe("mcp_request_ttfb_seconds", time.perf_counter() - self.start, **self.labels)
+
+    def message(self, message: Dict[str, Any]) -> None:
+        """Cuenta un mensaje JSON-RPC de respuesta con error (del protocolo o de la herramienta)."""
+        if "error" in message:
+            code = (message.get("error") or {}).get("code")
+            self.metrics.inc("mcp_errors_total", error_class=f"jsonrpc_{code}", **self.labels)
+        elif (message.get("result") or {}).get("isError"):
+            self.metrics.inc("mcp_errors_total", error_class="tool_error", **self.labels)
+
+    def done(self, response: Any, message: Optional[Dict[str, Any]] = None) -> None:
+        """Registra los tamaños (tras leer la respuesta completa) y, si se pasa, el mensaje."""
+        sent = response.request.headers.get("content-length")
+        if sent is not None:
+            self.metrics.observe("mcp_request_size_bytes", int(sent), SIZE_BUCKETS, **self.labels)
+        self.metrics.observe(
+            "mcp_response_size_bytes", response.num_bytes_downloaded, SIZE_BUCKETS, **self.labels
+        )
+        if message is not None:
+            self.message(message)
+
+    def __enter__(self) -> "RequestSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        metrics = self.metrics
+        if self._connect is not None:
+            metrics.observe("mcp_request_connect_seconds", self._connect, **self.labels)
+        metrics.observe("mcp_request_duration_seconds", time.perf_counter() - self.start, **self.labels)
+        metrics.inc("mcp_requests_total", **self.labels)
+        if exc is not None and not isinstance(exc, asyncio.CancelledError):
+            metrics.inc("mcp_errors_total", error_class=error_class(exc), **self.labels)
+
+
+class Metrics:
+    """Registro de histogramas y contadores etiquetados (un proceso, un event loop)."""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+
+    def track(self, method: str, tool: str = "") -> RequestSpan:
+        """Span de una petición MCP (ver el ejemplo del módulo)."""
+        return RequestSpan(self, method, tool)
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+        **labels: str,
+    ) -> None:
+        if not self.enabled:
+            return
+        series = self._histograms.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram(buckets)
+        histogram.observe(value)
+
+    def inc(self, name: str, amount: float = 1, **labels: str) -> None:
+        if not self.enabled:
+            return
+        series = self._counters.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        series[key] = series.get(key, 0) + amount
+
+    def retry(self, method: str, tool: str = "") -> None:
+        """Cuenta una petición re-enviada (mismo método y herramienta)."""
+        self.inc("mcp_retries_total", method=method, tool=tool)
+
+    def reset(self) -> None:
+        self._histograms.clear()
+        self._counters.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Snapshot serializable a JSON (buckets acumulados y p50/p95/p99 estimados)."""
+        histograms = {}
+        for name, series in self._histograms.items():
+            histograms[name] = [
+                {
+                    "labels": dict(labels),
+                    "count": h.count,
+                    "sum": h.sum,
+                    "buckets": dict(zip([*map(str, h.buckets), "+Inf"], h.cumulative())),
+                    "p50": h.quantile(0.50),
+                    "p95": h.quantile(0.95),
+                    "p99": h.quantile(0.99),
+                }
+                for labels, h in series.items()
+            ]
+        counters = {
+            name: [{"labels": dict(labels), "value": value} for labels, value in series.items()]
+            for name, series in self._counters.items()
+        }
+        return {"timestamp": time.time(), "histograms": histograms, "counters": counters}
+
+    def to_prometheus(self) -> str:
+        """Exposición en formato de texto de Prometheus (0.0.4)."""
+        lines = []
+        for name, series in self._counters.items():
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in series.items():
+                lines.append(f"{name}{_format_labels(labels)} {value:g}")
+        for name, series in self._histograms.items():
+            lines.append(f"# TYPE {name} histogram")
+            for labels, h in series.items():
+                for bound, count in zip([*map(_format_bound, h.buckets), "+Inf"], h.cumulative()):
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {h.sum:g}")
+                lines.append(f"{name}_count{_format_labels(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """Guarda las métricas: texto Prometheus si `path` termina en .prom o .txt, si no JSON."""
+        if path.endswith((".prom", ".txt")):
+            content = self.to_prometheus()
+        else:
+            content = json.dumps(self.snapshot(), indent=2)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def summary(self, name: str = "mcp_request_duration_seconds") -> List[str]:
+        """Líneas legibles por (método, herramienta): cantidad, p50, p95, errores y reintentos."""
+        errors: Dict[Labels, float] = {}
+        for labels, value in self._counters.get("mcp_errors_total", {}).items():
+            key = tuple(item for item in labels if item[0] != "error_class")
+            errors[key] = errors.get(key, 0) + value
+        retries = self._counters.get("mcp_retries_total", {})
+        lines = []
+        for labels, h in sorted(self._histograms.get(name, {}).items()):
+            label = " ".join(value for _, value in labels if value)
+            lines.append(
+                f"{label:<32} n={h.count:<5} p50={h.quantile(0.5) * 1000:.0f}ms "
+                f"p95={h.quantile(0.95) * 1000:.0f}ms errores={errors.get(labels, 0):g} "
+                f"reintentos={retries.get(labels, 0):g}"
+            )
+        return lines
+
+
+def _format_bound(bound: float) -> str:
+    return f"{bound:g}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels) + "}"
+
+
+# Registro compartido por los clientes del proceso
+METRICS = Metrics(enabled=MCP_METRICS)
+
+
+def export_metrics(path: Optional[str] = MCP_METRICS_FILE) -> Optional[str]:
+    """Escribe METRICS en `path` (por defecto MCP_METRICS_FILE), si hay uno configurado."""
+    if not path or not METRICS.enabled:
+        return None
+    METRICS.write(path)
+    return path
@@ -0,0 +1,153 @@
+"""
+Decodificador incremental de Server-Sent Events para respuestas MCP
+===================================================================
+
+El transporte HTTP de MCP (Streamable HTTP) puede responder con
+`text/event-stream`: uno o más eventos SSE cuyo `data` es un mensaje
+JSON-RPC (notificaciones de progreso, logs y, al final, la respuesta).
+
+En lugar de esperar `response.text` completo y partirlo por líneas, este
+módulo procesa el stream a medida que llega (`response.aiter_lines()`),
+con memoria acotada a un evento a la vez:
+
+- SSEDecoder: máquina de estados línea a línea según la especificación
+  (campos `data` multilínea, `event`, `id`, `retry`, comentarios `:`)
+- aiter_sse(): eventos SSE de una respuesta httpx en streaming
+- aiter_jsonrpc(): mensajes JSON-RPC, sea la respuesta SSE o JSON plano
+- read_jsonrpc_response(): la respuesta a la petición (con `result` o
+  `error`), pasando antes cada notificación a un callback opcional
+
+Ejemplo de uso:
+    async with client.stream("POST", url, json=payload, headers=headers) as response:
+        await raise_for_status(response)
+        message = await read_jsonrpc_response(response, on_notification=print)
+"""
+
+import json
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Dict, List, Optional
+
+if TYPE_CHECKING:
+    import httpx
+
+
+@dataclass
+class SSEEvent:
+    """Un evento SSE ya despachado."""
+
+    data: str
+    event: str = "message"
+    id: Optional[str] = None
+    retry: Optional[int] = None
+
+
+class SSEDecoder:
+    """
+    Decodifica un stream SSE línea a línea.
+
+    `last_event_id` y `retry` persisten entre eventos: son los valores a
+    usar al reconectar (header `Last-Event-ID` y espera en milisegundos).
+    """
+
+    def __init__(self):
+        self._data: List[str] = []
+        self._event: Optional[str] = None
+        self._retry: Optional[int] = None
+        self.last_event_id: Optional[str] = None
+        self.retry: Optional[int] = None
+
+    def feed_line(self, line: str) -> Optional[SSEEvent]:
+        """Procesa una línea (sin salto final); devuelve un evento al completarse."""
+        line = line.rstrip("\r\n")
+        if not line:
+            return self._dispatch()
+        if line.startswith(":"):
+            return None  # Comentario (keep-alive)
+
+        field, _, value = line.partition(":")
+        if value.startswith(" "):
+            value = value[1:]
+
+        if field == "data":
+            self._data.append(value)
+        elif field == "event":
+            self._event = value
+        elif field == "id":
+            if "\0" not in value:
+                self.last_event_id = value
+        elif field == "retry":
+            if value.isdigit():
+                self._retry = self.retry = int(value)
+        return None
+
+    def flush(self) -> Optional[SSEEvent]:
+        """Despacha el evento pendiente al cerrarse el stream sin línea en blanco final."""
+        return self._dispatch()
+
+    def _dispatch(self) -> Optional[SSEEvent]:
+        event = None
+        if self._data:
+            event = SSEEvent(
+                data="\n".join(self._data),
+                event=self._event or "message",
+                id=self.last_event_id,
+                retry=self._retry,
+            )
+        self._data = []
+        self._event = None
+        self._retry = None
+        return event
+
+
+def is_event_stream(response: "httpx.Response") -> bool:
+    return "text/event-stream" in response.headers.get("content-type", "")
+
+
+async def raise_for_status(response: "httpx.Response") -> None:
+    """raise_for_status() para respuestas en streaming (lee el cuerpo si hay error)."""
+    if response.is_error:
+        await response.aread()
+    response.raise_for_status()
+
+
+async def aiter_sse(response: "httpx.Response") -> AsyncIterator[SSEEvent]:
+    """Eventos SSE de `response` (abierta con client.stream()) a medida que llegan."""
+    decoder = SSEDecoder()
+    async for line in response.aiter_lines():
+        event = decoder.feed_line(line)
+        if event is not None:
+            yield event
+    event = decoder.flush()
+    if event is not None:
+        yield event
+
+
+async def aiter_jsonrpc(response: "httpx.Response") -> AsyncIterator[Dict[str, Any]]:
+    """Mensajes JSON-RPC de la respuesta, sea SSE o un cuerpo JSON (mensaje o batch)."""
+    if is_event_stream(response):
+        async for event in aiter_sse(response):
+            if event.data.strip():
+                yield json.loads(event.data)
+        return
+
+    body = json.loads(await response.aread())
+    for message in body if isinstance(body, list) else [body]:
+        yield message
+
+
+async def read_jsonrpc_response(
+    response: "httpx.Response",
+    on_notification: Optional[Callable[[Dict[str, Any]], Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Primer mensaje con `result` o `error` (la respuesta a la petición).
+
+    Las notificaciones previas (ej. notifications/progress) se pasan a
+    `on_notification` a medida que llegan, sin acumularlas.
+    """
+    async for message in aiter_jsonrpc(response):
+        if "result" in message or "error" in message:
+            return message
+        if on_notification is not None:
+            on_notification(message)
+    raise ValueError("El servidor cerró la respuesta sin un mensaje JSON-RPC de resultado")
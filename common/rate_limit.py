@@ -0,0 +1,155 @@
+"""
+Rate Limit y Reintentos para llamadas a OpenAI
+==============================================
+
+Utilidades para correr muchas conversaciones a la vez sin pasarse de los
+límites de la cuenta de OpenAI:
+
+- RateLimiter: token bucket para requests por minuto (RPM) y tokens por minuto (TPM)
+- with_retries: reintentos con backoff exponencial + jitter (respeta Retry-After)
+
+Ejemplo de uso:
+    limiter = RateLimiter(requests_per_minute=500, tokens_per_minute=200_000)
+
+    async def create():
+        await limiter.acquire(estimate_tokens(prompt))
+        return await openai_client.chat.completions.create(...)
+
+    response = await with_retries(create, max_retries=5)
+"""
+
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+# Códigos HTTP que vale la pena reintentar
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+# Excepciones del SDK de OpenAI que indican un error transitorio
+RETRYABLE_ERRORS = {
+    "RateLimitError",
+    "APITimeoutError",
+    "APIConnectionError",
+    "InternalServerError",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimación rápida de tokens (~4 caracteres por token)."""
+    return max(1, len(text) // 4)
+
+
+class RateLimiter:
+    """
+    Token bucket doble: uno para requests y otro para tokens por minuto.
+
+    Cada bucket se rellena de forma continua a razón de limite/60 por segundo.
+    Un límite en None desactiva ese bucket.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+    ):
+        self.rpm = requests_per_minute
+        self.tpm = tokens_per_minute
+        self._requests = float(requests_per_minute or 0)
+        self._tokens = float(tokens_per_minute or 0)
+        self._updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        if self.rpm:
+            self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        if self.tpm:
+            self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    async def acquire(self, tokens: int = 1) -> None:
+        """Espera hasta que haya cupo para 1 request y `tokens` tokens."""
+        if not self.rpm and not self.tpm:
+            return
+        if self.tpm:
+            tokens = min(tokens, self.tpm)
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        while True:
+            async with self._lock:
+                self._refill()
+                wait = 0.0
+                if self.rpm and self._requests < 1:
+                    wait = max(wait, (1 - self._requests) * 60 / self.rpm)
+                if self.tpm and self._tokens < tokens:
+                    wait = max(wait, (tokens - self._tokens) * 60 / self.tpm)
+                if wait == 0.0:
+                    if self.rpm:
+                        self._requests -= 1
+                    if self.tpm:
+                        self._tokens -= tokens
+                    return
+            await asyncio.sleep(wait)
+
+
+def status_code(exc: BaseException) -> Optional[int]:
+    """Código HTTP de la excepción (SDK de OpenAI o httpx), si lo trae."""
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        response = getattr(exc, "response", None)
+        status = getattr(response, "status_code", None)
+    return status
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """Segundos indicados por el header Retry-After, si la excepción lo trae."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """True si el error es transitorio (rate limit, timeout, 5xx...)."""
+    if type(exc).__name__ in RETRYABLE_ERRORS:
+        return True
+    if isinstance(exc, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    return status_code(exc) in RETRYABLE_STATUS
+
+
+async def with_retries(
+    fn: Callable[[], Awaitable[Any]],
+    max_retries: int = 5,
+    base_delay: float = 1.0,
+    max_delay: float = 60.0,
+    on_retry: Optional[Callable[[BaseException, float], Any]] = None,
+) -> Any:
+    """
+    Ejecuta `fn` reintentando errores transitorios con backoff exponencial.
+
+    El delay es base_delay * 2^intento con full jitter, acotado por max_delay.
+    Si el servidor envía Retry-After, se usa ese valor como mínimo.
+    `on_retry(error, delay)` se llama antes de cada espera (ej. para contar 429).
+    """
+    attempt = 0
+    while True:
+        try:
+            return await fn()
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * 2**attempt))
+            hint = retry_after(e)
+            if hint is not None:
+                delay = max(delay, hint)
+            if on_retry is not None:
+                on_retry(e, delay)
+            attempt += 1
+            await asyncio.sleep(delay)
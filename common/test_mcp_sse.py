@@ -0,0 +1,125 @@
+"""Tests del decodificador SSE y de la lectura de mensajes JSON-RPC"""
+
+import asyncio
+import json
+
+import pytest
+
+from common.mcp_sse import SSEDecoder, SSEEvent, aiter_jsonrpc, read_jsonrpc_response
+
+
+def decode(lines):
+    decoder = SSEDecoder()
+    events = [event for event in map(decoder.feed_line, lines) if event is not None]
+    event = decoder.flush()
+    if event is not None:
+        events.append(event)
+    return decoder, events
+
+
+class FakeResponse:
+    """Lo mínimo de httpx.Response en streaming que usa mcp_sse."""
+
+    def __init__(self, body: str, content_type: str):
+        self.headers = {"content-type": content_type}
+        self._body = body
+
+    async def aiter_lines(self):
+        for line in self._body.splitlines():
+            yield line
+
+    async def aread(self):
+        return self._body.encode()
+
+
+def test_multiline_data_is_joined_with_newlines():
+    _, events = decode(["data: uno", "data:dos", "data:  tres", ""])
+    assert events == [SSEEvent(data="uno\ndos\n tres")]
+
+
+def test_field_without_colon_appends_empty_data():
+    _, events = decode(["data", "data: x", ""])
+    assert events[0].data == "\nx"
+
+
+def test_comments_and_unknown_fields_are_ignored():
+    _, events = decode([": keep-alive", "foo: bar", "data: {}", ":", ""])
+    assert events == [SSEEvent(data="{}")]
+
+
+def test_event_type_resets_after_dispatch():
+    _, events = decode(["event: progress", "data: 1", "", "data: 2", ""])
+    assert [event.event for event in events] == ["progress", "message"]
+
+
+def test_blank_lines_without_data_dispatch_nothing():
+    _, events = decode(["", "event: ping", "", "\r\n"])
+    assert events == []
+
+
+def test_id_persists_and_ids_with_nul_are_ignored():
+    decoder, events = decode(["id: 1", "data: a", "", "data: b", "", "id: 2\0", "data: c", ""])
+    assert [event.id for event in events] == ["1", "1", "1"]
+    assert decoder.last_event_id == "1"
+
+
+def test_empty_id_resets_last_event_id():
+    decoder, events = decode(["id: 7", "data: a", "", "id", "data: b", ""])
+    assert [event.id for event in events] == ["7", ""]
+    assert decoder.last_event_id == ""
+
+
+@pytest.mark.parametrize("value, expected", [("3000", 3000), ("3.5", None), ("-1", None), ("", None)])
+def test_retry_accepts_only_digits(value, expected):
+    decoder, events = decode([f"retry: {value}", "data: x", ""])
+    assert events[0].retry == expected
+    assert decoder.retry == expected
+
+
+def test_retry_persists_on_decoder_but_not_on_next_event():
+    decoder, events = decode(["retry: 500", "data: a", "", "data: b", ""])
+    assert [event.retry for event in events] == [500, None]
+    assert decoder.retry == 500
+
+
+def test_crlf_line_endings():
+    _, events = decode(["event: message\r\n", "data: x\r\n", "\r\n"])
+    assert events == [SSEEvent(data="x")]
+
+
+def test_flush_dispatches_event_without_trailing_blank_line():
+    decoder = SSEDecoder()
+    assert decoder.feed_line("data: fin") is None
+    assert decoder.flush() == SSEEvent(data="fin")
+    assert decoder.flush() is None
+
+
+def test_aiter_jsonrpc_reads_sse_and_plain_json():
+    sse = FakeResponse(
+        ": ping\n\nevent: message\ndata: {\"jsonrpc\": \"2.0\",\ndata:  \"id\": 1, \"result\": {}}\n\n",
+        "text/event-stream",
+    )
+    batch = FakeResponse(json.dumps([{"id": 1, "result": {}}, {"id": 2, "result": {}}]), "application/json")
+
+    async def collect(response):
+        return [message async for message in aiter_jsonrpc(response)]
+
+    assert asyncio.run(collect(sse)) == [{"jsonrpc": "2.0", "id": 1, "result": {}}]
+    assert [message["id"] for message in asyncio.run(collect(batch))] == [1, 2]
+
+
+def test_read_jsonrpc_response_passes_notifications_first():
+    progress = {"jsonrpc": "2.0", "method": "notifications/progress", "params": {"progress": 1}}
+    result = {"jsonrpc": "2.0", "id": 1, "result": {"ok": True}}
+    body = f"data: {json.dumps(progress)}\n\ndata: {json.dumps(result)}\n\n"
+    notifications = []
+
+    message = asyncio.run(read_jsonrpc_response(FakeResponse(body, "text/event-stream"), notifications.append))
+    assert message == result
+    assert notifications == [progress]
+
+
+def test_read_jsonrpc_response_without_result_raises():
+    body = 'data: {"jsonrpc": "2.0", "method": "notifications/progress"}\n'
+    with pytest.raises(ValueError):
+        asyncio.run(read_jsonrpc_response(FakeResponse(body, "text/event-stream")))